@@ -3,76 +3,120 @@
 # app.py — 도로주행 근무 자동 배정 v7.76 (Render Full Sync + Multi Morning-Key)
 # =====================================
 import streamlit as st
-from openai import OpenAI
-import base64, re, json, os, difflib, html, io, requests, random
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from PIL import Image, ImageEnhance, ImageFilter
+import base64, re, os, html
+import engine, history, metrics, name_match, ocr, roster, store, usage
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# -----------------------
+# ⏱ 재실행 계측 (구간 시간 / 카운터 → data/metrics/trace.jsonl, 진단 패널: ?diag=1)
+# -----------------------
+@st.cache_resource
+def _trace_log():
+    """재실행 trace 회전 로그 (프로세스 공용)"""
+    return metrics.TraceLog(os.path.join(os.path.dirname(__file__), "data", "metrics", "trace.jsonl"))
+
+@st.cache_resource
+def _metrics_server(port, host):
+    """METRICS_PORT 가 있으면 /metrics (Prometheus 텍스트) 를 여는 백그라운드 서버"""
+    return metrics.serve(port, host=host)
+
+if os.environ.get("METRICS_PORT"):
+    try:
+        _metrics_server(int(os.environ["METRICS_PORT"]), os.environ.get("METRICS_HOST", "127.0.0.1"))
+    except Exception:
+        pass
+# 끝내지 못한 이전 재실행 (st.rerun 등) 의 trace 가 있으면 중단 표시로 남긴다
+_trace_log().write(metrics.begin_trace(session=st.session_state.setdefault("diag_session", os.urandom(4).hex())))
 
 # -----------------------
 # ☁️ Render JSON 서버 설정
 # -----------------------
-RENDER_BASE = "https://roadvision-json-server.onrender.com/"
+import render_sync
+
+RENDER_BASE = render_sync.base_url()
+
+@st.cache_resource
+def _render_session():
+    """프로세스 공용 keep-alive 세션 (재실행마다 새 연결을 만들지 않음)"""
+    return render_sync.make_session()
+
+@st.cache_resource
+def _render_upload_queue():
+    """프로세스 공용 백그라운드 업로드 대기열 (재실행 후에도 유지)"""
+    return render_sync.UploadQueue(
+        send_batch=lambda items: render_sync.upload_many(RENDER_BASE, items, session=_render_session(),
+                                                         state=_render_sync_state()),
+        on_sent=lambda fname, data: _render_sync_state().note_local(fname, data),
+        # 보내지 못한 업로드는 data/render/ 에 기록 → 재시작 후 이어서 보내고, 그동안 복원에서 제외
+        journal=render_sync.UploadJournal(os.path.join(os.path.dirname(__file__), "data", "render", "upload_queue.json")),
+    )
+
+def render_upload_later(filename, data):
+    """Render 업로드를 대기열에 넣고 즉시 반환 (같은 파일 연속 저장은 하나로 합침)"""
+    _render_upload_queue().put(filename, data)
+
+def render_upload_many_later(items):
+    """여러 파일을 한 묶음으로 대기열에 등록 (/sync 지원 시 요청 1번으로 전송)"""
+    _render_upload_queue().put_many(items)
+
+@st.cache_resource
+def _render_sync_state():
+    """프로세스 공용 동기화 상태 (ETag·해시·마지막 확인 시각)"""
+    return render_sync.SyncState()
 
-def render_upload(filename, data):
-    """Render 서버 업로드"""
+@st.cache_resource
+def _render_restore_pool():
+    """Render 복원용 백그라운드 스레드 (프로세스 공용)"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="render-restore")
+
+def render_restore_all(force=False):
+    """
+    Render 서버와 주요 JSON 동기화 (백그라운드).
+    첫 화면은 로컬 데이터로 바로 그리고, 끝나면 render_restore_poll() 이 리포트를 보관하고 화면을 다시 그린다.
+    프로세스 시작 시 1회 전체 복원 → 새 세션은 변경분만 확인 → 일반 재실행은 네트워크 호출 없음.
+    """
+    if not force and st.session_state.get("render_synced"):
+        return
+    st.session_state["render_synced"] = True
+    # cache_resource 객체는 여기(스크립트 스레드)에서 꺼내 넘긴다 — 작업 스레드에는 Streamlit 실행 문맥이 없다
+    st.session_state["render_restore_job"] = _render_restore_pool().submit(
+        _render_restore_job, force, st.session_state.get("diag_session"),
+        local_store(), _render_sync_state(), _render_session(), _render_upload_queue(), _trace_log())
+
+def _render_restore_job(force, diag_session, target, state, http, queue, trace_log):
+    """작업 스레드: 동기화 1번. 요청 재실행보다 늦게 끝나므로 별도 trace(job=render_restore)로 남긴다"""
+    metrics.begin_trace(session=diag_session, job="render_restore")
     try:
-        res = requests.post(f"{RENDER_BASE}/upload", json={"filename": filename, "content": data}, timeout=10)
-        return res.ok
-    except Exception as e:
-        st.sidebar.warning(f"Render 업로드 실패: {e}")
+        # 업로드가 끝나지 않은 파일은 로컬이 더 새것 → 서버의 이전 내용으로 덮어쓰지 않는다
+        return render_sync.sync(RENDER_BASE, target, state, session=http, force=force, exclude=queue.unsent)
+    finally:
+        trace_log.write(metrics.end_trace())
+
+def _collect_restore():
+    """백그라운드 복원이 끝났으면 리포트 보관 → True"""
+    job = st.session_state.get("render_restore_job")
+    if job is None or not job.done():
         return False
-
-def render_download_file(filename, save_as=None):
-    """Render 서버에서 지정된 JSON 파일 복원"""
+    del st.session_state["render_restore_job"]
     try:
-        res = requests.get(f"{RENDER_BASE}/download/{filename}", timeout=10)
-        if res.ok:
-            data = res.json()
-            local_path = save_as or os.path.join("data", filename)
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            with open(local_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            st.sidebar.success(f"☁️ {filename} 복원 완료")
-            return True
-        else:
-            st.sidebar.warning(f"Render 응답 실패: {filename}")
+        # 🔹 메시지 출력 대신 리포트 보관 → 사이드바 동기화 상태에서 표시
+        st.session_state["render_restore_report"] = job.result()
     except Exception as e:
-        st.sidebar.warning(f"{filename} 복원 실패: {e}")
-    return False
-
-def render_restore_all():
-    """Render 서버에서 주요 JSON 전체 복원"""
-    target_files = [
-        "전일근무.json",
-        "아침열쇠.json",
-        "열쇠순번.json",
-        "교양순번.json",
-        "1종순번.json",
-        "1종자동순번.json",
-        "1종차량표.json",
-        "2종차량표.json",
-        "전체근무자.json",
-        "정비차량.json",
-        "메모장.json",
-        "오전결과.json"
-    ]
-    restored = []
-    for fname in target_files:
-        try:
-            res = requests.get(f"{RENDER_BASE}/download/{fname}", timeout=10)
-            if res.ok:
-                data = res.json()
-                local_path = os.path.join("data", fname)
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                with open(local_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                restored.append(fname)
-        except Exception:
-            continue
+        st.session_state["render_restore_report"] = None
+        st.session_state["render_restore_error"] = str(e)
+    return True
 
-    # 🔹 메시지 출력 삭제, 대신 결과만 반환
-    return restored
+@st.fragment(run_every=1)
+def render_restore_poll():
+    """
+    복원이 끝날 때까지 1초마다 확인 → 끝나면 전체 화면 다시 그림 (복원된 데이터 반영).
+    전체 재실행에서는 작업이 있을 때만 이 fragment 를 그리므로, 거둬들인 뒤에는 타이머도 같이 사라진다.
+    """
+    if _collect_restore() or st.session_state.get("render_restore_job") is None:
+        st.rerun(scope="app")
+    st.caption("☁️ Render 동기화 중… (로컬 데이터로 표시 중)")
 
 
 
@@ -117,30 +161,55 @@ Developed by <b>wook</b>
 # -----------------------
 # OpenAI 연결
 # -----------------------
-try:
-    client = OpenAI(api_key=st.secrets["general"]["OPENAI_API_KEY"])
-except Exception:
-    st.error("⚠️ OPENAI_API_KEY 설정 필요 (st.secrets['general']['OPENAI_API_KEY'])")
-    st.stop()
 MODEL_NAME = "gpt-4o"
+# OCR_BACKEND: openai(기본) / replay(오프라인 — data/ocr_fixtures 재생). OCR_RECORD=1 이면 OpenAI 응답을 fixture 로 기록
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "openai")
+OCR_FIXTURE_DIR = os.environ.get("OCR_FIXTURE_DIR", os.path.join(os.path.dirname(__file__), "data", "ocr_fixtures"))
+
+@st.cache_resource
+def _ocr_backend(kind):
+    if kind == "replay":
+        return ocr.ReplayBackend(OCR_FIXTURE_DIR)
+    backend = ocr.OpenAIVisionBackend(api_key=st.secrets["general"]["OPENAI_API_KEY"], model=MODEL_NAME)
+    if os.environ.get("OCR_RECORD"):
+        backend = ocr.RecordingBackend(backend, OCR_FIXTURE_DIR)
+    return backend
+
+def ocr_backend():
+    """OCR 백엔드 (처음 인식할 때 만든다 — openai / PIL 도 그때 import)"""
+    try:
+        return _ocr_backend(OCR_BACKEND)
+    except Exception:
+        # 키가 없거나 OpenAI 장애 대비 — 앱은 오프라인 OCR 로 계속 동작 (근무자 직접 입력 가능)
+        st.warning("⚠️ OPENAI_API_KEY 설정 필요 (st.secrets['general']['OPENAI_API_KEY']) — 오프라인 OCR 로 실행합니다.")
+        return _ocr_backend("replay")
 
 # -----------------------
 # JSON 유틸
 # -----------------------
+# 데이터는 data/roadvision.db (SQLite) 에 저장. 파일명(data/ 기준) 단위로 읽고 쓴다.
+# 읽기는 저장소 snapshot (모든 세션 공용, 읽기 전용: dict → MappingProxy, list → tuple).
+# 저장소 버전이 그대로면 rerun 마다 쿼리 1번으로 끝나고, 바뀐 파일만 다시 읽는다.
+@st.cache_resource
+def local_store():
+    """프로세스 공용 로컬 저장소 (처음 열 때 data/*.json 자동 가져오기)"""
+    return store.open_dir(os.path.join(os.path.dirname(__file__), "data"))
+
 def load_json(file, default=None):
-    if not os.path.exists(file):
-        return default
+    """읽기 전용 내용 (고칠 때는 list(...) / dict(...) 사본으로)"""
     try:
-        with open(file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
+        data = local_store().snapshot().get(os.path.basename(file))
+    except Exception:
         return default
+    return default if data is None else data
 
 def save_json(file, data):
+    save_many({file: data})
+
+def save_many(items):
+    """여러 파일을 한 트랜잭션으로 저장 {경로 또는 파일명: 내용}"""
     try:
-        os.makedirs(os.path.dirname(file), exist_ok=True)
-        with open(file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        local_store().put_many({os.path.basename(f): d for f, d in items.items()})
     except Exception as e:
         st.error(f"저장 실패: {e}")
 
@@ -151,13 +220,21 @@ def save_json(file, data):
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# ✅ 전일근무.json 경로 통일
+# ===== Render 서버에서 전체 JSON 복원 (프로세스/세션 시작 시 1회, 백그라운드) =====
+try:
+    render_restore_all()
+except Exception as e:
+    st.sidebar.warning(f"Render 전체 복원 오류: {e}")
+if st.session_state.get("render_restore_error"):
+    st.sidebar.warning(f"Render 전체 복원 오류: {st.session_state.pop('render_restore_error')}")
+_collect_restore()
+if st.session_state.get("render_restore_job") is not None:
+    with st.sidebar:
+        render_restore_poll()   # 복원 중일 때만 (끝나면 자동 새로고침 타이머도 멈춤)
+
+# ✅ 전일근무.json 경로 통일 (로컬에 없으면 기본값 — Render 복원이 끝나면 다시 그려짐)
 PREV_FILE = os.path.join(DATA_DIR, "전일근무.json")
-prev_data = load_json(PREV_FILE, None)
-if prev_data is None:
-    # Render에서 우선 복원 시도
-    render_download_file("전일근무.json", save_as=PREV_FILE)
-    prev_data = load_json(PREV_FILE, {"열쇠":"", "교양_5교시":"", "1종수동":"", "1종자동":""})
+prev_data = load_json(PREV_FILE, {"열쇠":"", "교양_5교시":"", "1종수동":"", "1종자동":""})
 
 prev_key = prev_data.get("열쇠", "")
 prev_gyoyang5 = prev_data.get("교양_5교시", "")
@@ -182,11 +259,8 @@ with st.sidebar.expander("🗓 전일 근무자", expanded=True):
             "1종자동": prev_auto1,
         }
         save_json(PREV_FILE, data)
-        ok = render_upload("전일근무.json", data)
-        if ok:
-            st.sidebar.success("전일근무.json 저장 완료 (Render 동기화)")
-        else:
-            st.sidebar.warning("전일근무 Render 업로드 실패")
+        render_upload_later("전일근무.json", data)
+        st.sidebar.success("전일근무.json 저장 완료 (Render 동기화 대기열)")
 
 # =====================================
 # 🌅 아침 열쇠 담당 (multi-schedule)
@@ -196,57 +270,59 @@ os.makedirs(DATA_DIR, exist_ok=True)
 
 MORNING_KEY_FILE = os.path.join(DATA_DIR, "아침열쇠.json")
 
+def _parse_morning_keys(snap):
+    data = snap.get(os.path.basename(MORNING_KEY_FILE))
+    if isinstance(data, Mapping) and data.get("name"):
+        return (data,)
+    if isinstance(data, (list, tuple)):
+        return tuple(data)
+    return ()
+
 def _load_morning_key_entries():
-    data = load_json(MORNING_KEY_FILE, {})
-    if isinstance(data, dict) and data.get("name"):
-        return [data]
-    if isinstance(data, list):
-        return data
-    return []
+    """아침열쇠 항목 (저장소 버전마다 한 번만 해석)"""
+    try:
+        return local_store().derived("morning_keys", _parse_morning_keys)
+    except Exception:
+        return ()
 
 def _save_morning_key_entries(entries):
     save_json(MORNING_KEY_FILE, entries)
-    try:
-        render_upload("아침열쇠.json", entries)
-    except Exception:
-        pass
+    render_upload_later("아침열쇠.json", entries)
 
 def pick_active_morning_key(today_date=None):
-    today = today_date or datetime.now(ZoneInfo("Asia/Seoul")).date()
-    actives = []
-    for row in _load_morning_key_entries():
-        nm = (row or {}).get("name","").strip()
-        try:
-            s = datetime.fromisoformat((row or {}).get("start","1900-01-01")).date()
-            e = datetime.fromisoformat((row or {}).get("end","2999-12-31")).date()
-        except Exception:
-            s, e = today, today
-        if nm and s <= today <= e:
-            actives.append(nm)
-    return actives
-
-with st.sidebar.expander("🌅 아침 열쇠 담당", expanded=False):
-    st.markdown("""
+    today = today_date or datetime.now(engine.kst()).date()
+    return engine.active_morning_keys(_load_morning_key_entries(), today)
+
+# 사이드바 편집기는 편집기마다 fragment + form:
+# 입력/선택 중에는 rerun 이 없고, 저장하면 그 편집기만 다시 실행된다 (Render 복원, 탭, 다른 편집기는 그대로).
+# 저장한 내용은 공용 snapshot 에 바로 반영되고 (배정은 저장소에서 읽음), 나머지 화면은 다음 전체 rerun 때 갱신된다.
+@st.fragment
+def morning_key_editor():
+    with st.expander("🌅 아침 열쇠 담당", expanded=False), st.form("form_morning_key", border=False):
+        st.markdown("""
 - 여러 명을 기간별로 등록할 수 있습니다.
 - 형식: 한 줄에 `이름,시작일,종료일` (예: 김남균,2025-11-01,2025-11-14)
 - 오늘 날짜가 포함된 항목은 자동 제외 대상에 반영됩니다.
 """, unsafe_allow_html=False)
-    existing = _load_morning_key_entries()
-    lines = []
-    for row in existing:
-        lines.append(f"{row.get('name','')},{row.get('start','')},{row.get('end','')}")
-    txt = st.text_area("아침열쇠 스케줄", value="\n".join(lines), height=120)
-
-    if st.button("💾 아침열쇠 저장(다중)", key="btn_morning_key_save_multi"):
-        entries = []
-        for line in txt.splitlines():
-            line=line.strip()
-            if not line: continue
-            parts = [p.strip() for p in line.split(",")]
-            if len(parts) >= 3:
-                entries.append({"name": parts[0], "start": parts[1], "end": parts[2]})
-        _save_morning_key_entries(entries)
-        st.success("아침열쇠 다중 스케줄 저장 완료 (Render 동기화)")
+        existing = _load_morning_key_entries()
+        lines = []
+        for row in existing:
+            lines.append(f"{row.get('name','')},{row.get('start','')},{row.get('end','')}")
+        txt = st.text_area("아침열쇠 스케줄", value="\n".join(lines), height=120)
+
+        if st.form_submit_button("💾 아침열쇠 저장(다중)"):
+            entries = []
+            for line in txt.splitlines():
+                line=line.strip()
+                if not line: continue
+                parts = [p.strip() for p in line.split(",")]
+                if len(parts) >= 3:
+                    entries.append({"name": parts[0], "start": parts[1], "end": parts[2]})
+            _save_morning_key_entries(entries)
+            st.success("아침열쇠 다중 스케줄 저장 완료 (Render 동기화)")
+
+with st.sidebar:
+    morning_key_editor()
 
 # -----------------------
 # 클립보드 복사 버튼
@@ -280,62 +356,51 @@ def clipboard_copy_button(label, text):
 # -----------------------
 # 이름 정규화 / 보정 / 차량
 # -----------------------
-def normalize_name(s):
-    return re.sub(r"[^가-힣]", "", re.sub(r"\(.*?\)", "", s or ""))
-
-def get_vehicle(name, veh_map):
-    nkey = normalize_name(name)
-    for car, nm in (veh_map or {}).items():
-        if normalize_name(nm) == nkey:
-            return car
-    return ""
-
-def _norm_car_id(s: str) -> str:
-    if not s: return ""
-    return re.sub(r"\s+", "", str(s)).strip()
-
-def mark_car(car, repair_cars):
-    if not car: return ""
-    car_norm = _norm_car_id(car)
-    repairs_norm = {_norm_car_id(x) for x in (repair_cars or [])}
-    return f"{car}{' (정비중)' if car_norm in repairs_norm else ''}"
-
-def car_num_key(car_id: str):
-    m = re.search(r"(\d+)", car_id or "")
-    return int(m.group(1)) if m else 10**9
-
-def pick_next_from_cycle(cycle, last, allowed_norms: set):
-    if not cycle: return None
-    cycle_norm = [normalize_name(x) for x in cycle]
-    last_norm = normalize_name(last)
-    start = (cycle_norm.index(last_norm) + 1) % len(cycle) if last_norm in cycle_norm else 0
-    for i in range(len(cycle) * 2):
-        cand = cycle[(start + i) % len(cycle)]
-        if normalize_name(cand) in allowed_norms:
-            return cand
-    return None
-
-def correct_name_v2(name, employee_list, cutoff=0.6):
-    name_norm = normalize_name(name)
-    if not name_norm:
-        return name
-    best, best_score = None, 0.0
-    for cand in (employee_list or []):
-        score = difflib.SequenceMatcher(None, normalize_name(cand), name_norm).ratio()
-        if score > best_score:
-            best_score, best = score, cand
-    return best if best and best_score >= cutoff else name
+normalize_name = name_match.normalize_name
+
+car_num_key = roster.car_num_key
+
+def correct_name_v2(name, employee_list, cutoff=0.6, aliases=None):
+    """
+    전체근무자 중 가장 비슷한 이름.
+    학습된 OCR 별칭(aliases)을 먼저 보고, 없으면 유사도 검색 (인덱스는 근무자 목록이 바뀔 때만 재생성)
+    """
+    return (name_match.lookup_alias(aliases, name, employee_list)
+            or name_match.matcher_for(employee_list).correct(name, cutoff))
 
 # -----------------------
 # OCR 유틸 (전처리 + GPT 호출)
 # -----------------------
-def enhance_image(img_bytes):
-    img = Image.open(io.BytesIO(img_bytes)).convert("L")
-    img = ImageEnhance.Contrast(img).enhance(2.0)
-    img = img.filter(ImageFilter.SHARPEN)
-    out = io.BytesIO()
-    img.save(out, format="JPEG", quality=95)
-    return out.getvalue()
+# 전처리 설정 (detail: high / low / auto — 비전 모델 해상도 예산)
+OCR_PREP = {
+    "detail": os.environ.get("OCR_DETAIL", "high"),
+    "contrast": 2.0,
+    "sharpen": True,
+    "quality": 85,
+}
+
+OCR_SYSTEM_PROMPT = "도로주행 근무표에서 이름과 메타데이터를 JSON으로 추출"
+OCR_USER_PROMPT = (
+    "이 이미지는 운전면허시험 근무표입니다.\n"
+    "1) '학과','기능','초소','PC'는 제외하고 도로주행 근무자만 names 로 추출 (괄호 없이 이름만).\n"
+    "2) 이름 옆 괄호의 'A-합','B-불','A합','B불'은 코스점검 결과 → course_records (course: A/B, result: 합격/불합격).\n"
+    "3) 상단/별도 표기된 '휴가,교육,출장,공가,연가,연차,돌봄' 섹션의 이름을 'excluded' 로 추출.\n"
+    "4) '지각/10시 출근/외출' 등 표기에서 오전 시작시간(예:10 또는 10.5)을 late_start 로.\n"
+    "5) '조퇴' 표기에서 오후 시간(13/14.5/16 등)을 early_leave 로.\n"
+    "해당 항목이 없으면 빈 배열."
+)
+
+def _gpt_extract_raw(img_bytes, backend, want_early=False, want_late=False, want_excluded=False, on_partial=None, slot=""):
+    """
+    gpt_extract 본체 — 선택된 OCR 백엔드로 인식 (OpenAI: 엄격한 JSON 스키마 + 스트리밍).
+    on_partial({"names": [...], "excluded": [...]}) 는 새 이름이 도착할 때마다 호출된다.
+    on_partial 이 없으면 Streamlit 호출 없음 (작업 스레드에서 실행 가능 — backend 는 메인 스레드에서 ocr_backend() 로).
+    호출 1건은 사용량 장부(data/usage)에 남는다.
+    반환: (결과, 전처리 지표, 오류)
+    """
+    return ocr.extract(backend, img_bytes, OCR_SYSTEM_PROMPT, OCR_USER_PROMPT, prep=OCR_PREP,
+                       want_early=want_early, want_late=want_late, want_excluded=want_excluded, on_partial=on_partial,
+                       ledger=_usage_ledger(), slot=slot)
 
 def gpt_extract(img_bytes, want_early=False, want_late=False, want_excluded=False):
     """
@@ -345,108 +410,103 @@ def gpt_extract(img_bytes, want_early=False, want_late=False, want_excluded=Fals
     - early_leave = [{"name":"김OO","time":14.5}, ...]
     - late_start = [{"name":"김OO","time":10.0}, ...]
     """
-    img_bytes = enhance_image(img_bytes)
-    b64 = base64.b64encode(img_bytes).decode()
-    user = (
-        "이 이미지는 운전면허시험 근무표입니다.\n"
-        "1) '학과','기능','초소','PC'는 제외하고 도로주행 근무자만 추출.\n"
-        "2) 이름 옆 괄호의 'A-합','B-불','A합','B불'은 코스점검 결과.\n"
-        "3) 상단/별도 표기된 '휴가,교육,출장,공가,연가,연차,돌봄' 섹션의 이름을 'excluded' 로 추출.\n"
-        "4) '지각/10시 출근/외출' 등 표기에서 오전 시작시간(예:10 또는 10.5)을 late_start 로.\n"
-        "5) '조퇴' 표기에서 오후 시간(13/14.5/16 등)을 early_leave 로.\n"
-        "JSON 예시: {\n"
-        "  \"names\": [\"김성연(B합)\",\"김병욱(A불)\"],\n"
-        "  \"excluded\": [\"안유미\"],\n"
-        "  \"early_leave\": [{\"name\":\"김병욱\",\"time\":14.5}],\n"
-        "  \"late_start\": [{\"name\":\"김성연\",\"time\":10}]\n"
-        "}"
-    )
-
-    try:
-        res = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "도로주행 근무표에서 이름과 메타데이터를 JSON으로 추출"},
-                {"role": "user", "content": [
-                    {"type": "text", "text": user},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}
-                ]}
-            ],
-        )
-        raw_msg = res.choices[0].message
-        raw = raw_msg["content"] if isinstance(raw_msg, dict) else raw_msg.content
-
-        try:
-            js = json.loads(re.search(r"\{[\s\S]*\}", raw).group(0))
-        except Exception:
-            js = {}
-
-        raw_names = js.get("names", [])
-        names, course_records = [], []
-        for n in raw_names:
-            m = re.search(r"([가-힣]+)\s*\(([^)]*)\)", n)
-            if m:
-                name = m.group(1).strip()
-                detail = re.sub(r"[^A-Za-z가-힣]", "", m.group(2)).upper()
-                course = "A" if "A" in detail else ("B" if "B" in detail else None)
-                result = "합격" if "합" in detail else ("불합격" if "불" in detail else None)
-                if course and result:
-                    course_records.append({"name": name, "course": f"{course}코스", "result": result})
-                names.append(name)
-            else:
-                names.append((n or "").strip())
-
-        excluded = js.get("excluded", []) if want_excluded else []
-        early_leave = js.get("early_leave", []) if want_early else []
-        late_start = js.get("late_start", []) if want_late else []
-
-        def to_float(x):
-            try:
-                return float(x)
-            except:
-                return None
-        for e in early_leave:
-            e["time"] = to_float(e.get("time"))
-        for l in late_start:
-            l["time"] = to_float(l.get("time"))
-
-        return names, course_records, excluded, early_leave, late_start
-    except Exception as e:
-        st.error(f"OCR 실패: {e}")
-        return [], [], [], [], []
+    result, prep, err = _gpt_extract_raw(img_bytes, ocr_backend(), want_early=want_early, want_late=want_late,
+                                         want_excluded=want_excluded)
+    st.session_state["ocr_last_prep"] = prep
+    if err:
+        st.error(f"OCR 실패: {err}")
+    return result
+
+def ocr_stream_preview():
+    """스트리밍 중 인식된 이름 미리보기 (완료되면 아래 입력칸에 채워짐) → on_partial 콜백"""
+    box = st.empty()
+    def show(partial):
+        line = f"👀 인식 중… 근무자 {len(partial['names'])}명: " + ", ".join(partial["names"])
+        if partial["excluded"]:
+            line += f"  /  제외자: {', '.join(partial['excluded'])}"
+        box.caption(line)
+    return show
+
+def ocr_prep_caption(prep):
+    """전처리 지표 한 줄 요약 (원본 → 전송 크기)"""
+    (w0, h0), (w1, h1) = prep["size_in"], prep["size_out"]
+    return (f"🖼 {prep['bytes_in']/1024:,.0f}KB {w0}×{h0} → {prep['bytes_out']/1024:,.0f}KB {w1}×{h1} "
+            f"(detail={prep['detail']}, {prep['ms']:.0f}ms)")
 
 # -----------------------
-# 교양 시간 제한 규칙
+# OCR 결과 캐시 (같은 사진 / 다시 찍은 같은 근무표는 API 호출 없이 재사용)
 # -----------------------
-def can_attend_period_morning(name_pure: str, period:int, late_list):
-    tmap = {1: 9.0, 2: 10.5}
-    nn = normalize_name(name_pure)
-    for e in late_list or []:
-        if normalize_name(e.get("name","")) == nn:
-            t = e.get("time", 99) or 99
-            try: t = float(t)
-            except: t = 99
-            return t <= tmap[period]
-    return True
+OCR_CACHE_DIR = os.path.join(DATA_DIR, "ocr_cache")
 
-def can_attend_period_afternoon(name_pure: str, period:int, early_list):
-    tmap = {3: 13.0, 4: 14.5, 5: 16.0}
-    nn = normalize_name(name_pure)
-    for e in early_list or []:
-        if normalize_name(e.get("name","")) == nn:
-            t = e.get("time", 0)
-            try: t = float(t)
-            except: t = 0
-            return t > tmap[period]
-    return True
+@st.cache_resource
+def _ocr_cache():
+    return ocr.OcrCache(OCR_CACHE_DIR)
 
 # -----------------------
-# KST 날짜 헤더
+# OCR 사용량 / 비용 (data/usage/YYYY-MM.jsonl, 예산: OCR_BUDGET_DAILY / OCR_BUDGET_MONTHLY)
 # -----------------------
-def kst_result_header(period_label: str) -> str:
-    dt = datetime.now(ZoneInfo("Asia/Seoul"))
-    yoil = "월화수목금토일"[dt.weekday()]
-    return f"{dt.strftime('%y.%m.%d')}({yoil}) {period_label} 교양순서 및 차량배정"
+@st.cache_resource
+def _usage_ledger():
+    """프로세스 공용 사용량 장부 (작업 스레드에서도 호출 가능)"""
+    return usage.UsageLedger(os.path.join(os.path.dirname(__file__), "data", "usage"))
+
+def ocr_budget_ok(calls=1):
+    """
+    OCR 호출 전 예산 점검 — 한도의 OCR_BUDGET_WARN(기본 80%) 에 닿으면 경고,
+    한도를 넘길 것 같으면 오류 표시 (OCR_BUDGET_BLOCK 이면 호출하지 않음). 반환: 호출해도 되면 True
+    """
+    check = usage.Budget.from_env().check(_usage_ledger(), calls=calls)
+    for msg in check["messages"]:
+        (st.error if check["level"] == "over" else st.warning)(f"💸 {msg}")
+    if check["blocked"]:
+        st.error("OCR 예산 한도에 도달했습니다. 근무자를 직접 입력하세요.")
+    return not check["blocked"]
+
+def _extract_cached(img_bytes, cache, backend, want_early=False, want_late=False, want_excluded=False, use_cache=True, slot="",
+                    on_partial=None):
+    """캐시 조회 → 없으면 GPT 호출 후 저장. Streamlit 호출 없음. 반환: {"result", "hit", "prep", "error"}"""
+    variant = ocr.cache_key(b"", backend.name, OCR_SYSTEM_PROMPT, OCR_USER_PROMPT, sorted(OCR_PREP.items()),
+                            want_early, want_late, want_excluded, slot)
+    key = ocr.cache_key(img_bytes, variant)
+    try:
+        phash = ocr.dhash(img_bytes)
+    except Exception:
+        phash = None
+    if use_cache:
+        cached, hit = cache.get(key, phash=phash, variant=variant)
+        if cached is not None:
+            metrics.count("ocr_cache_hits")
+            _usage_ledger().record(usage.model_name(backend.name), outcome=f"cache_{hit}", slot=slot)
+            return {"result": tuple(cached), "hit": hit, "prep": None, "error": None}
+        metrics.count("ocr_cache_misses")
+    result, prep, err = _gpt_extract_raw(img_bytes, backend, want_early=want_early, want_late=want_late,
+                                         want_excluded=want_excluded, on_partial=on_partial, slot=slot)
+    if result[0]:   # 인식 실패(빈 결과)는 캐시하지 않음
+        cache.put(key, list(result), phash=phash, variant=variant)
+    return {"result": result, "hit": None, "prep": prep, "error": err}
+
+def gpt_extract_cached(img_bytes, want_early=False, want_late=False, want_excluded=False, use_cache=True, slot="",
+                       on_partial=None):
+    """
+    gpt_extract + 디스크 캐시. 키 = 원본 이미지 해시 + 모델/프롬프트/옵션.
+    slot("오전"/"오후")이 다르면 유사 이미지로 보지 않음 (같은 양식의 오전·오후 근무표 구분).
+    반환: (names, course_records, excluded, early_leave, late_start), 캐시적중("exact"/"similar"/None)
+    """
+    out = _extract_cached(img_bytes, _ocr_cache(), ocr_backend(), want_early=want_early, want_late=want_late,
+                          want_excluded=want_excluded, use_cache=use_cache, slot=slot, on_partial=on_partial)
+    st.session_state["ocr_last_prep"] = out["prep"]
+    if out["error"]:
+        st.error(f"OCR 실패: {out['error']}")
+    return out["result"], out["hit"]
+
+def gpt_extract_pair(m_bytes, a_bytes, use_cache=True):
+    """오전·오후 근무표 동시 인식 (GPT 호출 2건 병렬). 반환: (오전, 오후) 각각 _extract_cached 결과"""
+    cache, backend = _ocr_cache(), ocr_backend()
+    opts = dict(want_early=True, want_late=True, want_excluded=True, use_cache=use_cache)
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr") as pool:
+        fm = pool.submit(metrics.bind(_extract_cached), m_bytes, cache, backend, slot="오전", **opts)
+        fa = pool.submit(metrics.bind(_extract_cached), a_bytes, cache, backend, slot="오후", **opts)
+        return fm.result(), fa.result()
 
 # -----------------------
 # JSON 기반 파일 구성
@@ -463,6 +523,7 @@ files = {
     "1종자동": "1종자동순번.json",
     "repair": "정비차량.json",
     "memo": "메모장.json",
+    "alias": "OCR별칭.json",
     "전일근무": "전일근무.json",
 }
 for k, v in files.items():
@@ -478,46 +539,27 @@ default_data = {
     "1종자동": ["21호","22호","23호","24호"],
     "repair": {"1종수동": [], "1종자동": [], "2종자동": []},
     "memo": {"memo": ""},
+    "alias": {},
 }
 
-# 초기화(없으면 생성)
-for k, path in files.items():
-    if not os.path.exists(path):
-        try:
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(default_data[k], f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            st.error(f"{path} 초기화 실패: {e}")
-
-# ===== Render 서버에서 전체 JSON 복원 =====
+# 초기화(없으면 생성 — 백그라운드 복원이 먼저 받은 파일은 그대로)
 try:
-    restored_list = render_restore_all()
+    local_store().put_missing({os.path.basename(path): default_data[k] for k, path in files.items() if k in default_data})
 except Exception as e:
-    restored_list = []
-    st.sidebar.warning(f"Render 전체 복원 오류: {e}")
+    st.error(f"저장 실패: {e}")
 
-# 로드
-key_order     = load_json(files["열쇠"])
-gyoyang_order = load_json(files["교양"])
-sudong_order  = load_json(files["1종"])
-veh1_map      = load_json(files["veh1"])
-veh2_map      = load_json(files["veh2"])
-employee_list = load_json(files["employees"])
-auto1_order   = load_json(files["1종자동"])
-
-# 정비(하위호환)
-_repair_raw = load_json(files["repair"])
-if isinstance(_repair_raw, dict):
-    repair_saved = {
-        "1종수동": _repair_raw.get("1종수동", []),
-        "1종자동": _repair_raw.get("1종자동", []),
-        "2종자동": _repair_raw.get("2종자동", []),
-    }
-elif isinstance(_repair_raw, list):
-    repair_saved = {"1종수동": _repair_raw, "1종자동": _repair_raw, "2종자동": _repair_raw}
-else:
-    repair_saved = {"1종수동": [], "1종자동": [], "2종자동": []}
-repair_union = sorted(set(repair_saved["1종수동"] + repair_saved["1종자동"] + repair_saved["2종자동"]), key=car_num_key)
+# -----------------------
+# 공용 설정
+# -----------------------
+# 순번표/차량표/근무자/정비/별칭은 세션에 복사하지 않고 모든 세션이 같은 읽기 전용 객체를 본다.
+# 세션에는 아직 저장하지 않은 편집(사이드바 위젯 값)과 세션별 선택(1종 수동 인원 수)만 남는다.
+def shared_roster():
+    """배정용 설정 모델: 이름→차량 역색인 / 정비 차량 집합 / 정렬된 차량 목록 (저장소 버전이 바뀔 때만 새로 생성)"""
+    return local_store().derived("roster", roster.from_files)
+
+def shared_aliases():
+    """OCR 별칭 (읽기 전용)"""
+    return load_json(files["alias"], {})
 
 # =====================================
 # 💄 사이드바 디자인 + 데이터 관리
@@ -534,8 +576,8 @@ section[data-testid="stSidebar"] {
 @media (max-width: 991px)   { section[data-testid="stSidebar"] { min-width: 280px; width: 85vw; flex: 0 0 auto; } }
 .streamlit-expanderHeader { font-weight: 700 !important; color: #1e3a8a !important; font-size: 15px !important; }
 textarea, input { font-size: 14px !important; }
-div.stButton > button { background-color: #2563eb; color: white; border: none; border-radius: 8px; padding: 6px 12px; margin-top: 6px; font-weight: 600; }
-div.stButton > button:hover { background-color: #1d4ed8; }
+div.stButton > button, div.stFormSubmitButton > button { background-color: #2563eb; color: white; border: none; border-radius: 8px; padding: 6px 12px; margin-top: 6px; font-weight: 600; }
+div.stButton > button:hover, div.stFormSubmitButton > button:hover { background-color: #1d4ed8; }
 .sidebar-subtitle { font-weight: 600; color: #334155; margin-top: 10px; margin-bottom: 4px; }
 .repair-box { border: 1px solid #fdba74; background: #fff7ed; padding: 8px 10px; border-radius: 8px; color: #7c2d12; font-size: 13px; }
 .btn-desc{ font-size: 13px; color: #475569; margin-top: 6px; line-height: 1.5; }
@@ -543,88 +585,95 @@ div.stButton > button:hover { background-color: #1d4ed8; }
 """, unsafe_allow_html=True)
 
 # -----------------------
-# 📂 데이터 관리
+# 📂 데이터 관리 (편집기마다 fragment + form, 자기 파일만 읽고 저장)
 # -----------------------
-with st.sidebar.expander("📂 데이터 관리", expanded=False):
+def _lines(text):
+    return [x.strip() for x in (text or "").splitlines() if x.strip()]
+
+def _veh_lines(text):
+    out = {}
+    for line in (text or "").splitlines():
+        p = line.strip().split()
+        if len(p) >= 2: out[p[0]] = " ".join(p[1:])
+    return out
+
+@st.fragment
+def order_editor():
     # 🔢 순번표 관리
-    with st.expander("🔢 순번표 관리", expanded=False):
+    with st.expander("🔢 순번표 관리", expanded=False), st.form("form_orders", border=False):
         st.markdown("<div class='sidebar-subtitle'>열쇠 순번</div>", unsafe_allow_html=True)
-        t1 = st.text_area("", "\n".join(key_order), height=150)
+        t1 = st.text_area("", "\n".join(load_json(files["열쇠"], [])), height=150)
         st.markdown("<div class='sidebar-subtitle'>교양 순번</div>", unsafe_allow_html=True)
-        t2 = st.text_area("", "\n".join(gyoyang_order), height=150)
+        t2 = st.text_area("", "\n".join(load_json(files["교양"], [])), height=150)
         st.markdown("<div class='sidebar-subtitle'>1종 수동 순번</div>", unsafe_allow_html=True)
-        t3 = st.text_area("", "\n".join(sudong_order), height=120)
+        t3 = st.text_area("", "\n".join(load_json(files["1종"], [])), height=120)
         st.markdown("<div class='sidebar-subtitle'>1종 자동 순번</div>", unsafe_allow_html=True)
-        t4 = st.text_area("", "\n".join(auto1_order or []), height=100)
-
-        if st.button("💾 순번표 저장", key="btn_save_orders"):
-            data1 = [x.strip() for x in t1.splitlines() if x.strip()]
-            data2 = [x.strip() for x in t2.splitlines() if x.strip()]
-            data3 = [x.strip() for x in t3.splitlines() if x.strip()]
-            data4 = [x.strip() for x in (t4.splitlines() if t4 else []) if x.strip()]
-            save_json(files["열쇠"], data1)
-            save_json(files["교양"], data2)
-            save_json(files["1종"], data3)
-            save_json(files["1종자동"], data4)
-
-            ok1 = render_upload("열쇠순번.json", data1)
-            ok2 = render_upload("교양순번.json", data2)
-            ok3 = render_upload("1종순번.json", data3)
-            ok4 = render_upload("1종자동순번.json", data4)
-
-            key_order[:]     = load_json(files["열쇠"])
-            gyoyang_order[:] = load_json(files["교양"])
-            sudong_order[:]  = load_json(files["1종"])
-            auto1_order[:]   = load_json(files["1종자동"])
-            st.session_state["key_order"] = key_order
-            st.session_state["gyoyang_order"] = gyoyang_order
-            st.session_state["sudong_order"] = sudong_order
-            st.session_state["auto1_order"] = auto1_order
-
-            if ok1 and ok2 and ok3 and ok4:
-                st.success("순번표 저장 완료 ✅ (Render 동기화)")
-            else:
-                st.warning("순번표 Render 업로드 일부 실패")
+        t4 = st.text_area("", "\n".join(load_json(files["1종자동"], [])), height=100)
+
+        if st.form_submit_button("💾 순번표 저장"):
+            data1, data2, data3, data4 = _lines(t1), _lines(t2), _lines(t3), _lines(t4)
+            save_many({files["열쇠"]: data1, files["교양"]: data2, files["1종"]: data3, files["1종자동"]: data4})
+
+            render_upload_many_later({
+                "열쇠순번.json": data1,
+                "교양순번.json": data2,
+                "1종순번.json": data3,
+                "1종자동순번.json": data4,
+            })
+            st.success("순번표 저장 완료 ✅ (Render 동기화 대기열)")
 
+@st.fragment
+def vehicle_editor():
     # 🚘 차량 담당 관리
-    with st.expander("🚘 차량 담당 관리", expanded=False):
+    with st.expander("🚘 차량 담당 관리", expanded=False), st.form("form_vehicles", border=False):
         st.markdown("<div class='sidebar-subtitle'>1종 수동 차량표</div>", unsafe_allow_html=True)
-        t1v = st.text_area("", "\n".join([f"{car} {nm}" for car, nm in (veh1_map or {}).items()]), height=130)
+        t1v = st.text_area("", "\n".join([f"{car} {nm}" for car, nm in load_json(files["veh1"], {}).items()]), height=130)
         st.markdown("<div class='sidebar-subtitle'>2종 자동 차량표</div>", unsafe_allow_html=True)
-        t2v = st.text_area("", "\n".join([f"{car} {nm}" for car, nm in (veh2_map or {}).items()]), height=160)
-
-        if st.button("💾 차량표 저장", key="btn_save_veh"):
-            veh1_new, veh2_new = {}, {}
-            for line in t1v.splitlines():
-                p = line.strip().split()
-                if len(p) >= 2: veh1_new[p[0]] = " ".join(p[1:])
-            for line in t2v.splitlines():
-                p = line.strip().split()
-                if len(p) >= 2: veh2_new[p[0]] = " ".join(p[1:])
-            save_json(files["veh1"], veh1_new)
-            save_json(files["veh2"], veh2_new)
-            okv1 = render_upload("1종차량표.json", veh1_new)
-            okv2 = render_upload("2종차량표.json", veh2_new)
-            veh1_map = load_json(files["veh1"])
-            veh2_map = load_json(files["veh2"])
-            if okv1 and okv2:
-                st.success("차량표 저장 완료 ✅ (Render 동기화)")
-            else:
-                st.warning("차량표 Render 업로드 실패")
+        t2v = st.text_area("", "\n".join([f"{car} {nm}" for car, nm in load_json(files["veh2"], {}).items()]), height=160)
 
+        if st.form_submit_button("💾 차량표 저장"):
+            veh1_new, veh2_new = _veh_lines(t1v), _veh_lines(t2v)
+            save_many({files["veh1"]: veh1_new, files["veh2"]: veh2_new})
+            render_upload_many_later({"1종차량표.json": veh1_new, "2종차량표.json": veh2_new})
+            st.success("차량표 저장 완료 ✅ (Render 동기화 대기열)")
+
+@st.fragment
+def employee_editor():
     # 👥 전체 근무자
-    with st.expander("👥 전체 근무자", expanded=False):
+    with st.expander("👥 전체 근무자", expanded=False), st.form("form_employees", border=False):
         st.markdown("<div class='sidebar-subtitle'>근무자 목록</div>", unsafe_allow_html=True)
-        t_emp = st.text_area("", "\n".join(employee_list), height=180)
-        if st.button("💾 근무자 저장", key="btn_save_emp"):
-            data_emp = [x.strip() for x in t_emp.splitlines() if x.strip()]
+        t_emp = st.text_area("", "\n".join(load_json(files["employees"], [])), height=180)
+        if st.form_submit_button("💾 근무자 저장"):
+            data_emp = _lines(t_emp)
             save_json(files["employees"], data_emp)
-            ok_emp = render_upload("전체근무자.json", data_emp)
-            employee_list = load_json(files["employees"])
-            if ok_emp:
-                st.success("전체근무자 저장 완료 ✅ (Render 동기화)")
-            else:
-                st.warning("전체근무자 Render 업로드 실패")
+            render_upload_later("전체근무자.json", data_emp)
+            st.success("전체근무자 저장 완료 ✅ (Render 동기화 대기열)")
+
+@st.fragment
+def alias_editor():
+    # 🔤 OCR 별칭 (자주 틀리는 인식 결과 → 근무자, 인식 결과를 고치면 자동 학습)
+    ocr_aliases = shared_aliases()
+    with st.expander(f"🔤 OCR 별칭 ({len(ocr_aliases)}개)", expanded=False), st.form("form_alias", border=False):
+        st.markdown("<div class='sidebar-subtitle'>인식 결과 → 근무자 (한 줄에 하나)</div>", unsafe_allow_html=True)
+        t_alias = st.text_area("", "\n".join(f"{raw} → {v.get('name','')}" for raw, v in ocr_aliases.items()),
+                               height=140, key="ta_ocr_alias")
+        if st.form_submit_button("💾 별칭 저장"):
+            today = datetime.now(engine.kst()).date().isoformat()
+            data_alias = {}
+            for line in t_alias.splitlines():
+                p = re.split(r"\s*(?:→|->)\s*", line.strip(), maxsplit=1)
+                if len(p) == 2 and normalize_name(p[0]) and p[1].strip():
+                    prev = ocr_aliases.get(normalize_name(p[0])) or {}
+                    data_alias[normalize_name(p[0])] = {"name": p[1].strip(), "count": prev.get("count", 1), "last": prev.get("last", today)}
+            save_json(files["alias"], data_alias)
+            render_upload_later("OCR별칭.json", data_alias)
+            st.success("OCR 별칭 저장 완료 ✅ (Render 동기화 대기열)")
+
+with st.sidebar.expander("📂 데이터 관리", expanded=False):
+    order_editor()
+    vehicle_editor()
+    employee_editor()
+    alias_editor()
 
 # =====================================
 # ⚙️ 추가 설정 + 정비차량 + 메모장
@@ -633,109 +682,120 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("⚙️ 추가 설정")
 sudong_count = st.sidebar.radio("1종 수동 인원 수", [1, 2], index=0)
 
-opt_1s = sorted(list((veh1_map or {}).keys()), key=car_num_key)
-opt_1a = sorted(list((st.session_state.get("auto1_order") or auto1_order or [])), key=car_num_key)
-opt_2a = sorted(list((veh2_map or {}).keys()), key=car_num_key)
-
 def _defaults(saved_list, opts):
     s = set(saved_list or [])
     return [x for x in opts if x in s]
 
-with st.sidebar.expander("🛠 정비 차량 목록", expanded=False):
-    with st.expander(" 1종 수동 정비", expanded=False):
-        sel_1s = st.multiselect("정비 차량 (1종 수동)", options=opt_1s,
-                                default=_defaults(repair_saved["1종수동"], opt_1s), key="repair_sel_1s")
-    with st.expander(" 1종 자동 정비", expanded=False):
-        sel_1a = st.multiselect("정비 차량 (1종 자동)", options=opt_1a,
-                                default=_defaults(repair_saved["1종자동"], opt_1a), key="repair_sel_1a")
-    with st.expander(" 2종 자동 정비", expanded=False):
-        sel_2a = st.multiselect("정비 차량 (2종 자동)", options=opt_2a,
-                                default=_defaults(repair_saved["2종자동"], opt_2a), key="repair_sel_2a")
-
-    payload = {
-        "1종수동": sorted(set(sel_1s or []), key=car_num_key),
-        "1종자동": sorted(set(sel_1a or []), key=car_num_key),
-        "2종자동": sorted(set(sel_2a or []), key=car_num_key),
-    }
-    if st.button("💾 정비 차량 저장", key="repair_save_btn"):
-        save_json(files["repair"], payload)
-        ok = render_upload("정비차량.json", payload)
-        repair_saved = payload
-        st.session_state["repair_1s"] = payload["1종수동"]
-        st.session_state["repair_1a"] = payload["1종자동"]
-        st.session_state["repair_2a"] = payload["2종자동"]
-        st.session_state["repair_cars"] = sorted(
-            set(payload["1종수동"] + payload["1종자동"] + payload["2종자동"]), key=car_num_key
-        )
-        if ok:
-            st.success("정비 차량 저장 완료 ✅ (Render 동기화)")
-        else:
-            st.warning("정비 차량 Render 업로드 실패")
+@st.fragment
+def repair_editor():
+    R = shared_roster()
+    opt_1s, opt_1a, opt_2a = list(R.cars_1s), list(R.cars_1a), list(R.cars_2a)
+    repair_saved = roster.repair_from_raw(load_json(files["repair"]))
+    with st.expander("🛠 정비 차량 목록", expanded=False):
+        with st.form("form_repair", border=False):
+            with st.expander(" 1종 수동 정비", expanded=False):
+                sel_1s = st.multiselect("정비 차량 (1종 수동)", options=opt_1s,
+                                        default=_defaults(repair_saved["1종수동"], opt_1s), key="repair_sel_1s")
+            with st.expander(" 1종 자동 정비", expanded=False):
+                sel_1a = st.multiselect("정비 차량 (1종 자동)", options=opt_1a,
+                                        default=_defaults(repair_saved["1종자동"], opt_1a), key="repair_sel_1a")
+            with st.expander(" 2종 자동 정비", expanded=False):
+                sel_2a = st.multiselect("정비 차량 (2종 자동)", options=opt_2a,
+                                        default=_defaults(repair_saved["2종자동"], opt_2a), key="repair_sel_2a")
+
+            if st.form_submit_button("💾 정비 차량 저장"):
+                payload = {
+                    "1종수동": sorted(set(sel_1s or []), key=car_num_key),
+                    "1종자동": sorted(set(sel_1a or []), key=car_num_key),
+                    "2종자동": sorted(set(sel_2a or []), key=car_num_key),
+                }
+                save_json(files["repair"], payload)
+                render_upload_later("정비차량.json", payload)
+                repair_saved = payload
+                st.success("정비 차량 저장 완료 ✅ (Render 동기화 대기열)")
 
-    st.markdown(
-        f"""<div class="repair-box">
-        <b>현재 정비 차량</b><br>
-        [1종 수동] {", ".join(repair_saved["1종수동"]) if repair_saved["1종수동"] else "없음"}<br>
-        [1종 자동] {", ".join(repair_saved["1종자동"]) if repair_saved["1종자동"] else "없음"}<br>
-        [2종 자동] {", ".join(repair_saved["2종자동"]) if repair_saved["2종자동"] else "없음"}
-        </div>""",
-        unsafe_allow_html=True
-    )
+        st.markdown(
+            f"""<div class="repair-box">
+            <b>현재 정비 차량</b><br>
+            [1종 수동] {", ".join(repair_saved["1종수동"]) if repair_saved["1종수동"] else "없음"}<br>
+            [1종 자동] {", ".join(repair_saved["1종자동"]) if repair_saved["1종자동"] else "없음"}<br>
+            [2종 자동] {", ".join(repair_saved["2종자동"]) if repair_saved["2종자동"] else "없음"}
+            </div>""",
+            unsafe_allow_html=True
+        )
 
 # 📝 메모장
-memo_data = load_json(files["memo"], {"memo": ""})
-memo_text = memo_data.get("memo", "")
-with st.sidebar.expander("📝 메모장", expanded=False):
-    st.markdown("<div class='sidebar-subtitle'>운영 메모 / 특이사항 기록</div>", unsafe_allow_html=True)
-    memo_input = st.text_area("", memo_text, height=140, placeholder="예: 10/27 - 5호차 브레이크 경고등 점등")
-    if st.button("💾 메모 저장", key="btn_save_memo"):
-        data = {"memo": memo_input}
-        save_json(files["memo"], data)
-        ok = render_upload("메모장.json", data)
-        if ok:
-            st.success("메모 저장 완료 ✅ (Render 동기화)")
-        else:
-            st.warning("메모장 Render 업로드 실패")
+@st.fragment
+def memo_editor():
+    memo_text = load_json(files["memo"], {"memo": ""}).get("memo", "")
+    with st.expander("📝 메모장", expanded=False), st.form("form_memo", border=False):
+        st.markdown("<div class='sidebar-subtitle'>운영 메모 / 특이사항 기록</div>", unsafe_allow_html=True)
+        memo_input = st.text_area("", memo_text, height=140, placeholder="예: 10/27 - 5호차 브레이크 경고등 점등")
+        if st.form_submit_button("💾 메모 저장"):
+            data = {"memo": memo_input}
+            save_json(files["memo"], data)
+            render_upload_later("메모장.json", data)
+            st.success("메모 저장 완료 ✅ (Render 동기화 대기열)")
+
+with st.sidebar:
+    repair_editor()
+    memo_editor()
 
 # =====================================
 # ⚙️ OCR 오타 교정 컷오프 (사이드바 숨김)
 # =====================================
 st.session_state["cutoff"] = 0.6  # 내부 기본값 유지 (UI 표시 제거)
 
-# ====== Render 복원 후 메시지 (데이터 관리 아래쪽에 표시) ======
-#restored_files = render_restore_all()
-#if restored_files:
-#    st.sidebar.markdown(
-#        f"<p style='font-size:13px; color:#22c55e; text-align:center; margin-top:12px;'>"
-#        f"☁️ {len(restored_files)}개 파일 복원 완료</p>",
-#        unsafe_allow_html=True,
-#    )
-#else:
-#    st.sidebar.markdown(
-#        "<p style='font-size:13px; color:#ef4444; text-align:center; margin-top:12px;'>"
-#        "⚠️ Render 복원 실패 또는 서버 응답 없음</p>",
-#        unsafe_allow_html=True,
-#    )
-
+# ====== Render 복원 결과 (데이터 관리 아래쪽에 표시) ======
+_restore_report = st.session_state.get("render_restore_report")
+if _restore_report:
+    _n_ok, _n_fail = len(_restore_report["restored"]), len(_restore_report["failed"])
+    with st.sidebar.expander(f"☁️ Render 동기화 상태 ({_n_ok}개 복원 · {_n_fail}개 실패)", expanded=False):
+        _mode = "전체 복원" if _restore_report.get("mode") == "full" else "변경분 확인"
+        if _restore_report.get("bulk"):
+            _mode += " (일괄 /sync)"
+        st.caption(f"{_mode}: {_restore_report['elapsed']:.2f}초 · 변경 없음 {len(_restore_report.get('unchanged', []))}개")
+        if _restore_report.get("missing"):
+            st.caption(f"서버에 아직 없음 (로컬 유지): {', '.join(_restore_report['missing'])}")
+        if _restore_report.get("skipped"):
+            st.caption(f"업로드 대기 중이라 건너뜀: {', '.join(_restore_report['skipped'])}")
+        if st.button("🔄 지금 동기화", key="btn_render_sync_now"):
+            render_restore_all(force=True)
+            st.rerun()
+        for fname, took in sorted(_restore_report["timings"].items(), key=lambda kv: -kv[1]):
+            mark = "⚠️" if fname in _restore_report["failed"] else "✅"
+            st.markdown(f"<div style='font-size:12px;'>{mark} {fname} — {took*1000:.0f}ms</div>", unsafe_allow_html=True)
+        for fname, why in _restore_report["failed"].items():
+            st.markdown(f"<div style='font-size:12px; color:#ef4444;'>❌ {fname}: {html.escape(why)}</div>", unsafe_allow_html=True)
+
+
+# ====== Render 업로드 대기열 상태 ======
+_upload_status = _render_upload_queue().status()
+_n_pending = len(_upload_status["pending"]) + len(_upload_status["inflight"])
+if _n_pending or _upload_status["failed"]:
+    with st.sidebar.expander(f"⏫ 업로드 대기 {_n_pending}개 · 실패 {len(_upload_status['failed'])}개", expanded=bool(_upload_status["failed"])):
+        for fname in _upload_status["inflight"]:
+            st.markdown(f"<div style='font-size:12px;'>⏳ {fname} 전송 중</div>", unsafe_allow_html=True)
+        for fname, info in _upload_status["pending"].items():
+            why = f" (재시도 {info['attempts']}회: {html.escape(info['error'])})" if info["error"] else ""
+            st.markdown(f"<div style='font-size:12px;'>🕒 {fname}{why}</div>", unsafe_allow_html=True)
+        for fname, info in _upload_status["failed"].items():
+            st.markdown(f"<div style='font-size:12px; color:#ef4444;'>❌ {fname}: {html.escape(info['error'] or '')}</div>", unsafe_allow_html=True)
+        if _upload_status["failed"] and st.button("🔁 실패 항목 다시 업로드", key="btn_upload_retry"):
+            _render_upload_queue().retry_failed()
+            st.rerun()
+elif _upload_status["sent"]:
+    st.sidebar.caption(f"⏫ Render 업로드 완료 {_upload_status['sent']}건 (대기 없음)")
 
 st.sidebar.caption("<p style='text-align:center; font-size:8px; color:#94a3b8;'>powered by <b>wook</b></p>", unsafe_allow_html=True)
 
-# 세션 최신화
-st.session_state.update({
-    "key_order": key_order, "gyoyang_order": gyoyang_order, "sudong_order": sudong_order,
-    "veh1": veh1_map, "veh2": veh2_map, "employee_list": employee_list,
-    "sudong_count": sudong_count,
-    "repair_1s": repair_saved["1종수동"],
-    "repair_1a": repair_saved["1종자동"],
-    "repair_2a": repair_saved["2종자동"],
-    "repair_cars": repair_union,
-    "auto1_order": auto1_order,
-})
+# 세션별 선택 (공용 설정은 shared_roster() / shared_aliases())
+st.session_state["sudong_count"] = sudong_count
 
 # -----------------------
 # 탭 UI
 # -----------------------
-tab1, tab2 = st.tabs([" 오전 근무", " 오후 근무"])
+tab1, tab2, tab3 = st.tabs([" 오전 근무", " 오후 근무", " 통계"])
 st.markdown("""
     <style>
     .stTabs [data-baseweb="tab-list"] { display: flex; justify-content: center; gap: 12px; }
@@ -753,6 +813,117 @@ def render_result_with_repair_color(text: str) -> str:
     esc = esc.replace("(정비중)", "<span class='repair-tag'>(정비중)</span>")
     return f"<pre class='result-pre'>{esc}</pre>"
 
+# -----------------------
+# 배정 입력/결과 ↔ 세션 (계산은 engine.py)
+# -----------------------
+# 오전결과.json 항목 → (세션 키, 기본값)
+MORNING_SESSION_KEYS = {
+    "assigned_cars_1": ("morning_assigned_cars_1", []),
+    "assigned_cars_2": ("morning_assigned_cars_2", []),
+    "auto_names": ("morning_auto_names", []),
+    "today_key": ("today_key", ""),
+    "gy_base_for_pm": ("gyoyang_base_for_pm", ""),
+    "sud_base_for_pm": ("sudong_base_for_pm", ""),
+    "today_auto1": ("today_auto1", ""),
+    "pos": ("morning_pos", {}),
+}
+
+def set_morning_session(record):
+    for k, (sk, default) in MORNING_SESSION_KEYS.items():
+        st.session_state[sk] = store.thaw(record.get(k, default))
+
+def morning_record_from_session():
+    """세션에 있는 오전 결과 (없는 항목은 engine 이 전일근무 기준으로 채움)"""
+    return {k: st.session_state[sk] for k, (sk, _) in MORNING_SESSION_KEYS.items() if sk in st.session_state}
+
+@st.cache_resource
+def history_store():
+    """배정 이력 (data/history/YYYY-MM.jsonl, 로컬 전용)"""
+    return history.HistoryStore(os.path.join(DATA_DIR, "history"))
+
+def sidebar_prev_data():
+    """전일 근무자 (사이드바에서 고친 이름 + 저장된 순번 위치)"""
+    return {**(prev_data or {}), "열쇠": prev_key, "교양_5교시": prev_gyoyang5, "1종수동": prev_sudong, "1종자동": prev_auto1}
+
+# -----------------------
+# OCR 결과 → 이름 보정 → 세션 반영 (오전/오후 공용)
+# -----------------------
+def _fix_course_records(course_records, employees, cutoff):
+    out, seen = [], set()
+    for r in course_records or []:
+        nm_fixed = correct_name_v2(r.get("name",""), employees, cutoff=cutoff)
+        course = r.get("course"); result = r.get("result")
+        key = (normalize_name(nm_fixed), course, result)
+        if not normalize_name(nm_fixed) or key in seen:
+            continue
+        out.append({"name": nm_fixed, "course": course, "result": result})
+        seen.add(key)
+    return out
+
+def _fix_ocr_names(result):
+    """OCR 결과 이름을 전체근무자 기준으로 보정 → (names, fixed, course, excluded, excluded_fixed, early, late)"""
+    names, course, excluded, early, late = result
+    employees, cutoff = shared_roster().employees, st.session_state["cutoff"]
+    aliases = shared_aliases()
+    fixed = [correct_name_v2(n, employees, cutoff=cutoff, aliases=aliases) for n in names]
+    excluded_fixed = [correct_name_v2(n, employees, cutoff=cutoff, aliases=aliases) for n in excluded]
+    for e in early:
+        e["name"] = correct_name_v2(e.get("name",""), employees, cutoff=cutoff, aliases=aliases)
+    for l in late:
+        l["name"] = correct_name_v2(l.get("name",""), employees, cutoff=cutoff, aliases=aliases)
+    return names, fixed, course, excluded, excluded_fixed, early, late
+
+def learn_ocr_corrections(pairs_key, final_names):
+    """
+    OCR 결과 대비 사용자가 확정한 명단에서 '오독 → 근무자' 별칭 학습 → OCR별칭.json 저장 (Render 동기화)
+    반환: 새로 학습/갱신된 별칭 수
+    """
+    pairs = st.session_state.get(pairs_key) or []
+    if not pairs:
+        return 0
+    learned = name_match.learn_aliases(pairs, final_names, shared_roster().employees)
+    today = datetime.now(engine.kst()).date().isoformat()
+    aliases, changed = name_match.merge_aliases(shared_aliases(), learned, today)
+    if changed:
+        save_json(files["alias"], aliases)
+        render_upload_later("OCR별칭.json", aliases)
+    return len(learned) if changed else 0
+
+def apply_morning_ocr(result):
+    """오전 인식 결과 세션 반영 (ta_morning_list / ta_excluded 위젯 생성 전에 호출) → 완료 메시지"""
+    names, fixed, course, excluded, excluded_fixed, early, late = _fix_ocr_names(result)
+    course_fixed = _fix_course_records(course, shared_roster().employees, st.session_state["cutoff"])
+    st.session_state["ocr_pairs_m"] = list(zip(names, fixed))
+    st.session_state["ocr_pairs_ex"] = list(zip(excluded, excluded_fixed))
+
+    # 세션 반영
+    st.session_state.m_names_raw = fixed
+    st.session_state.course_records = course_fixed
+    st.session_state.excluded_auto = excluded_fixed
+    st.session_state.early_leave = [e for e in early if e.get("time") is not None]
+    st.session_state.late_start = [l for l in late if l.get("time") is not None]
+    st.session_state["ta_morning_list"] = "\n".join(fixed)
+    st.session_state["ta_excluded"] = "\n".join(excluded_fixed)
+    return f"오전 인식 완료 → 근무자 {len(fixed)}명, 제외자 {len(excluded_fixed)}명, 코스 {len(course_fixed)}건"
+
+def apply_afternoon_ocr(result):
+    """오후 인식 결과 세션 반영 (ta_afternoon_list 위젯 생성 전에 호출) → 완료 메시지"""
+    names, fixed, _, _, excluded_fixed, early, late = _fix_ocr_names(result)
+    st.session_state["ocr_pairs_a"] = list(zip(names, fixed))
+    st.session_state.a_names_raw = fixed
+    st.session_state.excluded_auto_pm = excluded_fixed
+    st.session_state.early_leave_pm = [e for e in early if e.get("time") is not None]
+    st.session_state.late_start_pm = [l for l in late if l.get("time") is not None]
+    st.session_state["ta_afternoon_list"] = "\n".join(fixed)
+    return f"오후 인식 완료 → 근무자 {len(fixed)}명, 제외자 {len(excluded_fixed)}명"
+
+def show_ocr_outcome(message, cache_hit, prep):
+    if cache_hit:
+        st.info("♻️ 이전 인식 결과 재사용 (" + ("같은 사진" if cache_hit == "exact" else "다시 찍은 같은 근무표") + ", API 호출 없음)")
+    st.success(message)
+    if not cache_hit and prep:
+        st.caption(ocr_prep_caption(prep))
+
 # =====================================
 # 🔒 세션 상태 보호 (오전/오후 탭 선언 바로 위)
 # =====================================
@@ -772,6 +943,27 @@ with tab1:
         """,
         unsafe_allow_html=True
     )
+    # ⚡ 오전·오후 동시 인식 (두 근무표를 한 번에 — GPT 호출 2건 병렬)
+    with st.expander("⚡ 오전·오후 근무표 동시 인식", expanded=False):
+        col_dm, col_da = st.columns(2)
+        with col_dm:
+            dual_m_file = st.file_uploader("📸 오전 근무표", type=["png","jpg","jpeg"], key="dual_m_upload")
+        with col_da:
+            dual_a_file = st.file_uploader("📸 오후 근무표", type=["png","jpg","jpeg"], key="dual_a_upload")
+        dual_nocache = st.checkbox("캐시 무시", key="dual_ocr_nocache")
+        if st.button("오전·오후 GPT 동시 인식", key="btn_dual_ocr"):
+            if not (dual_m_file and dual_a_file):
+                st.warning("오전·오후 이미지를 모두 업로드하세요.")
+            elif ocr_budget_ok(calls=2):
+                with st.spinner("🧩 GPT 이미지 분석 중 (오전·오후 동시)..."):
+                    out_m, out_a = gpt_extract_pair(dual_m_file.getvalue(), dual_a_file.getvalue(),
+                                                    use_cache=not dual_nocache)
+                for out, apply in ((out_m, apply_morning_ocr), (out_a, apply_afternoon_ocr)):
+                    if out["error"]:   # 실패한 쪽은 입력된 명단을 빈 결과로 덮어쓰지 않는다
+                        st.error(f"OCR 실패: {out['error']}")
+                        continue
+                    show_ocr_outcome(apply(out["result"]), out["hit"], out["prep"])
+
     st.markdown("<h4 style='margin-top:6px;'>1️⃣ 오전 근무표 업로드 & OCR</h4>", unsafe_allow_html=True)
     col1, col2 = st.columns(2)
     with col1:
@@ -782,6 +974,7 @@ with tab1:
     col_btn, col_desc = st.columns([1, 4])
     with col_btn:
         run_m = st.button("오전 GPT 인식", key="btn_m_ocr")
+        m_nocache = st.checkbox("캐시 무시", key="m_ocr_nocache", help="저장된 인식 결과를 쓰지 않고 다시 인식합니다.")
     with col_desc:
         st.markdown(
             """<div class='btn-desc'>
@@ -810,44 +1003,13 @@ with tab1:
     if run_m:
         if not m_file:
             st.warning("오전 이미지를 업로드하세요.")
-        else:
+        elif ocr_budget_ok():
             with st.spinner("🧩 GPT 이미지 분석 중..."):
-                enhanced = enhance_image(m_file.read())
-                names, course, excluded, early, late = gpt_extract(
-                    enhanced, want_early=True, want_late=True, want_excluded=True
+                result, cache_hit = gpt_extract_cached(
+                    m_file.getvalue(), want_early=True, want_late=True, want_excluded=True, use_cache=not m_nocache, slot="오전",
+                    on_partial=ocr_stream_preview(),
                 )
-
-                fixed = [correct_name_v2(n, st.session_state["employee_list"], cutoff=st.session_state["cutoff"]) for n in names]
-                excluded_fixed = [correct_name_v2(n, st.session_state["employee_list"], cutoff=st.session_state["cutoff"]) for n in excluded]
-                for e in early:
-                    e["name"] = correct_name_v2(e.get("name",""), st.session_state["employee_list"], cutoff=st.session_state["cutoff"])
-                for l in late:
-                    l["name"] = correct_name_v2(l.get("name",""), st.session_state["employee_list"], cutoff=st.session_state["cutoff"])
-
-                def _fix_course_records(course_records, employees, cutoff):
-                    out, seen = [], set()
-                    for r in course_records or []:
-                        nm_fixed = correct_name_v2(r.get("name",""), employees, cutoff=cutoff)
-                        course = r.get("course"); result = r.get("result")
-                        key = (normalize_name(nm_fixed), course, result)
-                        if not normalize_name(nm_fixed) or key in seen:
-                            continue
-                        out.append({"name": nm_fixed, "course": course, "result": result})
-                        seen.add(key)
-                    return out
-
-                course_fixed = _fix_course_records(course, st.session_state["employee_list"], st.session_state["cutoff"])
-
-                # 세션 반영
-                st.session_state.m_names_raw = fixed
-                st.session_state.course_records = course_fixed
-                st.session_state.excluded_auto = excluded_fixed
-                st.session_state.early_leave = [e for e in early if e.get("time") is not None]
-                st.session_state.late_start = [l for l in late if l.get("time") is not None]
-                st.session_state["ta_morning_list"] = "\n".join(fixed)
-                st.session_state["ta_excluded"] = "\n".join(excluded_fixed)
-
-                st.success(f"오전 인식 완료 → 근무자 {len(fixed)}명, 제외자 {len(excluded_fixed)}명, 코스 {len(course_fixed)}건")
+                show_ocr_outcome(apply_morning_ocr(result), cache_hit, st.session_state.get("ocr_last_prep"))
 
     st.markdown("<h4 style='font-size:16px;'>🚫 근무 제외자 (실제와 비교 필수!)</h4>", unsafe_allow_html=True)
     excluded_text = st.text_area(
@@ -868,164 +1030,40 @@ with tab1:
     # 입력 파싱
     m_list = [x.strip() for x in st.session_state.get("ta_morning_list", "").splitlines() if x.strip()]
     excluded_set = {normalize_name(x) for x in st.session_state.get("ta_excluded", "").splitlines() if x.strip()}
-    early_leave = st.session_state.get("early_leave", [])
     late_start = st.session_state.get("late_start", [])
-    m_norms = {normalize_name(x) for x in m_list} - excluded_set
 
     st.markdown("<h4 style='font-size:18px;'>🚗 오전 근무 배정</h4>", unsafe_allow_html=True)
     if st.button("📋 오전 배정 생성"):
         try:
-            key_order     = st.session_state.get("key_order", [])
-            gyoyang_order = st.session_state.get("gyoyang_order", [])
-            sudong_order  = st.session_state.get("sudong_order", [])
-            veh1_map      = st.session_state.get("veh1", {})
-            veh2_map      = st.session_state.get("veh2", {})
-            sudong_count  = st.session_state.get("sudong_count", 1)
-            repair_1s     = st.session_state.get("repair_1s", [])
-            repair_1a     = st.session_state.get("repair_1a", [])
-            repair_2a     = st.session_state.get("repair_2a", [])
-            auto1_order   = st.session_state.get("auto1_order", [])
-
-            # 아침열쇠 제외 (단일/다중 모두 지원)
-            try:
-                # legacy 단일 형식
-                morning_key_single = load_json(os.path.join(DATA_DIR, "아침열쇠.json"), {})
-                if isinstance(morning_key_single, dict) and morning_key_single:
-                    today = datetime.now(ZoneInfo("Asia/Seoul")).date()
-                    start = datetime.fromisoformat(morning_key_single.get("start", "1900-01-01")).date()
-                    end   = datetime.fromisoformat(morning_key_single.get("end", "2999-12-31")).date()
-                    if start <= today <= end:
-                        excluded_set.add(normalize_name(morning_key_single.get("name","")))
-                # 다중 스케줄
-                for _nm in pick_active_morning_key():
-                    excluded_set.add(normalize_name(_nm))
-            except Exception:
-                pass
-
-            # 🔑 열쇠 — 열쇠순번자 중에서 제외자만 빼고 순번 순환
-            today_key = ""
-            if key_order:
-                ko_norm = [normalize_name(x) for x in key_order]
-                prev_norm = normalize_name(prev_key)
-
-                # 열쇠순번자 중 제외자 제거
-                valid_keys = [x for x in key_order if normalize_name(x) not in excluded_set]
-
-                if prev_norm in ko_norm:
-                    start_idx = ko_norm.index(prev_norm)
-                    for step in range(1, len(key_order) + 1):
-                        cand = key_order[(start_idx + step) % len(key_order)]
-                        if normalize_name(cand) in {normalize_name(v) for v in valid_keys}:
-                            today_key = cand
-                            break
-                else:
-                    # 전일 담당자가 순번표에 없을 경우
-                    for cand in valid_keys:
-                        today_key = cand
-                        break
-
-            st.session_state.today_key = today_key
-
-            # 🧑‍🏫 교양 1·2교시
-            gy1 = pick_next_from_cycle(gyoyang_order, prev_gyoyang5, m_norms)
-            if gy1 and not can_attend_period_morning(gy1, 1, late_start):
-                gy1 = pick_next_from_cycle(gyoyang_order, gy1, m_norms)
-            used_norm = {normalize_name(gy1)} if gy1 else set()
-            gy2 = pick_next_from_cycle(gyoyang_order, gy1 or prev_gyoyang5, m_norms - used_norm)
-            st.session_state.gyoyang_base_for_pm = gy2 if gy2 else prev_gyoyang5
-
-            # 🚚 1종 수동
-            sud_m, last = [], prev_sudong
-            for _ in range(sudong_count):
-                pick = pick_next_from_cycle(sudong_order, last, m_norms - {normalize_name(x) for x in sud_m})
-                if not pick: break
-                sud_m.append(pick); last = pick
-            st.session_state.sudong_base_for_pm = sud_m[-1] if sud_m else prev_sudong
-
-            # 🚗 2종 자동(사람)
-            sud_norms = {normalize_name(x) for x in sud_m}
-            auto_m = [x for x in m_list if normalize_name(x) in (m_norms - sud_norms)]
-
-            # 🔄 1종 자동 차량 순번 (하루 1회)
-            today_auto1 = ""
-            if auto1_order:
-                if prev_auto1 in auto1_order:
-                    idx = (auto1_order.index(prev_auto1) + 1) % len(auto1_order)
-                    today_auto1 = auto1_order[idx]
-                else:
-                    today_auto1 = auto1_order[0]
-            st.session_state.today_auto1 = today_auto1
-
-            # 오전 차량 기록
-            st.session_state.morning_assigned_cars_1 = [get_vehicle(x, veh1_map) for x in sud_m if get_vehicle(x, veh1_map)]
-            st.session_state.morning_assigned_cars_2 = [get_vehicle(x, veh2_map) for x in auto_m if get_vehicle(x, veh2_map)]
-            st.session_state.morning_auto_names = auto_m + sud_m
-
-            # === 출력 ===
-            lines = [kst_result_header("오전"), ""]
-            if today_key:
-                lines.append(f"열쇠: {today_key}")
-                lines.append("")
-            if gy1: lines.append(f"1교시: {gy1}")
-            if gy2: lines.append(f"2교시: {gy2}")
-            if gy1 or gy2: lines.append("")
-            if sud_m:
-                for nm in sud_m:
-                    car = mark_car(get_vehicle(nm, veh1_map), repair_1s)
-                    lines.append(f"1종수동: {car} {nm}" if car else f"1종수동: {nm}")
-                if sudong_count == 2 and len(sud_m) < 2:
-                    lines.append("※ 수동 가능 인원이 1명입니다.")
-            else:
-                lines.append("1종수동: (배정자 없음)")
-                if sudong_count >= 1:
-                    lines.append("※ 수동 가능 인원이 0명입니다.")
-
-            if st.session_state.get("today_auto1"):
-                lines.append("")
-                a1 = mark_car(st.session_state["today_auto1"], repair_1a)
-                lines.append(f"1종자동: {a1}")
-                lines.append("")
-
-            if auto_m:
-                lines.append("2종자동:")
-                for nm in auto_m:
-                    car = mark_car(get_vehicle(nm, veh2_map), repair_2a)
-                    lines.append(f" • {car} {nm}" if car else f" • {nm}")
-
-            # 코스점검
-            course_records = st.session_state.get("course_records", [])
-            if course_records:
-                lines.append("")
-                lines.append(" 코스점검 :")
-                for c in ["A", "B"]:
-                    passed = [r["name"] for r in course_records if r["course"] == f"{c}코스" and r["result"] == "합격"]
-                    failed = [r["name"] for r in course_records if r["course"] == f"{c}코스" and r["result"] == "불합격"]
-                    if passed: lines.append(f" • {c}코스 합격: {', '.join(passed)}")
-                    if failed: lines.append(f" • {c}코스 불합격: {', '.join(failed)}")
-
-            am_text = "\n".join(lines)
+            # ✍️ 인식 결과를 고친 내용 → OCR 별칭 학습
+            learn_ocr_corrections("ocr_pairs_m", m_list)
+            learn_ocr_corrections("ocr_pairs_ex", [x.strip() for x in st.session_state.get("ta_excluded", "").splitlines() if x.strip()])
+
+            now = datetime.now(engine.kst())
+            with metrics.span("assign_morning"):
+                res = engine.assign_morning(shared_roster(), {
+                    "names": m_list,
+                    "excluded": sorted(excluded_set),
+                    "key_excluded": pick_active_morning_key(now.date()),   # 아침열쇠 담당은 열쇠 순번에서만 제외
+                    "late_start": late_start,
+                    "course_records": st.session_state.get("course_records", []),
+                    "sudong_count": st.session_state.get("sudong_count", 1),
+                    "prev": sidebar_prev_data(),
+                }, now)
+
+            am_text = res["text"]
             st.markdown("#### 📋 오전 결과")
             st.code(am_text, language="text")
             clipboard_copy_button("📋 결과 복사하기", am_text)
 
             # ✅ 오전 결과 저장 + Render 동기화
             MORNING_FILE = os.path.join(DATA_DIR, "오전결과.json")
-            morning_data = {
-                "assigned_cars_1": st.session_state.get("morning_assigned_cars_1", []),
-                "assigned_cars_2": st.session_state.get("morning_assigned_cars_2", []),
-                "auto_names": st.session_state.get("morning_auto_names", []),
-                "today_key": st.session_state.get("today_key", ""),
-                "gy_base_for_pm": st.session_state.get("gyoyang_base_for_pm", ""),
-                "sud_base_for_pm": st.session_state.get("sudong_base_for_pm", ""),
-                "today_auto1": st.session_state.get("today_auto1", ""),
-                "timestamp": datetime.now(ZoneInfo("Asia/Seoul")).strftime("%y.%m.%d %H:%M"),
-            }
+            morning_data = dict(res["record"], timestamp=now.strftime("%y.%m.%d %H:%M"))
+            set_morning_session(morning_data)
+            history_store().append(history.morning_rows(shared_roster(), now.date(), res, history.run_id(now)))
             save_json(MORNING_FILE, morning_data)
-            ok_m = render_upload("오전결과.json", morning_data)
-            if ok_m:
-                st.info("✅ 오전 결과 저장 완료 (Render 동기화)")
-            else:
-                st.warning("오전결과 Render 업로드 실패 (로컬은 저장됨)")
+            render_upload_later("오전결과.json", morning_data)
+            st.info("✅ 오전 결과 저장 완료 (Render 동기화 대기열)")
 
         except Exception as e:
             st.error(f"오전 오류: {e}")
@@ -1040,20 +1078,10 @@ with tab2:
 
     # ✅ 오전결과 자동 복원
     MORNING_FILE = os.path.join(DATA_DIR, "오전결과.json")
-    if os.path.exists(MORNING_FILE):
-        morning_cache = load_json(MORNING_FILE, {})
-    else:
-        render_download_file("오전결과.json", save_as=MORNING_FILE)
-        morning_cache = load_json(MORNING_FILE, {})
+    morning_cache = load_json(MORNING_FILE, {})
 
     if morning_cache:
-        st.session_state["morning_assigned_cars_1"] = morning_cache.get("assigned_cars_1", [])
-        st.session_state["morning_assigned_cars_2"] = morning_cache.get("assigned_cars_2", [])
-        st.session_state["morning_auto_names"] = morning_cache.get("auto_names", [])
-        st.session_state["today_key"] = morning_cache.get("today_key", "")
-        st.session_state["gyoyang_base_for_pm"] = morning_cache.get("gy_base_for_pm", "")
-        st.session_state["sudong_base_for_pm"] = morning_cache.get("sud_base_for_pm", "")
-        st.session_state["today_auto1"] = morning_cache.get("today_auto1", "")
+        set_morning_session(morning_cache)
         ts = morning_cache.get("timestamp")
         if ts: st.caption(f"🕒 오전 결과 복원 완료 (저장 시각: {ts})")
     else:
@@ -1069,6 +1097,7 @@ with tab2:
     col_btn, col_desc = st.columns([1, 4])
     with col_btn:
         run_a = st.button("오후 GPT 인식", key="btn_a_ocr")
+        a_nocache = st.checkbox("캐시 무시", key="a_ocr_nocache", help="저장된 인식 결과를 쓰지 않고 다시 인식합니다.")
     with col_desc:
         st.markdown(
             """<div class='btn-desc'>
@@ -1096,27 +1125,13 @@ with tab2:
     if run_a:
         if not a_file:
             st.warning("오후 이미지를 업로드하세요.")
-        else:
+        elif ocr_budget_ok():
             with st.spinner("🧩 GPT 이미지 분석 중..."):
-                enhanced = enhance_image(a_file.read())
-                names, _, excluded, early, late = gpt_extract(
-                    enhanced, want_early=True, want_late=True, want_excluded=True
+                result, cache_hit = gpt_extract_cached(
+                    a_file.getvalue(), want_early=True, want_late=True, want_excluded=True, use_cache=not a_nocache, slot="오후",
+                    on_partial=ocr_stream_preview(),
                 )
-
-                fixed = [correct_name_v2(n, st.session_state["employee_list"], cutoff=st.session_state["cutoff"]) for n in names]
-                excluded_fixed = [correct_name_v2(n, st.session_state["employee_list"], cutoff=st.session_state["cutoff"]) for n in excluded]
-                for e in early:
-                    e["name"] = correct_name_v2(e.get("name",""), st.session_state["employee_list"], cutoff=st.session_state["cutoff"])
-                for l in late:
-                    l["name"] = correct_name_v2(l.get("name",""), st.session_state["employee_list"], cutoff=st.session_state["cutoff"])
-
-                st.session_state.a_names_raw = fixed
-                st.session_state.excluded_auto_pm = excluded_fixed
-                st.session_state.early_leave_pm = [e for e in early if e.get("time") is not None]
-                st.session_state.late_start_pm = [l for l in late if l.get("time") is not None]
-                st.session_state["ta_afternoon_list"] = "\n".join(fixed)
-
-                st.success(f"오후 인식 완료 → 근무자 {len(fixed)}명, 제외자 {len(excluded_fixed)}명")
+                show_ocr_outcome(apply_afternoon_ocr(result), cache_hit, st.session_state.get("ocr_last_prep"))
 
     st.markdown("<h4 style='font-size:18px;'>🌥️ 오후 근무자 (실제와 비교 필수!)</h4>", unsafe_allow_html=True)
     afternoon_text = st.text_area(
@@ -1128,159 +1143,37 @@ with tab2:
     a_list = [x.strip() for x in st.session_state.get("ta_afternoon_list", "").splitlines() if x.strip()]
 
     excluded_set = {normalize_name(x) for x in st.session_state.get("ta_excluded", "").splitlines() if x.strip()}
-    a_norms = {normalize_name(x) for x in a_list} - excluded_set
 
     st.markdown("<h4 style='font-size:18px;'>🚘 오후 근무 배정</h4>", unsafe_allow_html=True)
     if st.button("📋 오후 배정 생성"):
         try:
-            gyoyang_order = st.session_state.get("gyoyang_order", [])
-            sudong_order  = st.session_state.get("sudong_order", [])
-            veh1_map      = st.session_state.get("veh1", {})
-            veh2_map      = st.session_state.get("veh2", {})
-            sudong_count  = st.session_state.get("sudong_count", 1)
-            repair_1s     = st.session_state.get("repair_1s", [])
-            repair_1a     = st.session_state.get("repair_1a", [])
-            repair_2a     = st.session_state.get("repair_2a", [])
-            today_key     = st.session_state.get("today_key", prev_key)
-            gy_start      = st.session_state.get("gyoyang_base_for_pm", prev_gyoyang5) or (gyoyang_order[0] if gyoyang_order else "")
-            sud_base      = st.session_state.get("sudong_base_for_pm", prev_sudong)
-            early_leave   = st.session_state.get("early_leave", [])
-
-            # 아침열쇠 제외 (단일/다중 모두 지원)
-            try:
-                morning_key_single = load_json(os.path.join(DATA_DIR, "아침열쇠.json"), {})
-                if isinstance(morning_key_single, dict) and morning_key_single:
-                    today = datetime.now(ZoneInfo("Asia/Seoul")).date()
-                    start = datetime.fromisoformat(morning_key_single.get("start", "1900-01-01")).date()
-                    end   = datetime.fromisoformat(morning_key_single.get("end", "2999-12-31")).date()
-                    if start <= today <= end:
-                        excluded_set.add(normalize_name(morning_key_single.get("name","")))
-                for _nm in pick_active_morning_key():
-                    excluded_set.add(normalize_name(_nm))
-            except Exception:
-                pass
-
-            # 교양 3·4·5교시
-            used = set()
-            gy3 = gy4 = gy5 = None
-            last_ptr = gy_start
-            for period in [3,4,5]:
-                while True:
-                    pick = pick_next_from_cycle(gyoyang_order, last_ptr, a_norms - used)
-                    if not pick: break
-                    last_ptr = pick
-                    if can_attend_period_afternoon(pick, period, early_leave):
-                        if period == 3: gy3 = pick
-                        elif period == 4: gy4 = pick
-                        else: gy5 = pick
-                        used.add(normalize_name(pick))
-                        break
-
-            # 1종 수동
-            sud_a, last = [], sud_base
-            for _ in range(sudong_count):
-                pick = pick_next_from_cycle(sudong_order, last, a_norms)
-                if not pick: break
-                sud_a.append(pick); last = pick
-
-            # 2종 자동(사람)
-            sud_a_norms = {normalize_name(x) for x in sud_a}
-            auto_a = [x for x in a_list if normalize_name(x) in (a_norms - sud_a_norms)]
-
-            # === 출력 ===
-            lines = [kst_result_header("오후"), ""]
-            if today_key:
-                lines.append(f"열쇠: {today_key}")
-                lines.append("")
-            if gy3: lines.append(f"3교시: {gy3}")
-            if gy4: lines.append(f"4교시: {gy4}")
-            if gy5:
-                lines.append(f"5교시: {gy5}")
-                lines.append("")
-
-            if sud_a:
-                for nm in sud_a:
-                    car = mark_car(get_vehicle(nm, veh1_map), repair_1s)
-                    lines.append(f"1종수동: {car} {nm}" if car else f"1종수동: {nm}")
-                lines.append("")
-
-            if st.session_state.get("today_auto1"):
-                a1 = mark_car(st.session_state["today_auto1"], repair_1a)
-                lines.append(f"1종자동: {a1}")
-                lines.append("")
-
-            if auto_a:
-                lines.append("2종자동:")
-                for nm in auto_a:
-                    car = mark_car(get_vehicle(nm, veh2_map), repair_2a)
-                    lines.append(f" • {car} {nm}" if car else f" • {nm}")
-
-            # 🚫 마감 차량 (오전→오후)
-            am_c1 = set(st.session_state.get("morning_assigned_cars_1", []))
-            am_c2 = set(st.session_state.get("morning_assigned_cars_2", []))
-            pm_c1 = {get_vehicle(x, veh1_map) for x in sud_a if get_vehicle(x, veh1_map)}
-            pm_c2 = {get_vehicle(x, veh2_map) for x in auto_a if get_vehicle(x, veh2_map)}
-            un1 = sorted([c for c in am_c1 if c and c not in pm_c1], key=car_num_key)
-            un2 = sorted([c for c in am_c2 if c and c not in pm_c2], key=car_num_key)
-            if un1 or un2:
-                lines.append("")
-                lines.append("🚫 마감 차량:")
-                if un1:
-                    lines.append(" [1종 수동]")
-                    for c in un1: lines.append(f"  • {c} 마감")
-                if un2:
-                    lines.append(" [2종 자동]")
-                    for c in un2: lines.append(f"  • {c} 마감")
-
-            # 🔍 오전 대비 비교
-            lines.append("")
-            lines.append("🔍 오전 대비 비교:")
-            morning_auto_names = set(st.session_state.get("morning_auto_names", []))
-            afternoon_auto_names = set(auto_a)
-            afternoon_sudong_norms = {normalize_name(x) for x in sud_a}
-            missing = []
-            for nm in morning_auto_names:
-                n_norm = normalize_name(nm)
-                if n_norm not in afternoon_auto_names and n_norm not in afternoon_sudong_norms:
-                    missing.append(nm)
-            newly_joined = sorted([
-                x for x in a_list
-                if normalize_name(x) not in {normalize_name(y) for y in st.session_state.get("morning_auto_names", [])}
-            ])
-            if missing:      lines.append(" • 제외 인원: " + ", ".join(missing))
-            if newly_joined: lines.append(" • 신규 인원: " + ", ".join(newly_joined))
-
-            pm_result_text = "\n".join(lines).strip()
+            # ✍️ 인식 결과를 고친 내용 → OCR 별칭 학습
+            learn_ocr_corrections("ocr_pairs_a", a_list)
+
+            now = datetime.now(engine.kst())
+            with metrics.span("assign_afternoon"):
+                res = engine.assign_afternoon(shared_roster(), {
+                    "names": a_list,
+                    "excluded": sorted(excluded_set),
+                    "early_leave": st.session_state.get("early_leave", []),
+                    "sudong_count": st.session_state.get("sudong_count", 1),
+                    "prev": sidebar_prev_data(),
+                    "morning": morning_record_from_session(),
+                }, now)
+
+            pm_result_text = res["text"]
             st.markdown("#### 🌇 오후 근무 결과")
             st.code(pm_result_text, language="text")
             clipboard_copy_button("📋 결과 복사하기", pm_result_text)
 
-            # ✅ 전일근무자 저장용 세션
-            st.session_state["pm_save_ready"] = {
-                "열쇠": today_key,
-                "교양_5교시": gy5 or gy4 or gy3 or st.session_state.get("prev_gyoyang5",""),
-                "1종수동": (sud_a[-1] if sud_a else st.session_state.get("prev_sudong","")),
-                "1종자동": (st.session_state.get("today_auto1") or st.session_state.get("prev_auto1",""))
-            }
-            
-            # ✅ 자동 전일근무자 저장 추가
-            prev_data = {
-                "열쇠": st.session_state["pm_save_ready"]["열쇠"],
-                "교양_5교시": st.session_state["pm_save_ready"]["교양_5교시"],
-                "1종수동": st.session_state["pm_save_ready"]["1종수동"],
-                "1종자동": st.session_state["pm_save_ready"]["1종자동"],
-                "timestamp": datetime.now(ZoneInfo("Asia/Seoul")).strftime("%y.%m.%d %H:%M"),
-            }
-            save_json(files["전일근무"], prev_data)
-            render_upload("전일근무.json", prev_data)
-            st.success("전일근무자 자동 저장 완료 ✅ (Render 동기화)")
-            
-            # ⏱ 오후 배정 생성 시각 파일에 저장
-            pm_timestamp = datetime.now(ZoneInfo("Asia/Seoul")).strftime("%y.%m.%d %H:%M")
-            save_json(os.path.join(DATA_DIR, "오후결과.json"), {
-            "timestamp": pm_timestamp
-            })
-
+            # ✅ 자동 전일근무자 저장 (순번 위치도 함께 저장 → 같은 이름이 순번표에 여러 번 있어도 이어짐)
+            st.session_state["pm_save_ready"] = res["record"]
+            history_store().append(history.afternoon_rows(shared_roster(), now.date(), res, history.run_id(now)))
+            prev_data = dict(res["record"], timestamp=now.strftime("%y.%m.%d %H:%M"))
+            # ⏱ 오후 배정 생성 시각과 함께 한 번에 저장
+            save_many({files["전일근무"]: prev_data, "오후결과.json": {"timestamp": now.strftime("%y.%m.%d %H:%M")}})
+            render_upload_later("전일근무.json", prev_data)
+            st.success("전일근무자 자동 저장 완료 ✅ (Render 동기화 대기열)")
 
         except Exception as e:
             st.error(f"오후 오류: {e}")
@@ -1289,8 +1182,8 @@ with tab2:
     # 🌇 마지막 오후 배정 시각 표시 (오후 탭 맨 아래)
     # =====================================
     PM_FILE = os.path.join(DATA_DIR, "오후결과.json")
-    if os.path.exists(PM_FILE):
-        pm_cache = load_json(PM_FILE, {})
+    pm_cache = load_json(PM_FILE)
+    if pm_cache:
         pm_ts = pm_cache.get("timestamp")
         if pm_ts:
            st.markdown(
@@ -1304,3 +1197,67 @@ with tab2:
                 """,
                 unsafe_allow_html=True
     )
+
+# =====================================
+# 📊 통계 탭 (배정 이력 기준 사람/차량별 횟수)
+# =====================================
+with tab3:
+    st.markdown("<h4 style='font-size:18px;'>📊 순번 공정성 / 업무량</h4>", unsafe_allow_html=True)
+    windows = {"최근 30일": 30, "최근 90일": 90, "최근 1년": 365, "전체": None}
+    win = st.radio("기간", list(windows), horizontal=True, key="stats_window")
+    today = datetime.now(engine.kst()).date()
+    days = windows[win]
+    # 새로 저장된 배정만 더해지는 누적 집계 (전체 이력을 다시 읽지 않음)
+    counts = history_store().counts(start=(today - timedelta(days=days - 1)) if days else None, end=today if days else None)
+    if not counts:
+        st.caption("배정 이력이 없습니다. 오전/오후 배정을 생성하면 여기에 쌓입니다.")
+    else:
+        st.markdown("**근무자별 횟수** (교양 = 1~5교시 합계)")
+        st.dataframe(history.person_table(counts, people=shared_roster().employees), use_container_width=True)
+        st.markdown("**차량별 사용 / 마감 횟수**")
+        st.dataframe(history.car_table(counts), use_container_width=True)
+
+    # 💸 OCR 사용량 / 비용 (GPT 호출 장부 기준, 캐시 적중은 비용 0)
+    st.markdown("<h4 style='font-size:18px;'>💸 OCR 사용량 / 비용</h4>", unsafe_allow_html=True)
+    _ledger = _usage_ledger()
+    _usage_days = _ledger.daily(start=(today - timedelta(days=days - 1)) if days else None)
+    if not _usage_days:
+        st.caption("OCR 호출 기록이 없습니다.")
+    else:
+        _budget = usage.Budget.from_env()
+        _spent_day, _spent_month = _ledger.spent(today)
+        c1, c2 = st.columns(2)
+        c1.metric("오늘", f"${_spent_day:.2f}", help=f"한도 ${_budget.daily:.2f}" if _budget.daily else "한도 없음 (OCR_BUDGET_DAILY)")
+        c2.metric("이번 달", f"${_spent_month:.2f}",
+                  help=f"한도 ${_budget.monthly:.2f}" if _budget.monthly else "한도 없음 (OCR_BUDGET_MONTHLY)")
+        st.dataframe([{"날짜": d, "호출": v["calls"], "캐시 적중": v["cache_hits"], "오류": v["errors"],
+                       "입력 토큰": v["prompt_tokens"], "출력 토큰": v["completion_tokens"],
+                       "이미지 KB": round(v["image_bytes"] / 1024), "평균 ms": round(v["ms"] / v["calls"]) if v["calls"] else 0,
+                       "비용 $": round(v["cost"], 3)} for d, v in reversed(_usage_days)],
+                     hide_index=True, use_container_width=True)
+        st.caption("월별: " + " · ".join(f"{m} ${v['cost']:.2f} ({v['calls']}건)" for m, v in _ledger.monthly()[-6:]))
+
+# =====================================
+# 🩺 진단 (숨김: ?diag=1 또는 ROADVISION_DIAG=1)
+# =====================================
+if st.query_params.get("diag") == "1" or os.environ.get("ROADVISION_DIAG"):
+    with st.sidebar.expander("🩺 진단 (구간 시간 / 카운터)", expanded=False):
+        _summary = metrics.summary()
+        st.markdown("**구간별 소요 시간** (최근 측정 기준)")
+        st.dataframe([{"구간": k, "횟수": v["count"], "p50 ms": round(v["p50"] * 1000, 1), "p95 ms": round(v["p95"] * 1000, 1)}
+                      for k, v in sorted(_summary["stages"].items())], hide_index=True, use_container_width=True)
+        st.markdown("**카운터**")
+        st.dataframe([{"이름": k, "값": v} for k, v in sorted(_summary["counters"].items())],
+                     hide_index=True, use_container_width=True)
+        st.markdown("**최근 재실행 / 백그라운드 작업**")
+        for t in reversed(_trace_log().tail(10)):
+            spans = ", ".join(f"{k} {ms:.0f}ms" for k, ms in sorted(t["spans"], key=lambda x: -x[1])[:4])
+            mark = (" (중단)" if t.get("interrupted") else "") + (f" [{t['job']}]" if t.get("job") else "")
+            st.caption(f"{datetime.fromtimestamp(t['start']).strftime('%H:%M:%S')} · {t['ms']:.0f}ms{mark} — {spans or '-'}")
+        st.download_button("⬇️ Prometheus 텍스트", metrics.prometheus(), file_name="roadvision.prom", mime="text/plain")
+
+# 재실행 trace 마감 (전체 시간은 rerun 구간으로도 집계)
+_trace = metrics.end_trace()
+if _trace:
+    metrics.observe("rerun", _trace["ms"] / 1000)
+    _trace_log().write(_trace)
@@ -0,0 +1,113 @@
+# =====================================
+# bench_startup.py — 앱 시작 시간 벤치마크 (import 시간 + 첫 화면, 로컬 json_server.py 사용)
+# =====================================
+# 예)
+#   python bench_startup.py                          # 지연 없음
+#   python bench_startup.py --cold-start 5           # Render 콜드 스타트 중에도 첫 화면은 바로
+#   python bench_startup.py --latency 0.3 --repeat 5
+#
+# import: 새 파이썬 프로세스에서 앱 모듈 import 시간 + 시작 시 불러온 무거운 모듈 (있으면 회귀)
+# first paint: AppTest 첫 실행 시간 (빈 data 폴더, Render 복원은 백그라운드)
+# restore: 첫 실행 시작 ~ 백그라운드 복원 완료
+import argparse, glob, json, os, shutil, statistics, subprocess, sys, tempfile, time
+
+import json_server
+from bench_sync import Env
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_MODULES = ["engine", "history", "name_match", "ocr", "roster", "store", "render_sync", "usage"]
+# 처음 쓸 때만 import 해야 하는 모듈 (OCR / 통계 / 네트워크 / 시간대)
+LAZY_MODULES = ["openai", "PIL", "pandas", "requests", "zoneinfo"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+import streamlit
+t0 = time.perf_counter()
+import {mods}
+print(json.dumps({{"ms": (time.perf_counter() - t0) * 1000,
+                  "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+# -----------------------
+# 측정
+# -----------------------
+def measure_import():
+    """새 프로세스에서 앱 모듈 import (streamlit 자체는 제외) → (ms, 불러온 무거운 모듈)"""
+    code = IMPORT_SNIPPET.format(mods=", ".join(APP_MODULES), lazy=LAZY_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    r = json.loads(out.stdout.strip().splitlines()[-1])
+    return r["ms"], r["loaded"]
+
+def measure_first_paint(env, timeout=60):
+    """빈 data 폴더에서 AppTest 첫 실행 → (첫 화면 ms, 복원 완료 ms, 예외)"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+        for path in glob.glob(os.path.join(HERE, "*.py")):
+            shutil.copy(path, tmp)
+        os.environ["RENDER_BASE"] = env.base
+        st.cache_resource.clear()   # 이전 측정의 저장소/세션을 쓰지 않도록
+        at = AppTest.from_file(os.path.join(tmp, "app.py"), default_timeout=timeout)
+        t0 = time.perf_counter()
+        at.run()
+        paint = time.perf_counter() - t0
+        job = at.session_state["render_restore_job"] if "render_restore_job" in at.session_state else None
+        if job is not None:
+            job.result(timeout=timeout)
+        restored = time.perf_counter() - t0
+        st.cache_resource.clear()
+        return paint * 1000, restored * 1000, [e.value for e in at.exception]
+
+
+# -----------------------
+# 실행
+# -----------------------
+def run(args):
+    imports, loaded = [], set()
+    for _ in range(args.repeat):
+        ms, mods = measure_import()
+        imports.append(ms)
+        loaded.update(mods)
+    paints, restores, errors = [], [], []
+    for _ in range(args.repeat):
+        env = Env(args)
+        try:
+            paint, restored, exc = measure_first_paint(env)
+        finally:
+            env.close()
+        paints.append(paint)
+        restores.append(restored)
+        errors += exc
+    return {
+        "import_ms": statistics.median(imports),
+        "eager_heavy_modules": sorted(loaded),
+        "first_paint_ms": statistics.median(paints),
+        "restore_done_ms": statistics.median(restores),
+        "exceptions": errors,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="앱 시작 시간 벤치마크")
+    json_server.add_fault_args(ap)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args()
+
+    r = run(args)
+    if args.json:
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+        return
+    print(f"latency={args.latency}s cold_start={args.cold_start}s repeat={args.repeat}")
+    print(f"{'import (앱 모듈)':<24}{r['import_ms']:>8.0f}ms  시작 시 불러온 무거운 모듈: "
+          f"{', '.join(r['eager_heavy_modules']) or '없음'}")
+    print(f"{'first paint':<24}{r['first_paint_ms']:>8.0f}ms")
+    print(f"{'restore 완료':<24}{r['restore_done_ms']:>8.0f}ms")
+    for e in r["exceptions"]:
+        print(f"⚠️ {e}")
+
+
+if __name__ == "__main__":
+    main()
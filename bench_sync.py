@@ -0,0 +1,207 @@
+# =====================================
+# bench_sync.py — Render 동기화 지연 벤치마크 (로컬 json_server.py 사용)
+# =====================================
+# 예)
+#   python bench_sync.py                                  # 지연 없음
+#   python bench_sync.py --latency 0.15 --jitter 0.05     # 일반 인터넷 왕복
+#   python bench_sync.py --cold-start 5                   # Render 콜드 스타트
+#   python bench_sync.py --latency 0.1 --fail-rate 0.2    # 불안정한 서버
+#   python bench_sync.py --no-sync                        # /sync 미지원 서버
+#
+# 각 측정은 새 서버(새 콜드 스타트 상태)에서 실행된다.
+import argparse, json, os, statistics, tempfile, threading, time
+from datetime import datetime
+
+import requests
+
+import json_server
+import render_sync
+
+SEED = {
+    "전일근무.json": {"열쇠": "김남균", "교양_5교시": "김성연", "1종수동": "이호석", "1종자동": "22호"},
+    "아침열쇠.json": [{"name": "김남균", "start": "2025-11-01", "end": "2025-11-14"}],
+    "열쇠순번.json": ["권한솔", "김남균", "김면정", "김성연", "김주현", "김지은", "안유미", "윤여헌", "윤원실", "이호석", "조정래"],
+    "교양순번.json": ["권한솔", "김남균", "김면정", "김병욱", "김성연", "김주현", "김지은", "안유미", "이호석", "조정래"],
+    "1종순번.json": ["권한솔", "김남균", "김성연", "김주현", "이호석", "조정래"],
+    "1종자동순번.json": ["21호", "22호", "23호", "24호"],
+    "1종차량표.json": {"2호": "조정래", "5호": "권한솔", "7호": "김남균", "8호": "이호석", "9호": "김주현", "10호": "김성연"},
+    "2종차량표.json": {"4호": "김남균", "5호": "김병욱", "6호": "김지은", "12호": "안유미", "14호": "김면정",
+                   "15호": "이호석", "17호": "김성연", "18호": "권한솔", "19호": "김주현", "22호": "조정래"},
+    "전체근무자.json": ["권한솔", "김남균", "김면정", "김성연", "김지은", "안유미", "윤여헌", "윤원실", "이호석", "조정래", "김병욱", "김주현"],
+    "정비차량.json": {"1종수동": [], "1종자동": [], "2종자동": []},
+    "메모장.json": {"memo": "10/27 - 5호차 브레이크 경고등 점등"},
+    "오전결과.json": {"assigned_cars_1": ["7호"], "assigned_cars_2": ["4호", "6호"], "auto_names": ["김지은"],
+                  "today_key": "김면정", "gy_base_for_pm": "김성연", "sud_base_for_pm": "김남균",
+                  "today_auto1": "23호", "timestamp": "25.11.03 08:40"},
+    "OCR별칭.json": {"김남군": {"name": "김남균", "count": 3, "last": "2025-11-03"}},
+}
+
+ORDER_FILES = ["열쇠순번.json", "교양순번.json", "1종순번.json", "1종자동순번.json"]
+
+
+# -----------------------
+# 서버 / 클라이언트 준비
+# -----------------------
+class Env:
+    """새 서버(시드 데이터 포함) + 빈 클라이언트 data 폴더"""
+
+    def __init__(self, args):
+        self.tmp = tempfile.TemporaryDirectory(prefix="bench_sync_")
+        server_dir = os.path.join(self.tmp.name, "server")
+        for fname, data in SEED.items():
+            render_sync.write_local(os.path.join(server_dir, fname), data)
+        self.faults = json_server.faults_from_args(args)
+        self.server = json_server.make_server(port=0, data_dir=server_dir, faults=self.faults)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def client_dir(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+
+def serial_restore(base, data_dir):
+    """이전 방식: 세션 없이 파일별 순차 GET (비교 기준)"""
+    ok = 0
+    for fname in render_sync.RENDER_FILES:
+        try:
+            res = requests.get(f"{base}/download/{fname}", timeout=10)
+            if res.ok:
+                render_sync.write_local(os.path.join(data_dir, fname), res.json())
+                ok += 1
+        except Exception:
+            pass
+    return len(render_sync.RENDER_FILES) - ok
+
+
+# -----------------------
+# 시나리오 (각각 실패 파일 수 반환)
+# -----------------------
+def sc_restore_serial(env):
+    return serial_restore(env.base, env.client_dir("c"))
+
+def sc_restore_concurrent(env):
+    return len(render_sync.restore_all(env.base, env.client_dir("c"))["failed"])
+
+def sc_restore_sync(env):
+    state = render_sync.SyncState()
+    return len(render_sync.sync(env.base, env.client_dir("c"), state)["failed"])
+
+def sc_probe_warm(env):
+    """시작 복원 이후 새 세션의 버전 확인 (변경 없음) — 두 번째 호출만 측정"""
+    state, session = render_sync.SyncState(), render_sync.make_session()
+    render_sync.sync(env.base, env.client_dir("c"), state, session=session)
+    t0 = time.perf_counter()
+    failed = len(render_sync.sync(env.base, env.client_dir("c"), state, session=session, force=True)["failed"])
+    return failed, time.perf_counter() - t0
+
+def sc_save_orders_serial(env):
+    """순번표 저장: 이전 방식 (파일 4개 순차 POST)"""
+    return sum(not render_sync.upload(env.base, f, SEED[f])[0] for f in ORDER_FILES)
+
+def sc_save_orders_batch(env):
+    """순번표 저장: upload_many (/sync 지원 시 요청 1번)"""
+    res = render_sync.upload_many(env.base, {f: SEED[f] for f in ORDER_FILES}, state=render_sync.SyncState())
+    return sum(not ok for ok, _ in res.values())
+
+def sc_save_orders_queued(env):
+    """순번표 저장: 대기열 등록 → UI 반환 시간만 측정 (전송은 백그라운드)"""
+    state, session = render_sync.SyncState(), render_sync.make_session()
+    q = render_sync.UploadQueue(lambda items: render_sync.upload_many(env.base, items, session=session, state=state),
+                                base_delay=0.05)
+    t0 = time.perf_counter()
+    q.put_many({f: SEED[f] for f in ORDER_FILES})
+    took = time.perf_counter() - t0
+    q.flush(timeout=60)
+    return len(q.status()["failed"]), took
+
+def sc_handoff(env):
+    """오전 저장(대기열) → 오후 다른 기기가 새 오전결과.json 을 받을 때까지"""
+    session = render_sync.make_session()
+    am_state, pm_state = render_sync.SyncState(), render_sync.SyncState()
+    pm_dir = env.client_dir("pm")
+    render_sync.sync(env.base, pm_dir, pm_state, session=session, files=["오전결과.json"])
+    stamp = datetime.now().strftime("%y.%m.%d %H:%M:%S.%f")
+    q = render_sync.UploadQueue(lambda items: render_sync.upload_many(env.base, items, session=session, state=am_state),
+                                base_delay=0.05)
+    t0 = time.perf_counter()
+    q.put("오전결과.json", dict(SEED["오전결과.json"], timestamp=stamp))
+    deadline = t0 + 60
+    while time.perf_counter() < deadline:
+        render_sync.sync(env.base, pm_dir, pm_state, session=session, files=["오전결과.json"], force=True)
+        got = render_sync.local_hash(os.path.join(pm_dir, "오전결과.json"))
+        if got == render_sync.content_hash(dict(SEED["오전결과.json"], timestamp=stamp)):
+            return 0, time.perf_counter() - t0
+    return 1, time.perf_counter() - t0
+
+SCENARIOS = [
+    ("restore / 순차 GET (이전)", sc_restore_serial),
+    ("restore / 동시 GET", sc_restore_concurrent),
+    ("restore / sync()", sc_restore_sync),
+    ("probe / 새 세션 버전 확인", sc_probe_warm),
+    ("save 순번표 / 순차 POST (이전)", sc_save_orders_serial),
+    ("save 순번표 / upload_many", sc_save_orders_batch),
+    ("save 순번표 / 대기열 반환", sc_save_orders_queued),
+    ("handoff 오전→오후", sc_handoff),
+]
+
+
+# -----------------------
+# 실행
+# -----------------------
+def run(args):
+    rows = []
+    for label, fn in SCENARIOS:
+        if args.only and not any(k in label for k in args.only):
+            continue
+        times, fails, reqs = [], [], []
+        for _ in range(args.repeat):
+            env = Env(args)
+            try:
+                t0 = time.perf_counter()
+                out = fn(env)
+                took = time.perf_counter() - t0
+                if isinstance(out, tuple):
+                    out, took = out
+                times.append(took)
+                fails.append(out)
+                reqs.append(env.faults.requests)
+            finally:
+                env.close()
+        rows.append({
+            "scenario": label,
+            "median_ms": statistics.median(times) * 1000,
+            "min_ms": min(times) * 1000,
+            "max_ms": max(times) * 1000,
+            "failed": statistics.mean(fails),
+            "requests": statistics.mean(reqs),
+        })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render 동기화 지연 벤치마크")
+    json_server.add_fault_args(ap)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", nargs="*", help="시나리오 이름 일부 (예: restore save)")
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args()
+
+    rows = run(args)
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+    print(f"latency={args.latency}s jitter={args.jitter}s cold_start={args.cold_start}s "
+          f"fail_rate={args.fail_rate} sync={'off' if args.no_sync else 'on'} repeat={args.repeat}")
+    print(f"{'scenario':<32}{'median':>10}{'min':>10}{'max':>10}{'failed':>8}{'reqs':>7}")
+    for r in rows:
+        print(f"{r['scenario']:<32}{r['median_ms']:>8.0f}ms{r['min_ms']:>8.0f}ms{r['max_ms']:>8.0f}ms"
+              f"{r['failed']:>8.1f}{r['requests']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
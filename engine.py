@@ -0,0 +1,389 @@
+# =====================================
+# engine.py — 오전/오후 근무 배정 엔진 (Streamlit 비의존)
+# =====================================
+# 열쇠 순번, 교양 1~5교시, 1종 수동, 1종 자동, 2종 자동, 마감 차량, 오전 대비 비교를
+# Roster + 하루 입력(dict) → 결과(dict) 순수 함수로 계산한다. 앱과 CLI 가 같이 쓴다.
+#
+# CLI 예)
+#   python engine.py morning --names 김남균 이호석 김지은 --excluded 안유미
+#   python engine.py afternoon --names-file 오후.txt --json
+#   python engine.py morning --names-file 오전.txt --save          # 오전결과 저장 (data/roadvision.db)
+#   python engine.py afternoon --names-file 오후.txt --save --upload # 저장 + Render 업로드
+# 설정과 전일근무 / 오전결과는 앱과 같은 로컬 저장소(store.py)에서 읽고 쓴다.
+import argparse, json, os, sys
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+
+import roster
+from name_match import normalize_name
+from roster import car_num_key
+
+@lru_cache(maxsize=None)
+def kst():
+    """한국 시간대 (zoneinfo 는 처음 쓸 때 불러온다 — 앱 시작 시간 절약)"""
+    from zoneinfo import ZoneInfo
+    return ZoneInfo("Asia/Seoul")
+
+
+# -----------------------
+# 교양 시간 제한 규칙
+# -----------------------
+def can_attend_period_morning(name_pure, period, late_list):
+    tmap = {1: 9.0, 2: 10.5}
+    nn = normalize_name(name_pure)
+    for e in late_list or []:
+        if normalize_name(e.get("name","")) == nn:
+            t = e.get("time", 99) or 99
+            try: t = float(t)
+            except: t = 99
+            return t <= tmap[period]
+    return True
+
+def can_attend_period_afternoon(name_pure, period, early_list):
+    tmap = {3: 13.0, 4: 14.5, 5: 16.0}
+    nn = normalize_name(name_pure)
+    for e in early_list or []:
+        if normalize_name(e.get("name","")) == nn:
+            t = e.get("time", 0)
+            try: t = float(t)
+            except: t = 0
+            return t > tmap[period]
+    return True
+
+
+# -----------------------
+# 날짜 헤더 / 아침 열쇠
+# -----------------------
+def result_header(period_label, now=None):
+    dt = now or datetime.now(kst())
+    yoil = "월화수목금토일"[dt.weekday()]
+    return f"{dt.strftime('%y.%m.%d')}({yoil}) {period_label} 교양순서 및 차량배정"
+
+def active_morning_keys(entries, today):
+    """아침열쇠.json (단일 dict 또는 기간별 목록) 중 오늘 해당하는 이름"""
+    if isinstance(entries, Mapping):
+        entries = [entries] if entries.get("name") else []
+    actives = []
+    for row in entries or []:
+        nm = (row or {}).get("name","").strip()
+        try:
+            s = datetime.fromisoformat((row or {}).get("start","1900-01-01")).date()
+            e = datetime.fromisoformat((row or {}).get("end","2999-12-31")).date()
+        except Exception:
+            s, e = today, today
+        if nm and s <= today <= e:
+            actives.append(nm)
+    return actives
+
+
+# -----------------------
+# 오전
+# -----------------------
+# day = {
+#   "names": [오전 근무자], "excluded": [근무 제외자], "key_excluded": [열쇠만 제외 (아침열쇠 담당)],
+#   "late_start": [{"name", "time"}], "course_records": [{"name", "course", "result"}],
+#   "sudong_count": 1 | 2,
+#   "prev": {"열쇠", "교양_5교시", "1종수동", "1종자동", "순번위치"}   # 전일근무.json
+# }
+def assign_morning(R, day, now=None):
+    """오전 배정 → 결과 dict (record: 오전결과.json 내용, text: 결과 문구)"""
+    names = list(day.get("names") or [])
+    excluded = {normalize_name(x) for x in day.get("excluded") or []}
+    key_excluded = excluded | {normalize_name(x) for x in day.get("key_excluded") or []}
+    late_start = day.get("late_start") or []
+    sudong_count = day.get("sudong_count", 1)
+    prev = day.get("prev") or {}
+    prev_pos = prev.get("순번위치") or {}
+    prev_gyoyang5, prev_sudong = prev.get("교양_5교시", ""), prev.get("1종수동", "")
+    m_norms = {normalize_name(x) for x in names} - excluded
+
+    # 🔑 열쇠 — 열쇠순번자 중에서 제외자만 빼고 순번 순환 (전일 담당자가 순번표에 없으면 처음부터)
+    key_cur = roster.RotationCursor(R.rot_key, prev.get("열쇠", ""), prev_pos.get("열쇠"))
+    today_key = key_cur.advance(ok=lambda nm: normalize_name(nm) not in key_excluded) or ""
+
+    # 🧑‍🏫 교양 1·2교시
+    gy_prev = roster.RotationCursor(R.rot_gyoyang, prev_gyoyang5, prev_pos.get("교양"))
+    gy_cur = gy_prev.copy()
+    gy1 = gy_cur.advance(m_norms)
+    if gy1 and not can_attend_period_morning(gy1, 1, late_start):
+        gy1 = gy_cur.advance(m_norms)
+    used_norm = {normalize_name(gy1)} if gy1 else set()
+    gy2 = gy_cur.advance(m_norms - used_norm)
+    gy_base = gy_cur if gy2 else gy_prev
+
+    # 🚚 1종 수동
+    sud_cur = roster.RotationCursor(R.rot_sudong, prev_sudong, prev_pos.get("1종수동"))
+    sud_m = []
+    for _ in range(sudong_count):
+        pick = sud_cur.advance(m_norms - {normalize_name(x) for x in sud_m})
+        if not pick: break
+        sud_m.append(pick)
+
+    # 🚗 2종 자동(사람)
+    sud_norms = {normalize_name(x) for x in sud_m}
+    auto_m = [x for x in names if normalize_name(x) in (m_norms - sud_norms)]
+
+    # 🔄 1종 자동 차량 순번 (하루 1회)
+    a1_cur = roster.RotationCursor(R.rot_auto1, prev.get("1종자동", ""), prev_pos.get("1종자동"))
+    today_auto1 = a1_cur.advance() or ""
+
+    res = {
+        "today_key": today_key, "gy1": gy1, "gy2": gy2, "sud_m": sud_m, "auto_m": auto_m,
+        "today_auto1": today_auto1, "sudong_count": sudong_count,
+        "course_records": day.get("course_records") or [],
+        "record": {
+            "assigned_cars_1": [c for c in map(R.car1, sud_m) if c],
+            "assigned_cars_2": [c for c in map(R.car2, auto_m) if c],
+            "auto_names": auto_m + sud_m,
+            "today_key": today_key,
+            "gy_base_for_pm": gy2 if gy2 else prev_gyoyang5,
+            "sud_base_for_pm": sud_m[-1] if sud_m else prev_sudong,
+            "today_auto1": today_auto1,
+            "pos": {
+                "열쇠": key_cur.index if today_key else None,
+                "교양": gy_base.index,
+                "1종수동": sud_cur.index,
+                "1종자동": a1_cur.index,
+            },
+        },
+    }
+    res["text"] = format_morning(R, res, now)
+    return res
+
+def format_morning(R, res, now=None):
+    lines = [result_header("오전", now), ""]
+    if res["today_key"]:
+        lines.append(f"열쇠: {res['today_key']}")
+        lines.append("")
+    gy1, gy2 = res["gy1"], res["gy2"]
+    if gy1: lines.append(f"1교시: {gy1}")
+    if gy2: lines.append(f"2교시: {gy2}")
+    if gy1 or gy2: lines.append("")
+    sud_m, sudong_count = res["sud_m"], res["sudong_count"]
+    if sud_m:
+        for nm in sud_m:
+            car = R.mark(R.car1(nm), "1종수동")
+            lines.append(f"1종수동: {car} {nm}" if car else f"1종수동: {nm}")
+        if sudong_count == 2 and len(sud_m) < 2:
+            lines.append("※ 수동 가능 인원이 1명입니다.")
+    else:
+        lines.append("1종수동: (배정자 없음)")
+        if sudong_count >= 1:
+            lines.append("※ 수동 가능 인원이 0명입니다.")
+
+    if res["today_auto1"]:
+        lines.append("")
+        lines.append(f"1종자동: {R.mark(res['today_auto1'], '1종자동')}")
+        lines.append("")
+
+    if res["auto_m"]:
+        lines.append("2종자동:")
+        for nm in res["auto_m"]:
+            car = R.mark(R.car2(nm), "2종자동")
+            lines.append(f" • {car} {nm}" if car else f" • {nm}")
+
+    # 코스점검
+    course_records = res["course_records"]
+    if course_records:
+        lines.append("")
+        lines.append(" 코스점검 :")
+        for c in ["A", "B"]:
+            passed = [r["name"] for r in course_records if r["course"] == f"{c}코스" and r["result"] == "합격"]
+            failed = [r["name"] for r in course_records if r["course"] == f"{c}코스" and r["result"] == "불합격"]
+            if passed: lines.append(f" • {c}코스 합격: {', '.join(passed)}")
+            if failed: lines.append(f" • {c}코스 불합격: {', '.join(failed)}")
+    return "\n".join(lines)
+
+
+# -----------------------
+# 오후
+# -----------------------
+# day = {
+#   "names": [오후 근무자], "excluded": [근무 제외자], "early_leave": [{"name", "time"}],
+#   "sudong_count": 1 | 2,
+#   "prev": 전일근무.json, "morning": 오전결과.json (없는 항목은 전일근무 기준)
+# }
+def assign_afternoon(R, day, now=None):
+    """오후 배정 → 결과 dict (record: 다음 날 전일근무.json 내용, text: 결과 문구)"""
+    names = list(day.get("names") or [])
+    excluded = {normalize_name(x) for x in day.get("excluded") or []}
+    early_leave = day.get("early_leave") or []
+    sudong_count = day.get("sudong_count", 1)
+    prev = day.get("prev") or {}
+    morning = day.get("morning") or {}
+    pos = morning.get("pos") or {}
+    a_norms = {normalize_name(x) for x in names} - excluded
+
+    today_key = morning.get("today_key", prev.get("열쇠", ""))
+    gy_base = morning.get("gy_base_for_pm", prev.get("교양_5교시", ""))
+    gy_start = gy_base or (R.gyoyang_order[0] if R.gyoyang_order else "")
+    sud_base = morning.get("sud_base_for_pm", prev.get("1종수동", ""))
+    today_auto1 = morning.get("today_auto1", "")
+
+    # 교양 3·4·5교시 (해당 교시 전에 조퇴하는 사람은 건너뜀, 가능한 사람이 없으면 비움)
+    used, gy = set(), {}
+    gy_cur = roster.RotationCursor(R.rot_gyoyang, gy_start, pos.get("교양"))
+    for period in [3,4,5]:
+        pick = gy_cur.advance(a_norms - used, ok=lambda nm: can_attend_period_afternoon(nm, period, early_leave))
+        if not pick: continue
+        gy[period] = pick
+        used.add(normalize_name(pick))
+
+    # 1종 수동
+    sud_cur = roster.RotationCursor(R.rot_sudong, sud_base, pos.get("1종수동"))
+    sud_a = []
+    for _ in range(sudong_count):
+        pick = sud_cur.advance(a_norms)
+        if not pick: break
+        sud_a.append(pick)
+
+    # 2종 자동(사람)
+    sud_a_norms = {normalize_name(x) for x in sud_a}
+    auto_a = [x for x in names if normalize_name(x) in (a_norms - sud_a_norms)]
+
+    # 🚫 마감 차량 (오전→오후)
+    am_c1, am_c2 = set(morning.get("assigned_cars_1", [])), set(morning.get("assigned_cars_2", []))
+    pm_c1 = {c for c in map(R.car1, sud_a) if c}
+    pm_c2 = {c for c in map(R.car2, auto_a) if c}
+    closed_1 = sorted([c for c in am_c1 if c and c not in pm_c1], key=car_num_key)
+    closed_2 = sorted([c for c in am_c2 if c and c not in pm_c2], key=car_num_key)
+
+    # 🔍 오전 대비 비교
+    morning_names = morning.get("auto_names", [])
+    afternoon_auto_names = set(auto_a)
+    missing = [nm for nm in dict.fromkeys(morning_names)
+               if normalize_name(nm) not in afternoon_auto_names and normalize_name(nm) not in sud_a_norms]
+    morning_norms = {normalize_name(y) for y in morning_names}
+    newly_joined = sorted([x for x in names if normalize_name(x) not in morning_norms])
+
+    # 오후에 배정된 사람이 없으면 오후 시작점(오전 마지막 배정, 없으면 전일)을 그대로 넘긴다.
+    # 빈 값을 남기면 다음 날 순번이 맨 처음부터 다시 시작된다.
+    gy_last = gy.get(5) or gy.get(4) or gy.get(3) or gy_base
+    sud_last = sud_a[-1] if sud_a else sud_base
+    auto1_last = today_auto1 or prev.get("1종자동", "")
+    res = {
+        "today_key": today_key, "gy3": gy.get(3), "gy4": gy.get(4), "gy5": gy.get(5),
+        "sud_a": sud_a, "auto_a": auto_a, "today_auto1": today_auto1,
+        "closed_1": closed_1, "closed_2": closed_2, "missing": missing, "newly_joined": newly_joined,
+        "record": {
+            "열쇠": today_key,
+            "교양_5교시": gy_last,
+            "1종수동": sud_last,
+            "1종자동": auto1_last,
+            "순번위치": {
+                "열쇠": R.rot_key.index_of(today_key, pos.get("열쇠")),
+                "교양": R.rot_gyoyang.index_of(gy_last, gy_cur.index),
+                "1종수동": R.rot_sudong.index_of(sud_last, sud_cur.index),
+                "1종자동": R.rot_auto1.index_of(auto1_last, pos.get("1종자동")),
+            },
+        },
+    }
+    res["text"] = format_afternoon(R, res, now)
+    return res
+
+def format_afternoon(R, res, now=None):
+    lines = [result_header("오후", now), ""]
+    if res["today_key"]:
+        lines.append(f"열쇠: {res['today_key']}")
+        lines.append("")
+    if res["gy3"]: lines.append(f"3교시: {res['gy3']}")
+    if res["gy4"]: lines.append(f"4교시: {res['gy4']}")
+    if res["gy5"]:
+        lines.append(f"5교시: {res['gy5']}")
+        lines.append("")
+
+    if res["sud_a"]:
+        for nm in res["sud_a"]:
+            car = R.mark(R.car1(nm), "1종수동")
+            lines.append(f"1종수동: {car} {nm}" if car else f"1종수동: {nm}")
+        lines.append("")
+
+    if res["today_auto1"]:
+        lines.append(f"1종자동: {R.mark(res['today_auto1'], '1종자동')}")
+        lines.append("")
+
+    if res["auto_a"]:
+        lines.append("2종자동:")
+        for nm in res["auto_a"]:
+            car = R.mark(R.car2(nm), "2종자동")
+            lines.append(f" • {car} {nm}" if car else f" • {nm}")
+
+    un1, un2 = res["closed_1"], res["closed_2"]
+    if un1 or un2:
+        lines.append("")
+        lines.append("🚫 마감 차량:")
+        if un1:
+            lines.append(" [1종 수동]")
+            for c in un1: lines.append(f"  • {c} 마감")
+        if un2:
+            lines.append(" [2종 자동]")
+            for c in un2: lines.append(f"  • {c} 마감")
+
+    lines.append("")
+    lines.append("🔍 오전 대비 비교:")
+    if res["missing"]:      lines.append(" • 제외 인원: " + ", ".join(res["missing"]))
+    if res["newly_joined"]: lines.append(" • 신규 인원: " + ", ".join(res["newly_joined"]))
+    return "\n".join(lines).strip()
+
+
+# -----------------------
+# CLI
+# -----------------------
+def _names(args):
+    names = list(args.names or [])
+    if args.names_file:
+        with open(args.names_file, "r", encoding="utf-8") as f:
+            names += [x.strip() for x in f if x.strip()]
+    return names
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="오전/오후 근무 배정 (Streamlit 없이)")
+    ap.add_argument("period", choices=["morning", "afternoon"])
+    ap.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                    help="로컬 저장소(roadvision.db)가 있는 data 폴더")
+    ap.add_argument("--names", nargs="*", help="근무자 이름")
+    ap.add_argument("--names-file", help="근무자 이름 파일 (한 줄에 한 명)")
+    ap.add_argument("--excluded", nargs="*", default=[], help="근무 제외자")
+    ap.add_argument("--sudong-count", type=int, choices=[1, 2], default=1)
+    ap.add_argument("--day", help="JSON 파일: late_start / early_leave / course_records 등 추가 입력")
+    ap.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    ap.add_argument("--save", action="store_true", help="오전결과 / 전일근무(+ 오후결과) 를 로컬 저장소에 저장")
+    ap.add_argument("--upload", action="store_true", help="저장한 파일을 Render 서버에 업로드 (RENDER_BASE)")
+    args = ap.parse_args(argv)
+
+    import render_sync, store
+    local = store.open_dir(args.data_dir)
+    data = local.get_many(list(roster.DATA_FILES.values()) + ["전일근무.json", "아침열쇠.json", "오전결과.json"])
+    R = roster.from_files(data)
+    now = datetime.now(kst())
+    day = dict(render_sync.read_local(args.day, {}))
+    day.update(names=_names(args), excluded=args.excluded, sudong_count=args.sudong_count,
+               prev=data.get("전일근무.json") or {})
+    stamp = now.strftime("%y.%m.%d %H:%M")
+    if args.period == "morning":
+        day["key_excluded"] = active_morning_keys(data.get("아침열쇠.json") or [], now.date())
+        res = assign_morning(R, day, now)
+        fname = "오전결과.json"
+        saves = {}
+    else:
+        day["morning"] = data.get("오전결과.json") or {}
+        res = assign_afternoon(R, day, now)
+        fname = "전일근무.json"
+        saves = {"오후결과.json": {"timestamp": stamp}}   # 앱과 같이 오후 생성 시각도 함께
+    record = dict(res["record"], timestamp=stamp)
+
+    if args.save:
+        local.put_many(dict(saves, **{fname: record}))
+    if args.upload:
+        ok, err = render_sync.upload_many(render_sync.base_url(), {fname: record})[fname]
+        if not ok:
+            print(f"업로드 실패: {err}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(dict(res, record=record), ensure_ascii=False, indent=2))
+    else:
+        print(res["text"])
+
+
+if __name__ == "__main__":
+    main()
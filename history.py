@@ -0,0 +1,313 @@
+# =====================================
+# history.py — 배정 이력 저장소 (추가 전용, 월별 JSONL, Streamlit 비의존)
+# =====================================
+# data/history/YYYY-MM.jsonl 에 배정 한 건을 역할별 행으로 덧붙인다 (수정/삭제 없음).
+#   {"date": "2026-10-17", "period": "오전"|"오후", "role": "열쇠"|"1교시"..."5교시"|"1종수동"|"1종자동"|"2종자동"|"마감",
+#    "name": 근무자, "car": 차량, "run": 생성 시각(마이크로초)-임의 8자리, run_id()}
+# 같은 날 같은 시간대를 다시 생성하면 마지막 run 만 유효하다 (이전 행은 파일에 남지만 조회에서 빠짐).
+#
+# 조회
+#   - 날짜: 월별 파일 단위로 범위 밖은 읽지 않음
+#   - 사람 / 차량: 월별 역색인 (이름 → 행, 차량 → 행)
+#   - 파일은 덧붙이기만 하므로 마지막으로 읽은 위치 이후만 다시 읽는다
+#   - 사람/차량별 횟수(Tally)는 새로 읽은 행만 더해서 갱신한다 (전체 재계산 없음)
+# pandas 는 표를 만들 때만 import 한다 (앱 시작 시간 절약)
+import json, os, threading, uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from roster import car_num_key
+
+COLUMNS = ["date", "period", "role", "name", "car", "run"]
+
+
+# -----------------------
+# 배정 결과 → 이력 행
+# -----------------------
+def morning_rows(R, day, res, run):
+    """engine.assign_morning 결과 → 행 목록"""
+    rows = []
+    add = lambda role, name="", car="": rows.append(
+        {"date": str(day), "period": "오전", "role": role, "name": name, "car": car, "run": run})
+    if res["today_key"]: add("열쇠", res["today_key"])
+    if res["gy1"]: add("1교시", res["gy1"])
+    if res["gy2"]: add("2교시", res["gy2"])
+    for nm in res["sud_m"]: add("1종수동", nm, R.car1(nm))
+    if res["today_auto1"]: add("1종자동", car=res["today_auto1"])
+    for nm in res["auto_m"]: add("2종자동", nm, R.car2(nm))
+    return rows
+
+def afternoon_rows(R, day, res, run):
+    """engine.assign_afternoon 결과 → 행 목록 (마감 차량 포함, 열쇠/1종자동은 하루 1회라 오전 행에만)"""
+    rows = []
+    add = lambda role, name="", car="": rows.append(
+        {"date": str(day), "period": "오후", "role": role, "name": name, "car": car, "run": run})
+    for p in ("gy3", "gy4", "gy5"):
+        if res[p]: add(f"{p[2]}교시", res[p])
+    for nm in res["sud_a"]: add("1종수동", nm, R.car1(nm))
+    for nm in res["auto_a"]: add("2종자동", nm, R.car2(nm))
+    for c in res["closed_1"] + res["closed_2"]: add("마감", car=c)
+    return rows
+
+
+# -----------------------
+# 횟수 집계 (증분)
+# -----------------------
+class Tally:
+    """
+    반나절(날짜, 오전/오후)별 횟수 + 전체 합계.
+    키: ("name", 이름, 역할) / ("car", 차량, 역할)
+    같은 반나절의 새 run 이 들어오면 이전 run 몫을 빼고 새 몫을 더한다.
+    """
+
+    def __init__(self):
+        self.halves = {}      # (date, period) → (run, Counter)
+        self.total = Counter()
+
+    @staticmethod
+    def _keys(rows):
+        c = Counter()
+        for r in rows:
+            if r.get("name"): c[("name", r["name"], r["role"])] += 1
+            if r.get("car"): c[("car", r["car"], r["role"])] += 1
+        return c
+
+    def add(self, rows):
+        groups = {}
+        for r in rows:
+            groups.setdefault((r["date"], r["period"], r.get("run", "")), []).append(r)
+        for (d, period, run), rs in groups.items():
+            prev_run, prev = self.halves.get((d, period), ("", None))
+            if prev is not None and run < prev_run:
+                continue
+            if prev is not None and run == prev_run:
+                new = prev + self._keys(rs)
+            else:
+                new = self._keys(rs)
+            if prev is not None:
+                self.total.subtract(prev)
+            self.total.update(new)
+            self.halves[(d, period)] = (run, new)
+        self.total = +self.total   # 0 이하 제거
+
+    def counts(self, start=None, end=None):
+        """기간 합계 Counter (start/end 없으면 전체 합계를 그대로)"""
+        if not start and not end:
+            return Counter(self.total)
+        lo = date.fromisoformat(str(start)[:10]) if start else None
+        hi = date.fromisoformat(str(end)[:10]) if end else None
+        out = Counter()
+        # 기간이 열려 있거나 저장된 반나절 수보다 길면 저장된 것만 훑는다
+        if lo is None or hi is None or (hi - lo).days * 2 > len(self.halves):
+            for (d, _), (_, c) in self.halves.items():
+                if (lo is None or str(lo) <= d) and (hi is None or d <= str(hi)):
+                    out.update(c)
+            return out
+        d = lo
+        while d <= hi:
+            for period in ("오전", "오후"):
+                hit = self.halves.get((str(d), period))
+                if hit: out.update(hit[1])
+            d += timedelta(days=1)
+        return out
+
+
+# -----------------------
+# 저장소
+# -----------------------
+class _Partition:
+    """월별 파일 하나: 읽은 위치 + 유효 행 + 역색인"""
+
+    def __init__(self, path, tally=None):
+        self.path = path
+        self.tally = tally
+        self.offset = 0
+        self.raw = []        # 파일의 모든 행 (run 포함)
+        self.rows = []       # 유효 행 (같은 날짜/시간대의 마지막 run)
+        self.by_name = {}
+        self.by_car = {}
+        self.frame = None
+
+    def refresh(self):
+        """파일에 새로 덧붙은 줄만 읽는다. 바뀌었으면 True"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        if size == self.offset:
+            return False
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b"\n") + 1   # 쓰는 중인 마지막 줄은 다음에
+        if not end:
+            return False
+        new = [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+        self.raw.extend(new)
+        if self.tally is not None:
+            self.tally.add(new)
+        self.offset += end
+        self._reindex()
+        return True
+
+    def _reindex(self):
+        latest = {}
+        for r in self.raw:
+            k = (r["date"], r["period"])
+            latest[k] = max(latest.get(k, ""), r.get("run", ""))
+        self.rows = [r for r in self.raw if r.get("run", "") == latest[(r["date"], r["period"])]]
+        self.by_name, self.by_car = {}, {}
+        for i, r in enumerate(self.rows):
+            if r.get("name"): self.by_name.setdefault(r["name"], []).append(i)
+            if r.get("car"): self.by_car.setdefault(r["car"], []).append(i)
+        self.frame = None
+
+    def df(self):
+        if self.frame is None:
+            import pandas as pd
+            self.frame = pd.DataFrame(self.rows, columns=COLUMNS)
+        return self.frame
+
+
+class HistoryStore:
+    """배정 이력 (월별 JSONL). 여러 세션/스레드가 같이 써도 된다"""
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.parts = {}
+        self.tally = Tally()
+        os.makedirs(root, exist_ok=True)
+
+    def _months(self, start=None, end=None):
+        lo = str(start)[:7] if start else ""
+        hi = str(end)[:7] if end else "9999-99"
+        months = sorted(f[:-6] for f in os.listdir(self.root) if f.endswith(".jsonl"))
+        return [m for m in months if lo <= m <= hi]
+
+    def _part(self, month):
+        p = self.parts.get(month)
+        if p is None:
+            p = self.parts[month] = _Partition(os.path.join(self.root, f"{month}.jsonl"), self.tally)
+        p.refresh()
+        return p
+
+    def append(self, rows):
+        """행 덧붙이기 (월별 파일, 한 번의 write)"""
+        by_month = {}
+        for r in rows or []:
+            by_month.setdefault(str(r["date"])[:7], []).append(r)
+        with self.lock:
+            for month, rs in by_month.items():
+                data = "".join(json.dumps({k: r.get(k, "") for k in COLUMNS}, ensure_ascii=False) + "\n" for r in rs)
+                with open(os.path.join(self.root, f"{month}.jsonl"), "a", encoding="utf-8") as f:
+                    f.write(data)
+
+    def _select(self, start=None, end=None, name=None, car=None, role=None, period=None):
+        """조건에 맞는 유효 행 (날짜 오름차순)"""
+        lo, hi = str(start or ""), str(end or "9999-99-99")
+        out = []
+        with self.lock:
+            for month in self._months(start, end):
+                p = self._part(month)
+                if name is not None:
+                    idx = p.by_name.get(name, ())
+                    if car is not None:
+                        idx = sorted(set(idx) & set(p.by_car.get(car, ())))
+                elif car is not None:
+                    idx = p.by_car.get(car, ())
+                else:
+                    idx = range(len(p.rows))
+                for i in idx:
+                    r = p.rows[i]
+                    if lo <= r["date"] <= hi and (role is None or r["role"] == role) \
+                            and (period is None or r["period"] == period):
+                        out.append(r)
+        out.sort(key=lambda r: (r["date"], r["period"]))
+        return out
+
+    def count(self, **where):
+        """예) count(name="김남균", role="5교시", start="2026-07-01", end="2026-09-30")"""
+        return len(self._select(**where))
+
+    def last(self, **where):
+        """조건에 맞는 가장 최근 행 (없으면 None). 예) last(car="7호", role="마감")"""
+        rows = self._select(**where)
+        return rows[-1] if rows else None
+
+    def counts(self, start=None, end=None):
+        """
+        사람/차량별 횟수 Counter {("name"|"car", 이름|차량, 역할): 횟수}.
+        처음 한 번만 전체 파일을 읽고, 이후에는 새로 덧붙은 행만 더한다.
+        """
+        with self.lock:
+            for m in self._months():
+                self._part(m)
+            return self.tally.counts(start, end)
+
+    def frame(self, start=None, end=None):
+        """유효 행 DataFrame (월별 캐시를 이어 붙이고 날짜 범위로 자른다)"""
+        import pandas as pd
+        with self.lock:
+            frames = [self._part(m).df() for m in self._months(start, end)]
+        if not frames:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(frames, ignore_index=True)
+        if start: df = df[df["date"] >= str(start)]
+        if end: df = df[df["date"] <= str(end)]
+        return df.reset_index(drop=True)
+
+
+ROLE_COLUMNS = ["열쇠", "1교시", "2교시", "3교시", "4교시", "5교시", "1종수동", "2종자동"]
+
+def person_table(counts, people=None):
+    """Tally 결과 → 사람 × 역할 DataFrame (교양 합계 포함). people 을 주면 0회인 사람도 행으로"""
+    import pandas as pd
+    data = {}
+    for (kind, who, role), n in counts.items():
+        if kind == "name" and role in ROLE_COLUMNS:
+            data.setdefault(who, {})[role] = n
+    for p in people or ():
+        data.setdefault(p, {})
+    df = pd.DataFrame.from_dict(data, orient="index", columns=ROLE_COLUMNS).fillna(0).astype(int)
+    df.insert(1, "교양", df[["1교시", "2교시", "3교시", "4교시", "5교시"]].sum(axis=1))
+    return df.sort_index()
+
+def car_table(counts):
+    """Tally 결과 → 차량 × 역할(1종수동/1종자동/2종자동/마감) DataFrame"""
+    import pandas as pd
+    data = {}
+    for (kind, who, role), n in counts.items():
+        if kind == "car":
+            data.setdefault(who, {})[role] = n
+    df = pd.DataFrame.from_dict(data, orient="index", columns=["1종수동", "1종자동", "2종자동", "마감"]).fillna(0).astype(int)
+    return df.loc[sorted(df.index, key=car_num_key)]
+
+def run_id(now=None):
+    """생성 시각(마이크로초) + 임의 8자리. 같은 초에 두 번 생성해도 겹치지 않고, 문자열 순서 = 시각 순서"""
+    return (now or datetime.now()).isoformat(timespec="microseconds") + "-" + uuid.uuid4().hex[:8]
+
+
+# -----------------------
+# CLI
+# -----------------------
+# python history.py --name 김남균 --role 5교시 --start 2026-07-01 --end 2026-09-30
+# python history.py --car 7호 --role 마감 --last
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="배정 이력 조회")
+    ap.add_argument("--root", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "history"))
+    ap.add_argument("--name"); ap.add_argument("--car"); ap.add_argument("--role"); ap.add_argument("--period")
+    ap.add_argument("--start"); ap.add_argument("--end")
+    ap.add_argument("--last", action="store_true", help="가장 최근 한 건")
+    args = ap.parse_args(argv)
+    store = HistoryStore(args.root)
+    where = dict(name=args.name, car=args.car, role=args.role, period=args.period, start=args.start, end=args.end)
+    if args.last:
+        print(json.dumps(store.last(**where), ensure_ascii=False))
+    else:
+        print(store.count(**where))
+
+
+if __name__ == "__main__":
+    main()
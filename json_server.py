@@ -0,0 +1,218 @@
+# =====================================
+# json_server.py — Render JSON 서버 참조 구현 (표준 라이브러리만 사용)
+# =====================================
+# 엔드포인트
+#   POST /upload              {"filename", "content"}            → {"ok": true, "hash"}
+#   GET  /download/<filename>  (ETag = 내용 해시, If-None-Match → 304)
+#   POST /sync                {"have": {fname: hash|null}, "put": {fname: content}}
+#                             → {"changed": {fname: content}, "hashes": {fname: hash}, "missing": [fname]}
+#     - put 의 파일을 먼저 저장한 뒤, have 의 각 파일 중 서버 해시와 다른 것만 changed 로 돌려준다.
+#     - 한 번의 요청으로 변경분 복원 + 다중 파일 저장을 처리한다.
+#
+# 장애 주입 (벤치마크 / 회귀 확인용)
+#   --latency 0.2 --jitter 0.05   요청마다 지연
+#   --cold-start 8 --idle 900     첫 요청(또는 idle 초 이상 쉰 뒤 첫 요청)에 추가 지연
+#   --fail-rate 0.1               일정 비율로 503 응답
+#   --no-sync                     /sync 미지원 서버 흉내 (404)
+#
+# 실행: python json_server.py --port 8765 --data-dir ./server_data
+import argparse, gzip, json, os, random, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from render_sync import content_hash
+
+_SAFE_NAME = re.compile(r"^[^/\\]+\.json$")
+
+
+class JsonStore:
+    """디렉터리 기반 JSON 저장소 + 메모리 해시 캐시"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.lock = threading.Lock()
+        self.hashes = {}
+        os.makedirs(data_dir, exist_ok=True)
+
+    def _path(self, filename):
+        if not _SAFE_NAME.match(filename or "") or filename.startswith("."):
+            raise ValueError(f"잘못된 파일명: {filename!r}")
+        return os.path.join(self.data_dir, filename)
+
+    def get(self, filename):
+        """→ (content, hash). 없으면 (None, None)"""
+        path = self._path(filename)
+        with self.lock:
+            if not os.path.exists(path):
+                return None, None
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            h = self.hashes.get(filename) or content_hash(data)
+            self.hashes[filename] = h
+            return data, h
+
+    def put(self, filename, data):
+        path = self._path(filename)
+        tmp = path + ".tmp"
+        with self.lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+            self.hashes[filename] = content_hash(data)
+            return self.hashes[filename]
+
+    def sync(self, have, put):
+        hashes = {fname: self.put(fname, data) for fname, data in (put or {}).items()}
+        changed, missing = {}, []
+        for fname, client_hash in (have or {}).items():
+            data, h = self.get(fname)
+            if h is None:
+                missing.append(fname)
+                continue
+            hashes[fname] = h
+            if h != client_hash:
+                changed[fname] = data
+        return {"changed": changed, "hashes": hashes, "missing": missing}
+
+
+class Faults:
+    """요청 지연 / 콜드 스타트 / 실패 주입"""
+
+    def __init__(self, latency=0.0, jitter=0.0, cold_start=0.0, idle=None, fail_rate=0.0, bulk=True, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.cold_start = cold_start
+        self.idle = idle
+        self.fail_rate = fail_rate
+        self.bulk = bulk
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.warm_until = None   # 콜드 스타트 완료 시각 (None = 아직 잠듦)
+        self.last_request = None
+        self.requests = 0
+
+    def before_request(self):
+        """지연을 적용하고, 실패시킬 요청이면 True"""
+        with self.lock:
+            now = time.monotonic()
+            self.requests += 1
+            if self.idle is not None and self.last_request is not None and now - self.last_request > self.idle:
+                self.warm_until = None
+            if self.warm_until is None:
+                self.warm_until = now + self.cold_start
+            self.last_request = now
+            wait_cold = max(0.0, self.warm_until - now)
+            delay = wait_cold + max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.fail_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+
+class Handler(BaseHTTPRequestHandler):
+    store = None
+    faults = None
+    protocol_version = "HTTP/1.1"
+
+    def _faulted(self):
+        if self.faults and self.faults.before_request():
+            self._send_json(503, {"error": "injected failure"})
+            return True
+        return False
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, obj, headers=None):
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(body) > 1024 and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        return json.loads(raw or b"{}")
+
+    def do_GET(self):
+        if self._faulted():
+            return
+        if not self.path.startswith("/download/"):
+            return self._send_json(404, {"error": "not found"})
+        try:
+            data, h = self.store.get(unquote(self.path[len("/download/"):]))
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        if h is None:
+            return self._send_json(404, {"error": "not found"})
+        etag = f'"{h}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, data, {"ETag": etag})
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+            if self._faulted():
+                return
+            if self.path == "/upload":
+                h = self.store.put(body["filename"], body["content"])
+                return self._send_json(200, {"ok": True, "hash": h})
+            if self.path == "/sync" and (self.faults is None or self.faults.bulk):
+                return self._send_json(200, self.store.sync(body.get("have"), body.get("put")))
+        except (ValueError, KeyError) as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(404, {"error": "not found"})
+
+
+def make_server(host="127.0.0.1", port=8765, data_dir="server_data", faults=None):
+    handler = type("BoundHandler", (Handler,), {"store": JsonStore(data_dir), "faults": faults})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def add_fault_args(ap):
+    ap.add_argument("--latency", type=float, default=0.0, help="요청당 지연(초)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="지연 편차(초)")
+    ap.add_argument("--cold-start", type=float, default=0.0, help="콜드 스타트 지연(초)")
+    ap.add_argument("--idle", type=float, default=None, help="이 시간(초) 이상 요청이 없으면 다시 콜드 스타트")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="503 응답 비율 (0~1)")
+    ap.add_argument("--no-sync", action="store_true", help="/sync 미지원 서버로 동작")
+    ap.add_argument("--seed", type=int, default=None)
+
+
+def faults_from_args(args):
+    return Faults(latency=args.latency, jitter=args.jitter, cold_start=args.cold_start, idle=args.idle,
+                  fail_rate=args.fail_rate, bulk=not args.no_sync, seed=args.seed)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render JSON 서버 참조 구현")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--data-dir", default="server_data")
+    add_fault_args(ap)
+    args = ap.parse_args()
+    server = make_server(args.host, args.port, args.data_dir, faults=faults_from_args(args))
+    print(f"JSON 서버: http://{args.host}:{server.server_address[1]} (data: {args.data_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
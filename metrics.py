@@ -0,0 +1,225 @@
+# =====================================
+# metrics.py — 구간 시간 / 카운터 / 재실행 trace (Streamlit 비의존)
+# =====================================
+# span("render_restore") 로 구간 시간을, count("render_bytes_in", n) 로 횟수·바이트를 모은다.
+#   - 구간별 최근 WINDOW 개 측정값으로 p50 / p95 를 계산한다 (프로세스 공용)
+#   - begin_trace() ~ end_trace() 사이에 같은 스레드(또는 bind() 로 넘긴 작업 스레드)에서
+#     기록된 구간/카운터는 재실행 1번의 trace 로 묶여 TraceLog(회전 JSONL) 에 남는다
+#   - prometheus(): Prometheus 텍스트 형식 (summary + counter), serve(port): /metrics 응답
+#
+# 구간 이름 (app / render_sync / store / ocr)
+#   rerun, render_restore, render_request, config_snapshot, ocr_preprocess, ocr_call, assign_morning, assign_afternoon
+import json, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+
+WINDOW = 500
+PREFIX = "roadvision"
+
+
+class Trace:
+    """재실행 1번의 기록 {"start", "meta", "spans": [[구간, ms]], "counters"}"""
+
+    def __init__(self, **meta):
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        self.meta = meta
+        self.spans = []
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def add_span(self, stage, seconds):
+        with self.lock:
+            self.spans.append([stage, round(seconds * 1000, 2)])
+
+    def add_count(self, name, n):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self, **extra):
+        with self.lock:
+            return dict(self.meta, start=round(self.start, 3), ms=round((time.perf_counter() - self.t0) * 1000, 2),
+                        spans=list(self.spans), counters=dict(self.counters), **extra)
+
+
+class Metrics:
+    """프로세스 공용 집계 (스레드 안전)"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {}    # 구간 → 최근 측정값(초) deque
+        self.totals = {}     # 구간 → [횟수, 합계(초)]  (창과 무관한 누적)
+        self.counters = {}
+        self.local = threading.local()
+
+    # ---- 기록
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+            t = self.totals.setdefault(stage, [0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            trace.add_span(stage, seconds)
+
+    @contextmanager
+    def span(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        trace = getattr(self.local, "trace", None)
+        if trace is not None:
+            trace.add_count(name, n)
+
+    # ---- 재실행 trace
+    def begin_trace(self, **meta):
+        """이 스레드의 새 trace 시작 → 끝내지 못한 이전 trace (st.rerun / st.stop 등) 가 있으면 반환"""
+        prev = getattr(self.local, "trace", None)
+        self.local.trace = Trace(**meta)
+        return prev.to_dict(interrupted=True) if prev is not None else None
+
+    def end_trace(self):
+        """이 스레드의 trace 종료 → dict (없으면 None)"""
+        trace = getattr(self.local, "trace", None)
+        self.local.trace = None
+        return trace.to_dict() if trace is not None else None
+
+    def bind(self, fn):
+        """fn 을 작업 스레드에서 실행해도 호출한 스레드의 trace 에 기록되게 감싼다"""
+        trace = getattr(self.local, "trace", None)
+
+        def run(*args, **kwargs):
+            prev = getattr(self.local, "trace", None)
+            self.local.trace = trace
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.local.trace = prev
+        return run
+
+    # ---- 조회
+    def summary(self):
+        """{"stages": {구간: {"count", "sum", "p50", "p95"}}, "counters": {...}}  (시간 단위: 초)"""
+        with self.lock:
+            stages = {}
+            for stage, q in self.samples.items():
+                vals = sorted(q)
+                count, total = self.totals[stage]
+                stages[stage] = {"count": count, "sum": total,
+                                 "p50": _quantile(vals, 0.5), "p95": _quantile(vals, 0.95)}
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def prometheus(self):
+        """Prometheus 텍스트 형식"""
+        s = self.summary()
+        name = f"{PREFIX}_stage_seconds"
+        out = [f"# HELP {name} 구간별 소요 시간 (최근 {self.window}개 기준 분위수)", f"# TYPE {name} summary"]
+        for stage, v in sorted(s["stages"].items()):
+            for q, label in (("p50", "0.5"), ("p95", "0.95")):
+                out.append(f'{name}{{stage="{stage}",quantile="{label}"}} {v[q]:.6f}')
+            out.append(f'{name}_sum{{stage="{stage}"}} {v["sum"]:.6f}')
+            out.append(f'{name}_count{{stage="{stage}"}} {v["count"]}')
+        for cname, n in sorted(s["counters"].items()):
+            out.append(f"# TYPE {PREFIX}_{cname}_total counter")
+            out.append(f"{PREFIX}_{cname}_total {n}")
+        return "\n".join(out) + "\n"
+
+
+def _quantile(sorted_vals, q):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(q * len(sorted_vals)))]
+
+
+# -----------------------
+# trace 파일 (회전 JSONL)
+# -----------------------
+class TraceLog:
+    """trace 를 한 줄씩 덧붙인다. max_bytes 를 넘으면 .1 → .2 … 로 밀어내고 backups 개만 남긴다"""
+
+    def __init__(self, path, max_bytes=1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, trace):
+        if not trace:
+            return
+        line = json.dumps(trace, ensure_ascii=False) + "\n"
+        with self.lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def tail(self, n=20):
+        """최근 trace n 개 (현재 파일만)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = deque(f, maxlen=n)
+        except FileNotFoundError:
+            return []
+        out = []
+        for line in lines:
+            try:
+                out.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+        return out
+
+
+# -----------------------
+# 기본 집계 (모듈 함수)
+# -----------------------
+REGISTRY = Metrics()
+span = REGISTRY.span
+count = REGISTRY.count
+observe = REGISTRY.observe
+begin_trace = REGISTRY.begin_trace
+end_trace = REGISTRY.end_trace
+bind = REGISTRY.bind
+summary = REGISTRY.summary
+prometheus = REGISTRY.prometheus
+
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """GET /metrics → Prometheus 텍스트 (백그라운드 스레드). 기본은 이 기기에서만 접속. 반환: 서버"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
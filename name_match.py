@@ -0,0 +1,141 @@
+# =====================================
+# name_match.py — 이름 정규화 / OCR 오타 보정 인덱스 (Streamlit 비의존)
+# =====================================
+import difflib, re
+from collections import Counter
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def normalize_name(s):
+    return re.sub(r"[^가-힣]", "", re.sub(r"\(.*?\)", "", s or ""))
+
+
+class NameMatcher:
+    """
+    근무자 목록 보정 인덱스. correct() 결과는 목록 전체를 difflib 로 훑는 방식과 같다.
+    - 정규화 이름은 한 번만 계산
+    - 정확히 같은 이름은 dict 조회로 바로 반환
+    - 글자(음절) 역색인으로 공통 글자가 있는 후보만 보고,
+      글자 다중집합 겹침으로 구한 유사도 상한(difflib quick_ratio 와 동일)이
+      cutoff 나 현재 최고점보다 낮은 후보는 SequenceMatcher 를 돌리지 않는다
+    - 입력별 결과 메모이즈
+    """
+
+    def __init__(self, employees):
+        self.employees = list(employees or [])
+        self.norms = [normalize_name(e) for e in self.employees]
+        self.counts = [Counter(n) for n in self.norms]
+        self.exact = {}
+        self.by_char = {}
+        for i, n in enumerate(self.norms):
+            self.exact.setdefault(n, i)
+            for ch in set(n):
+                self.by_char.setdefault(ch, []).append(i)
+        self.memo = {}
+
+    def correct(self, name, cutoff=0.6):
+        key = (name, cutoff)
+        if key not in self.memo:
+            if len(self.memo) >= 20000:
+                self.memo.clear()
+            self.memo[key] = self._correct(name, cutoff)
+        return self.memo[key]
+
+    def _correct(self, name, cutoff):
+        name_norm = normalize_name(name)
+        if not name_norm:
+            return name
+        # 같은 정규화 이름이 있으면 그 중 첫 후보가 점수 1.0 으로 최고점
+        i = self.exact.get(name_norm)
+        if i is not None:
+            return self.employees[i] if cutoff <= 1.0 else name
+
+        name_count = Counter(name_norm)
+        cands = sorted({i for ch in name_count for i in self.by_char.get(ch, ())})
+        best, best_score = None, 0.0
+        sm = difflib.SequenceMatcher()
+        sm.set_seq2(name_norm)
+        for i in cands:
+            cand_norm = self.norms[i]
+            overlap = sum((self.counts[i] & name_count).values())
+            bound = 2.0 * overlap / (len(cand_norm) + len(name_norm))
+            if bound < cutoff or bound <= best_score:
+                continue
+            sm.set_seq1(cand_norm)
+            score = sm.ratio()
+            if score > best_score:
+                best_score, best = score, self.employees[i]
+        return best if best and best_score >= cutoff else name
+
+
+@lru_cache(maxsize=8)
+def _matcher(employees):
+    return NameMatcher(employees)
+
+def matcher_for(employees):
+    """근무자 목록별 인덱스 (목록 내용이 바뀔 때만 새로 생성)"""
+    return _matcher(tuple(employees or ()))
+
+
+# -----------------------
+# 학습된 OCR 별칭 (오독 → 근무자)
+# -----------------------
+# aliases = {정규화된 OCR 결과: {"name": 근무자, "count": 확인 횟수, "last": "YYYY-MM-DD"}}
+def lookup_alias(aliases, name, employees):
+    """별칭 조회 (O(1)). 대상 근무자가 현재 목록에 없으면 None"""
+    hit = (aliases or {}).get(normalize_name(name))
+    if not hit:
+        return None
+    target = normalize_name(hit.get("name"))
+    m = matcher_for(employees)
+    i = m.exact.get(target)
+    return m.employees[i] if i is not None else None
+
+def learn_aliases(pairs, final_names, employees, min_ratio=0.3):
+    """
+    OCR 결과와 사용자가 확정한 명단을 비교해 별칭 후보를 만든다.
+    - pairs: [(OCR 원문, 자동 보정 결과)]
+    - 자동 보정이 그대로 확정된 경우: 원문 → 보정 결과
+    - 보정 결과가 지워지고 비슷한 근무자가 새로 들어온 경우: 원문 → 새 근무자
+    원문이 이미 실제 근무자 이름이면 학습하지 않는다 (결근 등으로 지운 경우).
+    반환: {정규화 원문: 근무자}
+    """
+    m = matcher_for(employees)
+    final_norms = {normalize_name(x) for x in final_names}
+    fixed_norms = {normalize_name(f) for _, f in pairs}
+    learned, removed = {}, []
+    for raw, fixed in pairs:
+        raw_n, fixed_n = normalize_name(raw), normalize_name(fixed)
+        if not raw_n or raw_n in m.exact:
+            continue
+        if fixed_n in final_norms:
+            if fixed_n != raw_n and fixed_n in m.exact:
+                learned[raw_n] = m.employees[m.exact[fixed_n]]
+        else:
+            removed.append(raw_n)
+    added = [normalize_name(x) for x in final_names]
+    added = [n for n in dict.fromkeys(added) if n and n not in fixed_norms and n in m.exact]
+    # 지워진 오독 ↔ 새로 들어온 근무자: 비슷한 쌍부터 하나씩 짝짓기
+    scored = sorted(((difflib.SequenceMatcher(None, a, r).ratio(), r, a) for r in removed for a in added
+                     if set(a) & set(r)), reverse=True)
+    used_r, used_a = set(), set()
+    for score, r, a in scored:
+        if score < min_ratio or r in used_r or a in used_a:
+            continue
+        learned[r] = m.employees[m.exact[a]]
+        used_r.add(r)
+        used_a.add(a)
+    return learned
+
+def merge_aliases(aliases, learned, today):
+    """학습 결과 반영 → (새 별칭 dict, 변경 여부)"""
+    out = {k: dict(v) for k, v in (aliases or {}).items()}
+    changed = False
+    for raw_n, name in learned.items():
+        prev = out.get(raw_n) or {}
+        same = prev.get("name") == name
+        if same and prev.get("last") == today:
+            continue   # 같은 날 반복 확인은 한 번만 센다
+        out[raw_n] = {"name": name, "count": (prev.get("count", 0) + 1) if same else 1, "last": today}
+        changed = True
+    return out, changed
@@ -0,0 +1,451 @@
+# =====================================
+# ocr.py — 근무표 OCR (전처리, 캐시, 구조화 출력, 백엔드 — Streamlit 비의존)
+# =====================================
+import base64, hashlib, io, json, os, re, threading, time
+
+import metrics, usage
+
+# PIL / openai 는 처음 인식할 때 import (앱 시작 시간 절약)
+
+# -----------------------
+# 전처리 (1회만 실행)
+# -----------------------
+# 비전 모델이 실제로 보는 해상도 — 이보다 큰 이미지는 서버에서 줄여지므로 미리 줄여 보낸다.
+#   high/auto: 2048×2048 안에 맞춘 뒤 짧은 변 768px,  low: 512×512 안
+DETAIL_BUDGET = {"high": (2048, 768), "auto": (2048, 768), "low": (512, 512)}
+
+def fit_size(w, h, detail="high"):
+    long_max, short_max = DETAIL_BUDGET.get(detail, DETAIL_BUDGET["high"])
+    scale = min(1.0, long_max / max(w, h), short_max / min(w, h))
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+def preprocess(img_bytes, detail="high", contrast=2.0, sharpen=True, grayscale=True, quality=85):
+    """
+    EXIF 회전 보정 → 해상도 예산까지 축소 → 대비/선명도 → JPEG.
+    반환: (jpeg_bytes, metrics)  metrics = bytes_in/bytes_out/size_in/size_out/ms
+    """
+    from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+    t0 = time.perf_counter()
+    img = Image.open(io.BytesIO(img_bytes))
+    size_in = img.size
+    if img.format == "JPEG":
+        # JPEG 는 디코딩 단계에서 1/2·1/4·1/8 로 줄여 읽기 (휴대폰 원본 디코딩 시간 절약)
+        img.draft("L" if grayscale else "RGB", fit_size(*img.size, detail=detail))
+    img = ImageOps.exif_transpose(img)
+    if (img.size[0] > img.size[1]) != (size_in[0] > size_in[1]):
+        size_in = size_in[::-1]   # EXIF 회전으로 가로/세로가 바뀐 경우
+    img = img.convert("L" if grayscale else "RGB")
+    size_out = fit_size(*img.size, detail=detail)
+    if size_out != img.size:
+        img = img.resize(size_out, Image.LANCZOS)
+    if contrast and contrast != 1.0:
+        img = ImageEnhance.Contrast(img).enhance(contrast)
+    if sharpen:
+        img = img.filter(ImageFilter.SHARPEN)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    data = out.getvalue()
+    return data, {
+        "bytes_in": len(img_bytes), "bytes_out": len(data),
+        "size_in": list(size_in), "size_out": list(size_out),
+        "detail": detail, "ms": (time.perf_counter() - t0) * 1000,
+    }
+
+# -----------------------
+# 이미지 지문
+# -----------------------
+def cache_key(img_bytes, *parts):
+    """원본 이미지 바이트 + 프롬프트/모델 버전 → 캐시 키"""
+    h = hashlib.sha256(img_bytes)
+    for p in parts:
+        h.update(b"\0" + str(p).encode("utf-8"))
+    return h.hexdigest()
+
+def dhash(img_bytes, size=16):
+    """차이 해시 (size*size 비트, 16진 문자열). 다시 찍은 같은 근무표 판별용"""
+    from PIL import Image
+    img = Image.open(io.BytesIO(img_bytes)).convert("L").resize((size + 1, size), Image.LANCZOS)
+    px = img.load()
+    bits = 0
+    for y in range(size):
+        for x in range(size):
+            bits = (bits << 1) | (px[x + 1, y] > px[x, y])
+    return f"{bits:0{size * size // 4}x}"
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+# -----------------------
+# 결과 캐시 (디스크, LRU)
+# -----------------------
+class OcrCache:
+    """
+    OCR 결과 디스크 캐시.
+    - 정확히 같은 이미지(+프롬프트/모델): 키 일치
+    - 다시 찍은 같은 근무표: similar_window 초 이내 항목 중 dHash 거리 similar_bits 이하
+      (양식이 같은 다른 날 근무표와 섞이지 않도록 최근 항목만, 엄격한 거리로 비교)
+    - max_entries / max_bytes 를 넘으면 가장 오래 안 쓴 항목부터 삭제
+    """
+
+    def __init__(self, cache_dir, max_entries=200, max_bytes=20 * 1024 * 1024,
+                 similar_bits=8, similar_window=12 * 3600):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similar_bits = similar_bits
+        self.similar_window = similar_window
+        self.lock = threading.Lock()
+        self.index = {}   # key -> {"phash", "variant", "created", "used", "size"}
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        for fn in os.listdir(self.cache_dir):
+            if not fn.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, fn)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self.index[meta["key"]] = {
+                    "phash": meta.get("phash"), "variant": meta.get("variant"),
+                    "created": meta.get("created", 0), "used": os.path.getmtime(path),
+                    "size": os.path.getsize(path),
+                }
+            except Exception:
+                continue
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)["result"]
+        except Exception:
+            self.index.pop(key, None)
+            return None
+
+    def _touch(self, key):
+        now = time.time()
+        self.index[key]["used"] = now
+        try:
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+
+    def get(self, key, phash=None, variant=None):
+        """→ (result, "exact"|"similar"|None)"""
+        with self.lock:
+            if key in self.index:
+                result = self._read(key)
+                if result is not None:
+                    self._touch(key)
+                    return result, "exact"
+            if phash:
+                now = time.time()
+                best, best_d = None, self.similar_bits + 1
+                for k, meta in self.index.items():
+                    if meta["variant"] != variant or not meta["phash"] or now - meta["created"] > self.similar_window:
+                        continue
+                    d = hamming(phash, meta["phash"])
+                    if d < best_d:
+                        best, best_d = k, d
+                if best:
+                    result = self._read(best)
+                    if result is not None:
+                        self._touch(best)
+                        return result, "similar"
+            return None, None
+
+    def put(self, key, result, phash=None, variant=None):
+        now = time.time()
+        entry = {"key": key, "phash": phash, "variant": variant, "created": now, "result": result}
+        with self.lock:
+            path = self._path(key)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self.index[key] = {"phash": phash, "variant": variant, "created": now, "used": now,
+                               "size": os.path.getsize(path)}
+            self._evict()
+
+    def _evict(self):
+        total = sum(m["size"] for m in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["used"]):
+            if len(self.index) <= self.max_entries and total <= self.max_bytes:
+                break
+            total -= self.index.pop(key)["size"]
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.index), "bytes": sum(m["size"] for m in self.index.values())}
+
+# -----------------------
+# 구조화 출력 (JSON 스키마 / 스트리밍 부분 파싱)
+# -----------------------
+_TIMED = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}, "time": {"type": "number"}},
+    "required": ["name", "time"],
+    "additionalProperties": False,
+}
+
+SHEET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "names": {"type": "array", "items": {"type": "string"}},
+        "course_records": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "course": {"type": "string", "enum": ["A", "B"]},
+                    "result": {"type": "string", "enum": ["합격", "불합격"]},
+                },
+                "required": ["name", "course", "result"],
+                "additionalProperties": False,
+            },
+        },
+        "excluded": {"type": "array", "items": {"type": "string"}},
+        "early_leave": {"type": "array", "items": _TIMED},
+        "late_start": {"type": "array", "items": _TIMED},
+    },
+    "required": ["names", "course_records", "excluded", "early_leave", "late_start"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "duty_sheet", "strict": True, "schema": SHEET_SCHEMA}}
+
+_STR_ITEM = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+def partial_lists(buf, keys=("names", "excluded")):
+    """
+    스트리밍 중인 JSON 문자열에서 문자열 배열 필드의 '완성된' 항목만 추출.
+    예) '{"names":["김성연","김병' → {"names": ["김성연"], "excluded": []}
+    """
+    out = {}
+    for key in keys:
+        m = re.search(r'"%s"\s*:\s*\[' % re.escape(key), buf)
+        items = []
+        if m:
+            rest = buf[m.end():]
+            close = rest.find("]")
+            segment = rest if close < 0 else rest[:close]
+            for s in _STR_ITEM.findall(segment):
+                try:
+                    items.append(json.loads(f'"{s}"'))
+                except ValueError:
+                    pass
+        out[key] = items
+    return out
+
+def parse_sheet_json(raw):
+    """모델 응답 → dict. 스키마 응답은 그대로, 아니면 본문에서 JSON 블록 추출. 실패 시 ValueError"""
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        m = re.search(r"\{[\s\S]*\}", raw or "")
+        if not m:
+            raise ValueError("응답에 JSON 없음")
+        return json.loads(m.group(0))
+
+def _to_float(x):
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+def to_result(js, want_early=False, want_late=False, want_excluded=False):
+    """
+    추출 JSON → (names, course_records, excluded, early_leave, late_start).
+    names 에 '김성연(B합)' 처럼 괄호 표기가 남아 있으면 코스점검 결과로 분리한다.
+    """
+    names, course_records = [], []
+    for r in js.get("course_records") or []:
+        course, result = (r.get("course") or "").upper()[:1], r.get("result")
+        if r.get("name") and course in ("A", "B") and result in ("합격", "불합격"):
+            course_records.append({"name": r["name"].strip(), "course": f"{course}코스", "result": result})
+    for n in js.get("names") or []:
+        m = re.search(r"([가-힣]+)\s*\(([^)]*)\)", n or "")
+        if m:
+            name = m.group(1).strip()
+            detail = re.sub(r"[^A-Za-z가-힣]", "", m.group(2)).upper()
+            course = "A" if "A" in detail else ("B" if "B" in detail else None)
+            result = "합격" if "합" in detail else ("불합격" if "불" in detail else None)
+            if course and result:
+                course_records.append({"name": name, "course": f"{course}코스", "result": result})
+            names.append(name)
+        else:
+            names.append((n or "").strip())
+
+    excluded = list(js.get("excluded") or []) if want_excluded else []
+    early_leave = [dict(e, time=_to_float(e.get("time"))) for e in js.get("early_leave") or []] if want_early else []
+    late_start = [dict(l, time=_to_float(l.get("time"))) for l in js.get("late_start") or []] if want_late else []
+    return names, course_records, excluded, early_leave, late_start
+
+# -----------------------
+# OCR 백엔드
+# -----------------------
+# 공통 인터페이스:
+#   backend.name                                  캐시 키에 들어가는 식별자 (예: "openai:gpt-4o")
+#   backend.complete(jpeg, original, system, prompt, detail, on_text=None, on_usage=None) -> 응답 JSON 문자열
+#     jpeg: 전처리된 이미지, original: 업로드 원본 (재생 백엔드의 조회 키)
+#     on_text(지금까지 받은 문자열): 스트리밍 중 호출
+#     on_usage({"prompt_tokens", "completion_tokens"}): 토큰 사용량을 알 수 있으면 호출
+class OpenAIVisionBackend:
+    """OpenAI 비전 모델 (JSON 스키마 + 스트리밍)"""
+
+    def __init__(self, api_key=None, model="gpt-4o", client=None):
+        self.model = model
+        self.name = f"openai:{model}"
+        self._api_key = api_key
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self._api_key)
+        return self._client
+
+    def complete(self, jpeg, original, system, prompt, detail="high", on_text=None, on_usage=None):
+        b64 = base64.b64encode(jpeg).decode()
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": [
+                    {"type": "text", "text": prompt},
+                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}", "detail": detail}},
+                ]},
+            ],
+            response_format=RESPONSE_FORMAT,
+            stream=True,
+            stream_options={"include_usage": True},   # 마지막 청크(choices 없음)에 토큰 사용량
+        )
+        parts = []
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage and on_usage:
+                on_usage({"prompt_tokens": usage.prompt_tokens or 0, "completion_tokens": usage.completion_tokens or 0})
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if getattr(delta, "refusal", None):
+                raise RuntimeError(f"모델 응답 거부: {delta.refusal}")
+            if delta.content:
+                parts.append(delta.content)
+                if on_text:
+                    on_text("".join(parts))
+        return "".join(parts)
+
+
+class ReplayBackend:
+    """
+    오프라인 재생 백엔드. fixture_dir/<원본 sha256>.json 응답을 돌려주고,
+    없으면 default.json, 그것도 없으면 LookupError.
+    latency(초)와 chunk(글자 수) 로 실제 스트리밍 응답을 흉내낼 수 있다.
+    """
+
+    def __init__(self, fixture_dir, latency=0.0, chunk=0):
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.chunk = chunk
+        self.name = "replay"
+
+    def fixture_path(self, original):
+        return os.path.join(self.fixture_dir, f"{hashlib.sha256(original).hexdigest()}.json")
+
+    def complete(self, jpeg, original, system, prompt, detail="high", on_text=None, on_usage=None):
+        for path in (self.fixture_path(original), os.path.join(self.fixture_dir, "default.json")):
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                break
+        else:
+            raise LookupError("오프라인 모드: 이 사진의 재생 데이터가 없습니다. 근무자를 직접 입력하세요.")
+        step = self.chunk or len(text) or 1
+        pieces = range(step, len(text) + step, step)
+        for end in pieces:
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            if on_text:
+                on_text(text[:end])
+        return text
+
+
+class RecordingBackend:
+    """다른 백엔드 응답을 ReplayBackend 형식 fixture 로 기록"""
+
+    def __init__(self, inner, fixture_dir):
+        self.inner = inner
+        self.fixture_dir = fixture_dir
+        self.name = inner.name
+
+    def complete(self, jpeg, original, system, prompt, detail="high", on_text=None, on_usage=None):
+        text = self.inner.complete(jpeg, original, system, prompt, detail=detail, on_text=on_text, on_usage=on_usage)
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        path = os.path.join(self.fixture_dir, f"{hashlib.sha256(original).hexdigest()}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return text
+
+
+def extract(backend, img_bytes, system, prompt, prep=None, want_early=False, want_late=False, want_excluded=False,
+            on_partial=None, ledger=None, slot=""):
+    """
+    전처리 → 백엔드 호출 → 결과 정리. Streamlit 비의존.
+    on_partial({"names": [...], "excluded": [...]}) 는 새 이름이 도착할 때마다 호출된다.
+    ledger(usage.UsageLedger) 가 있으면 백엔드 호출 1건(모델, 토큰, 이미지 크기, 시간, 결과)을 기록한다.
+    반환: (결과 5-튜플, 전처리 지표, 오류 문자열|None)
+    """
+    prep = dict(prep or {})
+    prep_metrics = None
+    call = {}    # 백엔드 호출을 시작했으면 image_bytes / t0, 토큰 사용량
+    try:
+        with metrics.span("ocr_preprocess"):
+            jpeg, prep_metrics = preprocess(img_bytes, **prep)
+        metrics.count("ocr_bytes_in", len(img_bytes))
+        metrics.count("ocr_bytes_out", len(jpeg))
+        seen = [(0, 0)]
+
+        def on_text(buf):
+            partial = partial_lists(buf)
+            counts = (len(partial["names"]), len(partial["excluded"]))
+            if counts != seen[0]:
+                seen[0] = counts
+                on_partial(partial)
+
+        metrics.count("ocr_calls")
+        call.update(image_bytes=len(jpeg), t0=time.perf_counter())
+        with metrics.span("ocr_call"):
+            raw = backend.complete(jpeg, img_bytes, system, prompt, detail=prep.get("detail", "high"),
+                                   on_text=on_text if on_partial else None, on_usage=call.update)
+        js = parse_sheet_json(raw)
+        result = to_result(js, want_early=want_early, want_late=want_late, want_excluded=want_excluded)
+        _record_usage(ledger, backend, slot, call)
+        return result, prep_metrics, None
+    except Exception as e:
+        metrics.count("ocr_errors")
+        err = str(e) or type(e).__name__
+        _record_usage(ledger, backend, slot, call, error=err)
+        return ([], [], [], [], []), prep_metrics, err
+
+
+def _record_usage(ledger, backend, slot, call, error=None):
+    """백엔드 호출까지 갔으면 장부에 1건 (응답 파싱 실패도 토큰은 쓴 것으로 기록)"""
+    if ledger is None or "t0" not in call:
+        return
+    try:
+        ledger.record(usage.model_name(backend.name), outcome="error" if error else "ok", slot=slot,
+                      prompt_tokens=call.get("prompt_tokens", 0), completion_tokens=call.get("completion_tokens", 0),
+                      image_bytes=call["image_bytes"], ms=(time.perf_counter() - call["t0"]) * 1000, error=error)
+    except OSError:
+        pass   # 장부를 못 써도 OCR 결과는 돌려준다
@@ -0,0 +1,172 @@
+# =====================================
+# planner.py — 여러 날 순번 미리보기 (engine.py 로 하루씩 연속 계산, Streamlit 비의존)
+# =====================================
+# 기간 안의 근무일마다 오전 → 오후 배정을 이어서 계산해
+# 열쇠 / 교양 1~5교시 / 1종 수동 / 1종 자동 순번표와 사람별 횟수를 만든다.
+# 정비 기간에 걸린 차량이 그날 배정되면 앱 문구처럼 '(정비중)' 으로 표시하고 "정비중" 열에 모은다.
+#
+# 입력 파일 (모두 선택)
+#   --absences a.json  [{"name", "start", "end", "period": "오전"|"오후"|생략(종일)}]
+#   --repairs  r.json  [{"car", "kind": "1종수동"|"1종자동"|"2종자동"|생략(전부), "start", "end"}]
+#   아침열쇠.json        로컬 저장소의 기간별 아침 열쇠 담당 (열쇠 순번에서만 제외)
+# 설정과 전일근무는 앱과 같은 로컬 저장소(data/roadvision.db, store.py)에서 읽는다.
+#
+# 예)
+#   python planner.py --start 2026-11-02 --end 2026-11-30
+#   python planner.py --start 2026-11-02 --days 90 --absences 휴가.json --csv plan.csv
+import argparse, csv, json, os, sys
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import engine
+import roster
+from name_match import normalize_name
+
+COLUMNS = ["date", "열쇠", "1교시", "2교시", "3교시", "4교시", "5교시", "1종수동(오전)", "1종수동(오후)", "1종자동", "정비중"]
+
+
+def _d(s, default):
+    try:
+        return date.fromisoformat(str(s)[:10])
+    except (TypeError, ValueError):
+        return default
+
+def _windows(rows):
+    """[{..., "start", "end"}] → [(start, end, row)] (날짜가 없으면 무기한)"""
+    return [(_d(r.get("start"), date.min), _d(r.get("end"), date.max), r) for r in rows or []]
+
+def _active(windows, day):
+    return [r for s, e, r in windows if s <= day <= e]
+
+
+def _repaired(R, am, pm):
+    """그날 배정된 차량 중 정비 중인 것 (번호순, 종류별 중복 제거)"""
+    cars = {"1종수동": {R.car1(nm) for nm in am["sud_m"] + pm["sud_a"]},
+            "1종자동": {am["today_auto1"]},
+            "2종자동": {R.car2(nm) for nm in am["auto_m"] + pm["auto_a"]}}
+    return [f"{c} ({kind})" for kind in roster.REPAIR_KINDS
+            for c in sorted(filter(None, cars[kind]), key=roster.car_num_key) if R.is_repair(c, kind)]
+
+
+def plan(R, start, end, workers=None, prev=None, absences=(), repairs=(), morning_keys=(),
+         sudong_count=1, weekends=False):
+    """
+    start~end 근무일별 배정 → 행 목록 (COLUMNS + "record": 그날 오후까지 반영한 전일근무 dict)
+    - workers: 매일 기본 근무자 (기본: 전체근무자), prev: 시작 전날 전일근무.json
+    - 정비 기간이 바뀌는 날만 Roster 를 새로 만든다 (roster_for 캐시)
+    """
+    workers = list(workers if workers is not None else R.employees)
+    absences, repairs, morning_keys = _windows(absences), _windows(repairs), list(morning_keys or [])
+    base_repair = {k: list(v) for k, v in R.repairs.items()}
+    config = dict(key_order=R.key_order, gyoyang_order=R.gyoyang_order, sudong_order=R.sudong_order,
+                  auto1_order=R.auto1_order, veh1=dict(R.veh1), veh2=dict(R.veh2), employees=R.employees)
+    prev = dict(prev or {})
+    rows, day = [], start
+    while day <= end:
+        if not weekends and day.weekday() >= 5:
+            day += timedelta(days=1)
+            continue
+        off = {"오전": set(), "오후": set()}
+        for r in _active(absences, day):
+            for p in ([r["period"]] if r.get("period") in off else off):
+                off[p].add(normalize_name(r.get("name")))
+        active_repairs = _active(repairs, day)
+        R_day = R
+        if active_repairs:
+            rep = {k: list(v) for k, v in base_repair.items()}
+            for r in active_repairs:
+                for k in ([r["kind"]] if r.get("kind") in rep else rep):
+                    rep[k].append(roster.norm_car_id(r.get("car")))
+            R_day = roster.roster_for(repair={k: sorted(set(v)) for k, v in rep.items()}, **config)
+
+        am = engine.assign_morning(R_day, {
+            "names": [w for w in workers if normalize_name(w) not in off["오전"]],
+            "key_excluded": engine.active_morning_keys(morning_keys, day),
+            "sudong_count": sudong_count,
+            "prev": prev,
+        })
+        pm = engine.assign_afternoon(R_day, {
+            "names": [w for w in workers if normalize_name(w) not in off["오후"]],
+            "sudong_count": sudong_count,
+            "prev": prev,
+            "morning": am["record"],
+        })
+        prev = pm["record"]
+        rows.append({
+            "date": day.isoformat(),
+            "열쇠": am["today_key"],
+            "1교시": am["gy1"] or "", "2교시": am["gy2"] or "",
+            "3교시": pm["gy3"] or "", "4교시": pm["gy4"] or "", "5교시": pm["gy5"] or "",
+            "1종수동(오전)": ", ".join(am["sud_m"]), "1종수동(오후)": ", ".join(pm["sud_a"]),
+            "1종자동": R_day.mark(am["today_auto1"], "1종자동"),
+            "정비중": ", ".join(_repaired(R_day, am, pm)),
+            "record": prev,
+        })
+        day += timedelta(days=1)
+    return rows
+
+
+def summarize(rows):
+    """사람별 담당 횟수 {이름: Counter(열쇠=, 교양=, 1종수동=, ...)}"""
+    out = defaultdict(Counter)
+    for r in rows:
+        if r["열쇠"]: out[r["열쇠"]]["열쇠"] += 1
+        for p in ["1교시", "2교시", "3교시", "4교시", "5교시"]:
+            if r[p]:
+                out[r[p]][p] += 1
+                out[r[p]]["교양"] += 1
+        for col in ["1종수동(오전)", "1종수동(오후)"]:
+            for nm in filter(None, r[col].split(", ")):
+                out[nm]["1종수동"] += 1
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="여러 날 순번 미리보기")
+    ap.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                    help="로컬 저장소(roadvision.db)가 있는 data 폴더")
+    ap.add_argument("--start", help="시작일 YYYY-MM-DD (기본: 내일)")
+    ap.add_argument("--end", help="종료일 YYYY-MM-DD")
+    ap.add_argument("--days", type=int, default=28, help="--end 가 없을 때 기간(일)")
+    ap.add_argument("--workers", nargs="*", help="매일 근무자 (기본: 전체근무자.json)")
+    ap.add_argument("--absences", help="휴가/교육 등 JSON")
+    ap.add_argument("--repairs", help="정비 기간 JSON")
+    ap.add_argument("--sudong-count", type=int, choices=[1, 2], default=1)
+    ap.add_argument("--weekends", action="store_true", help="토·일도 포함")
+    ap.add_argument("--csv", help="표를 CSV 로 저장")
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args(argv)
+
+    import render_sync, store
+    data = store.open_dir(args.data_dir).get_many(list(roster.DATA_FILES.values()) + ["전일근무.json", "아침열쇠.json"])
+    today = datetime.now(engine.kst()).date()
+    start = _d(args.start, today + timedelta(days=1))
+    end = _d(args.end, start + timedelta(days=args.days - 1))
+    R = roster.from_files(data)
+    rows = plan(R, start, end, workers=args.workers,
+                prev=data.get("전일근무.json") or {},
+                absences=render_sync.read_local(args.absences, []), repairs=render_sync.read_local(args.repairs, []),
+                morning_keys=data.get("아침열쇠.json") or [],
+                sudong_count=args.sudong_count, weekends=args.weekends)
+    summary = summarize(rows)
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+    if args.json:
+        print(json.dumps({"rows": rows, "summary": summary}, ensure_ascii=False, indent=2))
+        return
+    w = sys.stdout.write
+    w("\t".join(COLUMNS) + "\n")
+    for r in rows:
+        w("\t".join(str(r[c]) for c in COLUMNS) + "\n")
+    w(f"\n{'이름':<6}{'열쇠':>6}{'교양':>6}{'5교시':>6}{'수동':>6}\n")
+    for nm in sorted(summary):
+        c = summary[nm]
+        w(f"{nm:<6}{c['열쇠']:>6}{c['교양']:>6}{c['5교시']:>6}{c['1종수동']:>6}\n")
+
+
+if __name__ == "__main__":
+    main()
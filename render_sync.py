@@ -0,0 +1,558 @@
+# =====================================
+# render_sync.py — Render JSON 서버 동기화 엔진 (Streamlit 비의존)
+# =====================================
+import hashlib, json, os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import metrics
+
+# 복원 대상 JSON (data/ 기준 파일명)
+RENDER_FILES = [
+    "전일근무.json",
+    "아침열쇠.json",
+    "열쇠순번.json",
+    "교양순번.json",
+    "1종순번.json",
+    "1종자동순번.json",
+    "1종차량표.json",
+    "2종차량표.json",
+    "전체근무자.json",
+    "정비차량.json",
+    "메모장.json",
+    "오전결과.json",
+    "OCR별칭.json",
+]
+
+DEFAULT_BASE = "https://roadvision-json-server.onrender.com"
+
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+RESTORE_DEADLINE = 20.0
+PROBE_INTERVAL = 30.0   # 다른 세션이 방금 확인했다면 이 시간(초) 동안 재확인 생략
+
+# -----------------------
+# 세션 / 로컬 저장
+# -----------------------
+def _http(session):
+    """session 이 없으면 requests 모듈 (requests 는 처음 네트워크를 쓸 때 import — 앱 시작 시간 절약)"""
+    if session is not None:
+        return session
+    import requests
+    return requests
+
+def _request(http, method, url, **kwargs):
+    """HTTP 요청 1건 + 집계 (render_request 구간, 요청 수 / 보낸·받은 바이트 / 오류 수)"""
+    metrics.count("render_requests")
+    try:
+        with metrics.span("render_request"):
+            res = getattr(http, method)(url, **kwargs)
+    except Exception:
+        metrics.count("render_errors")
+        raise
+    body = getattr(res.request, "body", None)
+    metrics.count("render_bytes_out", len(body or b""))
+    metrics.count("render_bytes_in", len(res.content or b""))
+    return res
+
+def make_session(pool_size=16):
+    """keep-alive 연결을 재사용하는 공용 세션"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def base_url():
+    """Render 서버 주소 — 환경변수 RENDER_BASE 로 교체 가능 (예: 로컬 json_server.py → http://127.0.0.1:8765)"""
+    return os.environ.get("RENDER_BASE", DEFAULT_BASE).rstrip("/")
+
+def read_local(path, default=None):
+    """JSON 파일 읽기 (경로가 비었거나 파일이 없으면 default)"""
+    if not path:
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+def write_local(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+class DirTarget:
+    """로컬 대상: data 폴더 (파일 하나 = JSON 하나)"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def hash(self, fname):
+        return local_hash(os.path.join(self.data_dir, fname))
+
+    def write(self, fname, data):
+        write_local(os.path.join(self.data_dir, fname), data)
+
+def local_target(local):
+    """data 폴더 경로, 또는 hash(fname) / write(fname, data) 를 가진 저장소 (store.Store)"""
+    return local if hasattr(local, "write") else DirTarget(local)
+
+# -----------------------
+# 버전 상태 (ETag / 내용 해시)
+# -----------------------
+def content_hash(data):
+    """JSON 내용 해시 (키 순서·들여쓰기와 무관)"""
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def local_hash(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return content_hash(json.load(f))
+    except Exception:
+        return None
+
+class SyncState:
+    """프로세스 단위 동기화 상태: 파일별 ETag·내용 해시, 마지막 동기화 시각"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.etags = {}
+        self.hashes = {}
+        self.restored = False
+        self.bulk_supported = None   # /sync 지원 여부 (None = 아직 모름)
+        self.last_sync = 0.0
+        self.last_report = None
+        self.inflight = None         # 진행 중인 sync 의 Future (동시에 들어온 호출은 이 결과를 같이 쓴다)
+
+    def note_local(self, filename, data):
+        """로컬 저장/업로드 직후 호출 → 다음 확인 때 같은 내용을 다시 쓰지 않음"""
+        self.hashes[filename] = content_hash(data)
+        self.etags.pop(filename, None)
+
+# -----------------------
+# 단일 / 전체 복원
+# -----------------------
+def fetch(base, filename, session=None, timeout=READ_TIMEOUT, etag=None):
+    """
+    JSON 1개 조건부 다운로드.
+    반환: {"data", "error", "etag", "not_modified", "missing"}
+          (304면 not_modified=True, 404 면 missing=True — 둘 다 data=None, 오류 아님)
+    """
+    http = _http(session)
+    out = {"data": None, "error": None, "etag": None, "not_modified": False, "missing": False}
+    headers = {"If-None-Match": etag} if etag else None
+    try:
+        res = _request(http, "get", f"{base}/download/{filename}", headers=headers, timeout=(CONNECT_TIMEOUT, timeout))
+        out["etag"] = res.headers.get("ETag")
+        if res.status_code == 304:
+            out["not_modified"] = True
+        elif res.status_code == 404:
+            out["missing"] = True
+        elif not res.ok:
+            out["error"] = f"HTTP {res.status_code}"
+        else:
+            out["data"] = res.json()
+    except Exception as e:
+        out["error"] = str(e) or type(e).__name__
+    return out
+
+def download(base, filename, session=None, timeout=READ_TIMEOUT):
+    """JSON 1개 다운로드 → (data, error). 실패 시 data=None"""
+    r = fetch(base, filename, session=session, timeout=timeout)
+    return r["data"], r["error"] or ("서버에 없음" if r["missing"] else None)
+
+def _split_excluded(files, exclude):
+    """→ (복원할 파일, 건너뛸 파일). exclude: 아직 업로드하지 못한 파일 (로컬이 서버보다 새것)"""
+    exclude = set((exclude() if callable(exclude) else exclude) or ())
+    return [f for f in files if f not in exclude], [f for f in files if f in exclude]
+
+def _excluded_now(exclude, fname):
+    """쓰기 직전 다시 확인 (exclude 가 함수면 복원 중에 새로 저장된 파일도 덮어쓰지 않음)"""
+    return callable(exclude) and fname in exclude()
+
+def restore_all(base, data_dir, session=None, files=None, deadline=RESTORE_DEADLINE, state=None, exclude=None):
+    """
+    전체 JSON 동시 복원. 하나의 세션(연결 풀)로 모든 파일을 병렬 요청하고,
+    전체 마감시간(deadline 초)이 지나면 남은 요청은 실패로 처리한다.
+    state(SyncState)를 주면 ETag 조건부 요청을 보내고, 내용 해시가 같은 파일은 다시 쓰지 않는다.
+    exclude(파일 집합 또는 그 집합을 돌려주는 함수 — UploadQueue.unsent)의 파일은 받지 않는다
+    (업로드 대기/전송 중/실패한 로컬 저장을 서버의 이전 내용으로 되돌리지 않도록).
+    서버에 없는 파일(아직 한 번도 올리지 않은 별칭 등)은 실패가 아니라 missing 으로 둔다 (로컬 그대로).
+    data_dir 는 data 폴더 경로 또는 로컬 저장소 (local_target 참고).
+    반환: {"restored": [...], "unchanged": [...], "skipped": [...], "missing": [...], "failed": {fname: 사유},
+           "timings": {fname: 초}, "elapsed": 초}
+    """
+    local = local_target(data_dir)
+    files, skipped = _split_excluded(list(files or RENDER_FILES), exclude)
+    t_start = time.perf_counter()
+    report = {"restored": [], "unchanged": [], "skipped": skipped, "missing": [], "failed": {}, "timings": {},
+              "elapsed": 0.0}
+    if not files:
+        return report
+    session = session or make_session(len(files))
+
+    def task(fname):
+        t0 = time.perf_counter()
+        etag = state.etags.get(fname) if state else None
+        r = fetch(base, fname, session=session, timeout=min(READ_TIMEOUT, deadline), etag=etag)
+        return fname, r, time.perf_counter() - t0
+
+    pool = ThreadPoolExecutor(max_workers=len(files), thread_name_prefix="render-restore")
+    try:
+        futures = {pool.submit(task, f): f for f in files}
+        done, pending = wait(futures, timeout=deadline)
+        for fut in done:
+            fname, r, took = fut.result()
+            report["timings"][fname] = took
+            if r["error"] is not None:
+                report["failed"][fname] = r["error"]
+                continue
+            if r["not_modified"]:
+                report["unchanged"].append(fname)
+                continue
+            if r["missing"]:
+                report["missing"].append(fname)
+                continue
+            h = content_hash(r["data"]) if state else None
+            if state and h == local.hash(fname):
+                report["unchanged"].append(fname)
+            elif _excluded_now(exclude, fname):
+                report["skipped"].append(fname)
+                continue
+            else:
+                try:
+                    local.write(fname, r["data"])
+                    report["restored"].append(fname)
+                except Exception as e:
+                    report["failed"][fname] = f"저장 실패: {e}"
+                    continue
+            if state:
+                state.hashes[fname] = h
+                if r["etag"]:
+                    state.etags[fname] = r["etag"]
+        for fut in pending:
+            report["failed"][futures[fut]] = f"마감시간 {deadline:g}s 초과"
+    finally:
+        # 마감 후 늦게 도착한 응답은 버린다 (로컬 파일을 덮어쓰지 않음)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    for k in ("restored", "unchanged", "missing"):
+        report[k].sort(key=files.index)
+    report["elapsed"] = time.perf_counter() - t_start
+    return report
+
+# -----------------------
+# 일괄 변경분 동기화 (/sync)
+# -----------------------
+_UNSUPPORTED = (404, 405, 501)
+
+def bulk_sync(base, data_dir, session=None, files=None, put=None, timeout=READ_TIMEOUT, state=None, exclude=None):
+    """
+    한 번의 요청으로 변경분 복원 + 다중 파일 업로드.
+    - files: 로컬 해시를 보내 서버와 다른 파일만 받는다 (빈 목록이면 업로드만)
+    - put:   {fname: content} 서버에 저장할 파일
+    - exclude: 받지 않을 파일 (restore_all 참고)
+    서버가 /sync 를 지원하지 않으면 None, 아니면 restore_all 과 같은 형식의 리포트
+    (+ "uploaded": [...]) 를 반환한다. 그 밖의 실패(2xx 가 아닌 응답, 연결 오류 등)는 리포트의 "error".
+    """
+    local = local_target(data_dir)
+    files, skipped = _split_excluded(list(RENDER_FILES if files is None else files), exclude)
+    put = dict(put or {})
+    http = _http(session)
+    t_start = time.perf_counter()
+    report = {"restored": [], "unchanged": [], "skipped": skipped, "missing": [], "uploaded": [], "failed": {},
+              "timings": {}, "elapsed": 0.0}
+    have = {f: local.hash(f) for f in files}
+    try:
+        res = _request(http, "post", f"{base}/sync", json={"have": have, "put": put}, timeout=(CONNECT_TIMEOUT, timeout))
+        if res.status_code in _UNSUPPORTED:
+            return None
+        if not res.ok:
+            raise RuntimeError(f"HTTP {res.status_code}")
+        body = res.json()
+    except Exception as e:
+        why = str(e) or type(e).__name__
+        report["failed"] = {f: why for f in files + list(put)}
+        report["error"] = why
+        report["elapsed"] = time.perf_counter() - t_start
+        return report
+
+    took = time.perf_counter() - t_start
+    hashes = body.get("hashes") or {}
+    report["uploaded"] = [f for f in put if f in hashes]
+    for fname in put:
+        if fname not in hashes:
+            report["failed"][fname] = "서버 저장 확인 없음"
+    changed = body.get("changed") or {}
+    missing = set(body.get("missing") or [])
+    for fname in files:
+        report["timings"][fname] = took
+        if fname in missing:
+            report["missing"].append(fname)
+        elif fname in changed and _excluded_now(exclude, fname):
+            report["skipped"].append(fname)
+        elif fname in changed:
+            try:
+                local.write(fname, changed[fname])
+                report["restored"].append(fname)
+            except Exception as e:
+                report["failed"][fname] = f"저장 실패: {e}"
+        else:
+            report["unchanged"].append(fname)
+    if state:
+        state.hashes.update({f: h for f, h in hashes.items() if f not in report["skipped"]})
+        for fname in list(changed) + report["uploaded"]:
+            state.etags.pop(fname, None)
+    report["elapsed"] = time.perf_counter() - t_start
+    return report
+
+def upload_many(base, items, session=None, timeout=READ_TIMEOUT, state=None):
+    """
+    여러 파일 업로드 → {fname: (ok, error)}.
+    /sync 지원 서버는 요청 1번. 지원하지 않거나 /sync 가 실패하면 파일별 /upload 로 대체한다.
+    """
+    if not state or state.bulk_supported is not False:
+        report = bulk_sync(base, "", session=session, files=[], put=items, timeout=timeout, state=state)
+        if report is None:
+            if state:
+                state.bulk_supported = False
+        elif "error" not in report:
+            if state:
+                state.bulk_supported = True
+            return {f: (f in report["uploaded"], report["failed"].get(f)) for f in items}
+    return {f: upload(base, f, d, session=session, timeout=timeout) for f, d in items.items()}
+
+def sync(base, data_dir, state, session=None, files=None, force=False, exclude=None):
+    """
+    프로세스 첫 호출: 전체 복원. 이후: ETag/해시 기반 변경분만 복원.
+    서버가 /sync 를 지원하면 요청 1번으로 변경분만 받는다.
+    최근 PROBE_INTERVAL 초 안에 다른 세션이 확인했다면 네트워크 없이 마지막 리포트를 돌려준다.
+    /sync 가 어떤 이유로든 실패하면 이번에는 파일별 복원(restore_all)으로 대신한다.
+    exclude: 받지 않을 파일 (restore_all 참고)
+
+    state.lock 은 상태 확인 / 갱신 동안만 잡는다 (네트워크 요청 중에는 잡지 않음).
+    이미 진행 중인 동기화가 있으면 새로 요청하지 않고 그 결과를 기다려 같이 쓴다.
+    """
+    with state.lock:
+        if not force and state.restored and time.monotonic() - state.last_sync < PROBE_INTERVAL:
+            return state.last_report
+        flight = state.inflight
+        if flight is None:
+            flight = state.inflight = Future()
+            mode = "probe" if state.restored else "full"
+            use_bulk = state.bulk_supported is not False
+        else:
+            mode = None
+    if mode is None:
+        return flight.result()
+
+    try:
+        report = None
+        with metrics.span("render_restore"):
+            if use_bulk:
+                report = bulk_sync(base, data_dir, session=session, files=files, state=state, exclude=exclude)
+                if report is None:
+                    state.bulk_supported = False
+                elif "error" in report:
+                    report = None   # 일시적 오류일 수 있으므로 /sync 지원 여부는 그대로 (다음에 다시 시도)
+                else:
+                    state.bulk_supported = True
+            bulk = report is not None
+            if report is None:
+                report = restore_all(base, data_dir, session=session, files=files, state=state, exclude=exclude)
+        report["mode"] = mode
+        report["bulk"] = bulk
+    except BaseException as e:
+        with state.lock:
+            state.inflight = None
+        flight.set_exception(e)
+        raise
+    with state.lock:
+        state.restored = True
+        state.last_sync = time.monotonic()
+        state.last_report = report
+        state.inflight = None
+    flight.set_result(report)
+    return report
+
+# -----------------------
+# 업로드
+# -----------------------
+def upload(base, filename, data, session=None, timeout=READ_TIMEOUT):
+    """JSON 1개 업로드 → (ok, error)"""
+    http = _http(session)
+    try:
+        res = _request(http, "post", f"{base}/upload", json={"filename": filename, "content": data},
+                       timeout=(CONNECT_TIMEOUT, timeout))
+        return res.ok, (None if res.ok else f"HTTP {res.status_code}")
+    except Exception as e:
+        return False, str(e) or type(e).__name__
+
+class UploadJournal:
+    """
+    아직 서버에 반영되지 않은 업로드 {filename: data} 기록 파일.
+    프로세스가 다시 시작돼도 남은 업로드를 이어서 보내고, 그동안 복원이 로컬 저장을 덮어쓰지 않게 한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, items):
+        """임시 파일에 쓴 뒤 교체 (쓰는 도중 종료돼도 이전 기록은 남는다)"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+class UploadQueue:
+    """
+    백그라운드 업로드 대기열 (write-behind).
+    - 같은 파일명에 대한 연속 저장은 마지막 내용 하나로 합쳐진다.
+    - 보낼 준비가 된 파일들은 한 묶음으로 send_batch({fname: data}) -> {fname: (ok, error)} 에 넘긴다.
+    - 실패 시 지수 백오프로 재시도, max_attempts 초과 시 failed 로 이동.
+    - send_batch 는 워커 스레드에서만 호출된다.
+    - journal(UploadJournal)을 주면 보내지 못한 항목(대기 / 전송 중 / 실패)을 기록해 두고,
+      다시 시작할 때 불러와 이어서 보낸다.
+    """
+
+    def __init__(self, send_batch, max_attempts=5, base_delay=1.0, max_delay=60.0, on_sent=None, journal=None):
+        self.send_batch = send_batch
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_sent = on_sent
+        self.journal = journal
+        self.cond = threading.Condition()
+        self.pending = {}      # filename -> {"data", "attempts", "next_at", "error", "queued_at"}
+        self.failed = {}       # filename -> {"data", "attempts", "error"}
+        self.inflight = []
+        self.sending = {}      # 전송 중 {filename: data}
+        self.sent = 0
+        self.last_sent_at = None
+        for fname, data in (journal.load() if journal else {}).items():
+            self.pending[fname] = {"data": data, "attempts": 0, "next_at": 0.0, "error": None, "queued_at": time.time()}
+        self.worker = threading.Thread(target=self._run, name="render-upload", daemon=True)
+        self.worker.start()
+
+    def put(self, filename, data):
+        self.put_many({filename: data})
+
+    def put_many(self, items):
+        """여러 파일을 한 번에 등록 → 같은 묶음으로 전송된다"""
+        with self.cond:
+            now = time.time()
+            for filename, data in items.items():
+                self.failed.pop(filename, None)
+                self.pending[filename] = {"data": data, "attempts": 0, "next_at": 0.0,
+                                          "error": None, "queued_at": now}
+            self._save_journal()
+            self.cond.notify_all()
+
+    def retry_failed(self):
+        with self.cond:
+            for fname, item in list(self.failed.items()):
+                self.pending.setdefault(fname, {"data": item["data"], "attempts": 0, "next_at": 0.0,
+                                                "error": item["error"], "queued_at": time.time()})
+            self.failed.clear()
+            self.cond.notify_all()
+
+    def unsent(self):
+        """서버에 아직 반영되지 않은 파일 (대기 ∪ 전송 중 ∪ 실패) — 복원 때 덮어쓰지 않는다"""
+        with self.cond:
+            return set(self.pending) | set(self.sending) | set(self.failed)
+
+    def _save_journal(self):
+        """보내지 못한 항목 기록 (self.cond 안에서 호출). 기록 실패는 대기열 동작에 영향 없음"""
+        if self.journal is None:
+            return
+        items = {k: v["data"] for k, v in self.failed.items()}
+        items.update(self.sending)
+        items.update({k: v["data"] for k, v in self.pending.items()})
+        try:
+            self.journal.save(items)
+        except OSError:
+            pass
+
+    def status(self):
+        with self.cond:
+            return {
+                "pending": {k: {"attempts": v["attempts"], "error": v["error"]} for k, v in self.pending.items()},
+                "inflight": list(self.inflight),
+                "failed": {k: {"attempts": v["attempts"], "error": v["error"]} for k, v in self.failed.items()},
+                "sent": self.sent,
+                "last_sent_at": self.last_sent_at,
+            }
+
+    def flush(self, timeout=None):
+        """대기열이 빌 때까지 대기 (벤치마크/종료용). 비었으면 True"""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.pending or self.inflight:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self.cond.wait(left)
+            return True
+
+    def _take_ready(self):
+        """보낼 수 있는 항목 전부 꺼내기 → (batch, 다음 항목까지 대기초)"""
+        now = time.monotonic()
+        ready = [k for k, v in self.pending.items() if v["next_at"] <= now]
+        if not ready:
+            return {}, min(v["next_at"] for v in self.pending.values()) - now
+        return {k: self.pending.pop(k) for k in ready}, 0.0
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.pending:
+                        self.cond.wait()
+                        continue
+                    batch, delay = self._take_ready()
+                    if batch:
+                        break
+                    self.cond.wait(delay)
+                self.inflight = list(batch)
+                self.sending = {k: v["data"] for k, v in batch.items()}
+            try:
+                results = self.send_batch({k: v["data"] for k, v in batch.items()})
+            except Exception as e:
+                why = str(e) or type(e).__name__
+                results = {k: (False, why) for k in batch}
+            with self.cond:
+                self.inflight = []
+                self.sending = {}
+                for fname, item in batch.items():
+                    ok, err = results.get(fname, (False, "결과 없음"))
+                    if ok:
+                        self.sent += 1
+                        self.last_sent_at = time.time()
+                        if self.on_sent:
+                            try:
+                                self.on_sent(fname, item["data"])
+                            except Exception:
+                                pass
+                    elif fname not in self.pending:
+                        # 업로드 중 새 저장이 들어오지 않았을 때만 재시도 (새 내용이 우선)
+                        item["attempts"] += 1
+                        item["error"] = err
+                        if item["attempts"] >= self.max_attempts:
+                            self.failed[fname] = item
+                        else:
+                            backoff = min(self.max_delay, self.base_delay * 2 ** (item["attempts"] - 1))
+                            item["next_at"] = time.monotonic() + backoff
+                            self.pending[fname] = item
+                self._save_journal()
+                self.cond.notify_all()
@@ -0,0 +1,197 @@
+# =====================================
+# roster.py — 근무자/차량 설정 모델 (Streamlit 비의존)
+# =====================================
+# 설정(순번표, 차량표, 정비 차량)을 불러올 때 한 번만 만들어 두고,
+# 배정 단계에서는 이름 → 차량, 정비 여부, 정렬된 차량 목록, 순번 위치를 dict/set 조회로 바로 얻는다.
+import re
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from name_match import normalize_name
+
+REPAIR_KINDS = ("1종수동", "1종자동", "2종자동")
+
+
+def norm_car_id(s):
+    if not s: return ""
+    return re.sub(r"\s+", "", str(s)).strip()
+
+def car_num_key(car_id):
+    m = re.search(r"(\d+)", car_id or "")
+    return int(m.group(1)) if m else 10**9
+
+
+def _reverse_index(veh_map):
+    """정규화 이름 → 차량 (같은 사람이 여러 대면 차량표의 첫 차량)"""
+    idx = {}
+    for car, nm in (veh_map or {}).items():
+        idx.setdefault(normalize_name(nm), car)
+    return MappingProxyType(idx)
+
+
+class Rotation:
+    """
+    순번표 (열쇠 / 교양 / 1종 수동 / 1종 자동 차량). 만든 뒤 바꾸지 않는다.
+    - norms: 위치별 비교 키, pos: 비교 키 → 위치 목록 (같은 이름이 두 번 있어도 위치로 구분)
+    """
+
+    def __init__(self, order, key=normalize_name):
+        self.order = tuple(order or ())
+        self.key = key
+        self.norms = tuple(key(x) for x in self.order)
+        self.pos = {}
+        for i, n in enumerate(self.norms):
+            self.pos.setdefault(n, []).append(i)
+
+    def __len__(self):
+        return len(self.order)
+
+    def index_of(self, name, hint=None):
+        """이름의 위치. hint(저장된 위치)가 같은 이름을 가리키면 그 위치를 쓴다. 없으면 None"""
+        k = self.key(name)
+        if isinstance(hint, int) and 0 <= hint < len(self.order) and self.norms[hint] == k:
+            return hint
+        idx = self.pos.get(k)
+        return idx[0] if idx else None
+
+    def next_index(self, after, allowed=None, ok=None):
+        """
+        after 다음 위치부터 한 바퀴 돌며 처음 맞는 위치 (after 가 None 이면 처음부터). 없으면 None
+        - allowed: 허용 비교 키 집합 (None = 전원). 순번표보다 작으면 허용된 사람 위치만 본다
+        - ok: 이름 → bool 추가 조건 (교시별 출근/조퇴 시간 등)
+        """
+        n = len(self.order)
+        if not n:
+            return None
+        start = (after + 1) % n if after is not None else 0
+        if allowed is not None and len(allowed) < n:
+            cands = sorted((i - start) % n for a in allowed for i in self.pos.get(a, ()))
+            cands = [(start + d) % n for d in cands]
+        else:
+            cands = [(start + d) % n for d in range(n)]
+            if allowed is not None:
+                cands = [i for i in cands if self.norms[i] in allowed]
+        for i in cands:
+            if ok is None or ok(self.order[i]):
+                return i
+        return None
+
+
+class RotationCursor:
+    """순번표 위의 현재 위치 (전일 담당자). advance() 로 다음 담당자를 고르며 이동"""
+
+    def __init__(self, rotation, last="", index=None):
+        self.rotation = rotation
+        self.index = rotation.index_of(last, index) if last else None
+
+    @property
+    def current(self):
+        return self.rotation.order[self.index] if self.index is not None else ""
+
+    def copy(self):
+        c = RotationCursor(self.rotation)
+        c.index = self.index
+        return c
+
+    def advance(self, allowed=None, ok=None):
+        """다음 담당자 (없으면 None, 위치 유지)"""
+        i = self.rotation.next_index(self.index, allowed, ok)
+        if i is None:
+            return None
+        self.index = i
+        return self.rotation.order[i]
+
+    def state(self):
+        """저장용 {"name", "index"}"""
+        return {"name": self.current, "index": self.index}
+
+
+class Roster:
+    """
+    근무자/차량 설정 (만든 뒤 바꾸지 않는다)
+    - key_order / gyoyang_order / sudong_order / auto1_order / employees: 튜플
+    - veh1 / veh2: 차량 → 담당자 (읽기 전용), car1_by / car2_by: 정규화 이름 → 차량
+    - repairs: {"1종수동" | "1종자동" | "2종자동": 정규화 차량번호 frozenset}
+    - cars_1s / cars_1a / cars_2a: 번호순 차량 목록
+    - rot_key / rot_gyoyang / rot_sudong / rot_auto1: 순번표 Rotation
+    """
+
+    def __init__(self, key_order=(), gyoyang_order=(), sudong_order=(), auto1_order=(),
+                 veh1=None, veh2=None, employees=(), repair=None):
+        self.key_order = tuple(key_order or ())
+        self.gyoyang_order = tuple(gyoyang_order or ())
+        self.sudong_order = tuple(sudong_order or ())
+        self.auto1_order = tuple(auto1_order or ())
+        self.employees = tuple(employees or ())
+        self.veh1 = MappingProxyType(dict(veh1 or {}))
+        self.veh2 = MappingProxyType(dict(veh2 or {}))
+        self.car1_by = _reverse_index(self.veh1)
+        self.car2_by = _reverse_index(self.veh2)
+        repair = repair or {}
+        self.repairs = MappingProxyType({k: frozenset(norm_car_id(c) for c in repair.get(k, ()))
+                                         for k in REPAIR_KINDS})
+        self.cars_1s = tuple(sorted(self.veh1, key=car_num_key))
+        self.cars_1a = tuple(sorted(self.auto1_order, key=car_num_key))
+        self.cars_2a = tuple(sorted(self.veh2, key=car_num_key))
+        self.rot_key = Rotation(self.key_order)
+        self.rot_gyoyang = Rotation(self.gyoyang_order)
+        self.rot_sudong = Rotation(self.sudong_order)
+        self.rot_auto1 = Rotation(self.auto1_order, key=norm_car_id)
+
+    def car1(self, name):
+        """1종 수동 차량 (없으면 "")"""
+        return self.car1_by.get(normalize_name(name), "")
+
+    def car2(self, name):
+        """2종 자동 차량 (없으면 "")"""
+        return self.car2_by.get(normalize_name(name), "")
+
+    def is_repair(self, car, kind):
+        return norm_car_id(car) in self.repairs.get(kind, ())
+
+    def mark(self, car, kind):
+        """정비 중이면 '(정비중)' 표시"""
+        if not car: return ""
+        return f"{car}{' (정비중)' if self.is_repair(car, kind) else ''}"
+
+
+def repair_from_raw(raw):
+    """정비차량.json (구버전: 차량 목록 하나) → {"1종수동", "1종자동", "2종자동"}"""
+    if isinstance(raw, Mapping):
+        return {k: raw.get(k, []) for k in REPAIR_KINDS}
+    if isinstance(raw, (list, tuple)):
+        return {k: raw for k in REPAIR_KINDS}
+    return {k: [] for k in REPAIR_KINDS}
+
+
+DATA_FILES = {
+    "key_order": "열쇠순번.json", "gyoyang_order": "교양순번.json", "sudong_order": "1종순번.json",
+    "auto1_order": "1종자동순번.json", "veh1": "1종차량표.json", "veh2": "2종차량표.json",
+    "employees": "전체근무자.json", "repair": "정비차량.json",
+}
+
+def from_files(data):
+    """{파일명: 내용} (store.snapshot(), Store.get_many 등) → Roster (없는 파일은 빈 값)"""
+    config = {k: data.get(fname) for k, fname in DATA_FILES.items()}
+    config["repair"] = repair_from_raw(config["repair"])
+    return roster_for(**config)
+
+
+def _freeze(v):
+    if isinstance(v, Mapping):
+        return ("dict", tuple((k, _freeze(x)) for k, x in v.items()))
+    if isinstance(v, (list, tuple)):
+        return tuple(_freeze(x) for x in v)
+    return v
+
+_rosters = {}
+
+def roster_for(**config):
+    """설정 내용별 Roster (내용이 바뀔 때만 새로 생성)"""
+    key = _freeze(config)
+    r = _rosters.get(key)
+    if r is None:
+        if len(_rosters) >= 8:
+            _rosters.clear()
+        r = _rosters[key] = Roster(**config)
+    return r
@@ -0,0 +1,369 @@
+# =====================================
+# store.py — 로컬 저장소 (SQLite 단일 파일, WAL, Streamlit 비의존)
+# =====================================
+# 예전 data/*.json 파일 하나하나를 엔티티별 테이블로 옮긴 것.
+# 앱 / Render 동기화는 지금처럼 "파일명 → JSON 내용" 단위로 읽고 쓰고, 저장소가 테이블로 나눠 담는다.
+#
+#   rosters       열쇠/교양/1종/1종자동 순번, 전체근무자   (name, pos, member)
+#   vehicles      1종/2종 차량표                           (kind, pos, car, owner)
+#   repairs       정비 차량                                (kind, pos, car)
+#   memo          메모장                                   (id=1, text, extra)
+#   morning_keys  아침 열쇠 담당 기간                      (pos, name, start, end, extra)
+#   aliases       OCR 별칭                                 (raw, name, count, last, extra)
+#   results       전일근무 / 오전결과 / 오후결과           (name, data)
+#   other         그 밖의 JSON                             (fname, data)
+#   entities      파일명별 존재 여부 + 내용 해시 + 버전   (fname, hash, version)
+#   extra 는 정해진 열 밖의 키(JSON) — 받은 내용을 빠짐없이 보관한다.
+#
+# 저장할 때마다 다시 읽어 받은 내용과 비교하고, 테이블에 그대로 담을 수 없는 내용
+# (순번표에 문자열이 아닌 값 등)은 ValueError 로 거부한다 (트랜잭션 전체 취소).
+# 구버전 형식(정비차량 목록 하나, 아침열쇠 단일 dict)만 새 형식으로 바꿔 담는다.
+#
+# 배정 이력은 history.py (월별 JSONL + 증분 집계) 그대로 둔다.
+# 처음 열 때 data 폴더의 JSON 파일을 자동으로 가져온다 (원본 파일은 그대로 남김).
+#
+# snapshot(): 전체 설정을 읽기 전용 객체(dict → MappingProxy, list → tuple)로 돌려준다.
+# 저장소 버전이 그대로면 같은 객체를 재사용하고, 바뀐 파일만 다시 읽는다 (모든 세션 공용).
+import json, os, sqlite3, threading
+from collections.abc import Mapping
+from types import MappingProxyType
+
+import metrics
+from render_sync import content_hash
+
+DB_NAME = "roadvision.db"
+
+ROSTERS = {"열쇠순번.json", "교양순번.json", "1종순번.json", "1종자동순번.json", "전체근무자.json"}
+VEHICLES = {"1종차량표.json": "1종", "2종차량표.json": "2종"}
+RESULTS = {"전일근무.json", "오전결과.json", "오후결과.json"}
+REPAIR_KINDS = ("1종수동", "1종자동", "2종자동")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (fname TEXT PRIMARY KEY, hash TEXT, version INTEGER);
+CREATE TABLE IF NOT EXISTS rosters (name TEXT, pos INTEGER, member TEXT, PRIMARY KEY (name, pos));
+CREATE TABLE IF NOT EXISTS vehicles (kind TEXT, pos INTEGER, car TEXT, owner TEXT, PRIMARY KEY (kind, pos));
+CREATE TABLE IF NOT EXISTS repairs (kind TEXT, pos INTEGER, car TEXT, PRIMARY KEY (kind, pos));
+CREATE TABLE IF NOT EXISTS memo (id INTEGER PRIMARY KEY CHECK (id = 1), text TEXT, extra TEXT);
+CREATE TABLE IF NOT EXISTS morning_keys (pos INTEGER PRIMARY KEY, name TEXT, start TEXT, "end" TEXT, extra TEXT);
+CREATE TABLE IF NOT EXISTS aliases (raw TEXT PRIMARY KEY, name TEXT, count INTEGER, last TEXT, extra TEXT);
+CREATE TABLE IF NOT EXISTS results (name TEXT PRIMARY KEY, data TEXT);
+CREATE TABLE IF NOT EXISTS other (fname TEXT PRIMARY KEY, data TEXT);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def freeze(v):
+    """읽기 전용 사본 (dict → MappingProxyType, list → tuple)"""
+    if isinstance(v, Mapping):
+        return MappingProxyType({k: freeze(x) for k, x in v.items()})
+    if isinstance(v, (list, tuple)):
+        return tuple(freeze(x) for x in v)
+    return v
+
+def thaw(v):
+    """freeze 의 반대 (저장/업로드용 일반 dict/list)"""
+    if isinstance(v, Mapping):
+        return {k: thaw(x) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        return [thaw(x) for x in v]
+    return v
+
+
+# -----------------------
+# 엔티티별 읽기/쓰기 (cur, fname[, data])
+# -----------------------
+def _split(row, cols):
+    """dict → (정해진 열 값들, 나머지 키의 JSON 또는 None). 없는 열은 None"""
+    extra = {k: v for k, v in row.items() if k not in cols}
+    return [row.get(c) for c in cols], (json.dumps(extra, ensure_ascii=False) if extra else None)
+
+def _join(cols, values, extra):
+    """_split 의 반대 (None 인 열은 원래 없던 키)"""
+    out = json.loads(extra or "{}")
+    out.update({c: v for c, v in zip(cols, values) if v is not None})
+    return out
+
+def _get_roster(cur, fname):
+    return [r[0] for r in cur.execute("SELECT member FROM rosters WHERE name=? ORDER BY pos", (fname,))]
+
+def _put_roster(cur, fname, data):
+    cur.execute("DELETE FROM rosters WHERE name=?", (fname,))
+    cur.executemany("INSERT INTO rosters VALUES (?,?,?)", [(fname, i, m) for i, m in enumerate(data)])
+
+def _get_vehicles(cur, fname):
+    rows = cur.execute("SELECT car, owner FROM vehicles WHERE kind=? ORDER BY pos", (VEHICLES[fname],))
+    return {car: owner for car, owner in rows}
+
+def _put_vehicles(cur, fname, data):
+    kind = VEHICLES[fname]
+    cur.execute("DELETE FROM vehicles WHERE kind=?", (kind,))
+    cur.executemany("INSERT INTO vehicles VALUES (?,?,?,?)",
+                    [(kind, i, car, owner) for i, (car, owner) in enumerate(data.items())])
+
+def _get_repairs(cur, fname):
+    out = {k: [] for k in REPAIR_KINDS}
+    for kind, car in cur.execute("SELECT kind, car FROM repairs ORDER BY kind, pos"):
+        out.setdefault(kind, []).append(car)
+    return out
+
+def _put_repairs(cur, fname, data):
+    cur.execute("DELETE FROM repairs")
+    cur.executemany("INSERT INTO repairs VALUES (?,?,?)",
+                    [(k, i, c) for k, cars in data.items() for i, c in enumerate(cars)])
+
+def _get_memo(cur, fname):
+    row = cur.execute("SELECT text, extra FROM memo WHERE id=1").fetchone()
+    return _join(("memo",), row[:1], row[1]) if row else {}
+
+def _put_memo(cur, fname, data):
+    (text,), extra = _split(data, ("memo",))
+    cur.execute("INSERT OR REPLACE INTO memo VALUES (1, ?, ?)", (text, extra))
+
+_KEY_COLS = ("name", "start", "end")
+
+def _get_morning_keys(cur, fname):
+    rows = cur.execute('SELECT name, start, "end", extra FROM morning_keys ORDER BY pos')
+    return [_join(_KEY_COLS, r[:3], r[3]) for r in rows]
+
+def _put_morning_keys(cur, fname, data):
+    cur.execute("DELETE FROM morning_keys")
+    rows = []
+    for i, r in enumerate(data):
+        cols, extra = _split(r, _KEY_COLS)
+        rows.append((i, *cols, extra))
+    cur.executemany("INSERT INTO morning_keys VALUES (?,?,?,?,?)", rows)
+
+_ALIAS_COLS = ("name", "count", "last")
+
+def _get_aliases(cur, fname):
+    rows = cur.execute("SELECT raw, name, count, last, extra FROM aliases ORDER BY rowid")
+    return {r[0]: _join(_ALIAS_COLS, r[1:4], r[4]) for r in rows}
+
+def _put_aliases(cur, fname, data):
+    cur.execute("DELETE FROM aliases")
+    rows = []
+    for raw, v in data.items():
+        cols, extra = _split(v, _ALIAS_COLS)
+        rows.append((raw, *cols, extra))
+    cur.executemany("INSERT INTO aliases VALUES (?,?,?,?,?)", rows)
+
+def _get_json(table, key):
+    def get(cur, fname):
+        row = cur.execute(f"SELECT data FROM {table} WHERE {key}=?", (fname,)).fetchone()
+        return json.loads(row[0]) if row else None
+    return get
+
+def _put_json(table):
+    def put(cur, fname, data):
+        cur.execute(f"INSERT OR REPLACE INTO {table} VALUES (?, ?)", (fname, json.dumps(data, ensure_ascii=False)))
+    return put
+
+def _normalize(fname, data):
+    """구버전 형식 → 지금 형식 (저장 후 읽었을 때 나와야 하는 값)"""
+    if fname == "정비차량.json":
+        if isinstance(data, list):   # 구버전: 차량 목록 하나 → 전부에 적용
+            data = {k: data for k in REPAIR_KINDS}
+        if isinstance(data, dict):
+            data = {**{k: [] for k in REPAIR_KINDS}, **data}
+    elif fname == "아침열쇠.json" and isinstance(data, dict):   # 구버전: 단일 dict
+        data = [data] if data.get("name") else []
+    return data
+
+def _codec(fname):
+    """파일명 → (get, put)"""
+    if fname in ROSTERS: return _get_roster, _put_roster
+    if fname in VEHICLES: return _get_vehicles, _put_vehicles
+    if fname in RESULTS: return _get_json("results", "name"), _put_json("results")
+    return {
+        "정비차량.json": (_get_repairs, _put_repairs),
+        "메모장.json": (_get_memo, _put_memo),
+        "아침열쇠.json": (_get_morning_keys, _put_morning_keys),
+        "OCR별칭.json": (_get_aliases, _put_aliases),
+    }.get(fname, (_get_json("other", "fname"), _put_json("other")))
+
+
+# -----------------------
+# 저장소
+# -----------------------
+class Store:
+    """
+    SQLite 로컬 저장소 (프로세스 공용, 스레드 안전).
+    - get(fname, default) / put(fname, data) / put_many({fname: data}) — 여러 파일을 한 트랜잭션으로
+    - version: 저장할 때마다 1씩 증가 (설정 캐시 무효화용), version_of(fname): 파일별 버전
+    - snapshot(): 읽기 전용 전체 설정, derived(name, build): 설정에서 만든 값 (버전별 캐시)
+    - render_sync 의 로컬 대상 (read / write / hash) 으로도 쓴다
+    """
+
+    def __init__(self, path, migrate_from=None):
+        self.path = path
+        self.lock = threading.RLock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._snap_version = None
+        self._snap = MappingProxyType({})
+        self._snap_versions = {}
+        self._derived = {}
+        if migrate_from:
+            self.migrate_json(migrate_from)
+
+    # ----- 읽기 -----
+    def get(self, fname, default=None):
+        with self.lock:
+            cur = self.conn.cursor()
+            if not cur.execute("SELECT 1 FROM entities WHERE fname=?", (fname,)).fetchone():
+                return default
+            return _codec(fname)[0](cur, fname)
+
+    def get_many(self, fnames):
+        """{fname: data} (없는 파일은 빠짐) — 트랜잭션 하나로 일관된 스냅샷"""
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN")
+            try:
+                present = {r[0] for r in cur.execute("SELECT fname FROM entities")}
+                return {f: _codec(f)[0](cur, f) for f in fnames if f in present}
+            finally:
+                cur.execute("COMMIT")
+
+    def snapshot(self):
+        """
+        전체 파일 {fname: 읽기 전용 내용}. 저장소 버전이 같으면 쿼리 1번으로 같은 객체를 돌려주고,
+        바뀌었으면 버전이 달라진 파일만 다시 읽는다.
+        """
+        with self.lock:
+            version = self.version
+            if version == self._snap_version:
+                metrics.count("config_cache_hits")
+                return self._snap
+            metrics.count("config_cache_misses")
+            with metrics.span("config_snapshot"):
+                return self._reload_snapshot(version)
+
+    def _reload_snapshot(self, version):
+        """바뀐 파일만 다시 읽어 snapshot 갱신 (self.lock 안에서 호출)"""
+        cur = self.conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            versions = dict(cur.execute("SELECT fname, version FROM entities"))
+            data = {}
+            for f, v in versions.items():
+                if self._snap_versions.get(f) == v and f in self._snap:
+                    data[f] = self._snap[f]
+                else:
+                    data[f] = freeze(_codec(f)[0](cur, f))
+        finally:
+            cur.execute("COMMIT")
+        self._snap, self._snap_versions, self._snap_version = MappingProxyType(data), versions, version
+        return self._snap
+
+    def derived(self, name, build):
+        """build(snapshot) 결과 (Roster 등) — 저장소 버전마다 한 번만 만든다"""
+        with self.lock:
+            snap = self.snapshot()
+            hit = self._derived.get(name)
+            if hit is not None and hit[0] == self._snap_version:
+                return hit[1]
+            value = build(snap)
+            self._derived[name] = (self._snap_version, value)
+            return value
+
+    def hash(self, fname):
+        with self.lock:
+            row = self.conn.execute("SELECT hash FROM entities WHERE fname=?", (fname,)).fetchone()
+            return row[0] if row else None
+
+    @property
+    def version(self):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key='version'").fetchone()
+            return int(row[0]) if row else 0
+
+    def version_of(self, fname):
+        with self.lock:
+            row = self.conn.execute("SELECT version FROM entities WHERE fname=?", (fname,)).fetchone()
+            return row[0] if row else 0
+
+    # ----- 쓰기 -----
+    def put_many(self, items):
+        """
+        여러 파일을 한 트랜잭션으로 저장 (중간에 실패하면 전부 취소).
+        테이블에 그대로 담을 수 없는 내용이면 ValueError.
+        """
+        if not items:
+            return
+        items = {f: thaw(d) for f, d in items.items()}
+        with self.lock:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                version = int((cur.execute("SELECT value FROM meta WHERE key='version'").fetchone() or [0])[0]) + 1
+                for fname, data in items.items():
+                    get, put = _codec(fname)
+                    expected = _normalize(fname, data)
+                    try:
+                        put(cur, fname, expected)
+                        ok = get(cur, fname) == expected
+                    except (TypeError, AttributeError, sqlite3.InterfaceError, sqlite3.ProgrammingError) as e:
+                        raise ValueError(f"{fname}: 저장할 수 없는 형식 ({e})") from e
+                    if not ok:
+                        raise ValueError(f"{fname}: 저장할 수 없는 형식 (다시 읽은 내용이 다름)")
+                    # 해시는 받은 그대로의 내용 기준 (Render 서버와 비교하는 값)
+                    cur.execute("INSERT OR REPLACE INTO entities VALUES (?,?,?)", (fname, content_hash(data), version))
+                cur.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(version),))
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def put(self, fname, data):
+        self.put_many({fname: data})
+
+    def put_missing(self, items):
+        """없는 파일만 저장 (기본값 초기화용 — 동시에 도는 Render 복원 결과를 덮어쓰지 않음)"""
+        with self.lock:
+            self.put_many({f: d for f, d in items.items() if self.hash(f) is None})
+
+    # render_sync 로컬 대상
+    read = get
+    write = put
+
+    # ----- JSON 가져오기 -----
+    def migrate_json(self, data_dir):
+        """
+        data 폴더의 *.json 중 저장소에 없는 것을 한 번에 가져온다.
+        형식이 맞지 않는 파일은 건너뛴다 (원본 JSON 은 그대로 남아 있음).
+        """
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key='migrated'").fetchone():
+                return {}
+            items = {}
+            for fname in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+                if not fname.endswith(".json") or self.hash(fname):
+                    continue
+                try:
+                    with open(os.path.join(data_dir, fname), "r", encoding="utf-8") as f:
+                        items[fname] = json.load(f)
+                except (OSError, ValueError):
+                    continue
+            try:
+                self.put_many(items)
+            except ValueError:
+                for fname in list(items):   # 하나씩 다시 — 거부된 파일만 빼고 가져온다
+                    try:
+                        self.put(fname, items[fname])
+                    except ValueError:
+                        del items[fname]
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)", (str(len(items)),))
+            return items
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def open_dir(data_dir):
+    """data 폴더의 저장소 (앱 / CLI 공용 — 처음 열 때 data/*.json 가져오기)"""
+    return Store(os.path.join(data_dir, DB_NAME), migrate_from=data_dir)
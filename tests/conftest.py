@@ -0,0 +1,4 @@
+# 앱 모듈은 저장소 최상위에 있다 (패키지 아님)
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,142 @@
+# 기대값은 엔진으로 옮기기 전 앱(인라인 배정 코드)에 같은 입력을 넣어 얻은 결과 문구다.
+from datetime import datetime
+
+import pytest
+
+import engine
+import roster
+
+NOW = datetime(2026, 10, 17, 8, 40, tzinfo=engine.kst())
+
+CONFIG = dict(
+    key_order=["권한솔", "김남균", "김면정", "김성연", "김주현", "김지은", "안유미", "윤여헌", "윤원실", "이호석", "조정래"],
+    gyoyang_order=["권한솔", "김남균", "김면정", "김병욱", "김성연", "김주현", "김지은", "안유미", "이호석", "조정래"],
+    sudong_order=["권한솔", "김남균", "김성연", "김주현", "이호석", "조정래"],
+    auto1_order=["21호", "22호", "23호", "24호"],
+    veh1={"2호": "조정래", "5호": "권한솔", "7호": "김남균", "8호": "이호석", "9호": "김주현", "10호": "김성연"},
+    veh2={"4호": "김남균", "5호": "김병욱", "6호": "김지은", "12호": "안유미", "14호": "김면정", "15호": "이호석",
+          "17호": "김성연", "18호": "권한솔", "19호": "김주현", "22호": "조정래"},
+    employees=["권한솔", "김남균", "김면정", "김성연", "김지은", "안유미", "윤여헌", "윤원실", "이호석", "조정래", "김병욱", "김주현"],
+)
+
+CASES = {
+    # 빈 data 폴더 (전일근무 없음)
+    "first_day": dict(
+        repair={},
+        prev={},
+        morning=dict(names=["김남균", "이호석", "김지은", "조정래", "김성연"]),
+        afternoon=dict(names=["김남균", "이호석", "조정래", "권한솔"]),
+        morning_text=(
+            "26.10.17(토) 오전 교양순서 및 차량배정\n\n열쇠: 권한솔\n\n1교시: 김남균\n2교시: 김성연\n\n"
+            "1종수동: 7호 김남균\n\n1종자동: 21호\n\n"
+            "2종자동:\n • 15호 이호석\n • 6호 김지은\n • 22호 조정래\n • 17호 김성연"
+        ),
+        afternoon_text=(
+            "26.10.17(토) 오후 교양순서 및 차량배정\n\n열쇠: 권한솔\n\n3교시: 이호석\n4교시: 조정래\n5교시: 권한솔\n\n"
+            "1종수동: 8호 이호석\n\n1종자동: 21호\n\n"
+            "2종자동:\n • 4호 김남균\n • 22호 조정래\n • 18호 권한솔\n\n"
+            "🚫 마감 차량:\n [1종 수동]\n  • 7호 마감\n [2종 자동]\n  • 6호 마감\n  • 15호 마감\n  • 17호 마감\n\n"
+            "🔍 오전 대비 비교:\n • 제외 인원: 김성연, 김지은\n • 신규 인원: 권한솔"
+        ),
+        record={"열쇠": "권한솔", "교양_5교시": "권한솔", "1종수동": "이호석", "1종자동": "21호"},
+    ),
+    # 전일근무 이어서 + 제외자 + 1종 수동 2명 + 정비 차량
+    "continued": dict(
+        repair={"1종수동": ["8호"], "1종자동": [], "2종자동": ["6호"]},
+        prev={"열쇠": "김남균", "교양_5교시": "김성연", "1종수동": "이호석", "1종자동": "22호"},
+        morning=dict(names=["김남균", "이호석", "김지은", "조정래", "김성연", "안유미", "김주현"], excluded=["안유미"],
+                     sudong_count=2),
+        afternoon=dict(names=["김남균", "이호석", "조정래", "권한솔", "김주현"], excluded=["안유미"], sudong_count=2),
+        morning_text=(
+            "26.10.17(토) 오전 교양순서 및 차량배정\n\n열쇠: 김면정\n\n1교시: 김주현\n2교시: 김지은\n\n"
+            "1종수동: 2호 조정래\n1종수동: 7호 김남균\n\n1종자동: 23호\n\n"
+            "2종자동:\n • 15호 이호석\n • 6호 (정비중) 김지은\n • 17호 김성연\n • 19호 김주현"
+        ),
+        afternoon_text=(
+            "26.10.17(토) 오후 교양순서 및 차량배정\n\n열쇠: 김면정\n\n3교시: 이호석\n4교시: 조정래\n5교시: 권한솔\n\n"
+            "1종수동: 9호 김주현\n1종수동: 8호 (정비중) 이호석\n\n1종자동: 23호\n\n"
+            "2종자동:\n • 4호 김남균\n • 22호 조정래\n • 18호 권한솔\n\n"
+            "🚫 마감 차량:\n [1종 수동]\n  • 2호 마감\n  • 7호 마감\n [2종 자동]\n  • 6호 마감\n  • 15호 마감\n"
+            "  • 17호 마감\n  • 19호 마감\n\n"
+            "🔍 오전 대비 비교:\n • 제외 인원: 김지은, 김성연\n • 신규 인원: 권한솔"
+        ),
+        record={"열쇠": "김면정", "교양_5교시": "권한솔", "1종수동": "이호석", "1종자동": "23호"},
+    ),
+}
+
+
+def _canon(text):
+    """'제외 인원' 은 예전 코드가 set 순서로 출력했으므로 순서 무관하게 비교"""
+    out = []
+    for line in text.split("\n"):
+        head, sep, tail = line.partition("제외 인원: ")
+        out.append(head + sep + ", ".join(sorted(tail.split(", "))) if sep else line)
+    return out
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_morning_then_afternoon_matches_baseline(case):
+    c = CASES[case]
+    R = roster.Roster(repair=c["repair"], **CONFIG)
+
+    am = engine.assign_morning(R, dict(c["morning"], prev=c["prev"]), NOW)
+    assert am["text"] == c["morning_text"]
+
+    pm = engine.assign_afternoon(R, dict(c["afternoon"], prev=c["prev"], morning=am["record"]), NOW)
+    assert _canon(pm["text"]) == _canon(c["afternoon_text"])
+    assert {k: pm["record"][k] for k in c["record"]} == c["record"]
+
+
+def test_next_day_continues_from_saved_record():
+    """전일근무 기록(순번 위치 포함)을 다음 날 prev 로 넘기면 그 다음 사람부터 배정"""
+    R = roster.Roster(**CONFIG)
+    names = ["김남균", "이호석", "김지은", "조정래", "김성연"]
+    am = engine.assign_morning(R, {"names": names}, NOW)
+    pm = engine.assign_afternoon(R, {"names": names, "morning": am["record"]}, NOW)
+    am2 = engine.assign_morning(R, {"names": names, "prev": pm["record"]}, NOW)
+    assert am2["today_key"] == "김남균"
+    assert am2["sud_m"] == ["이호석"]   # 김성연 다음 김주현은 출근하지 않음
+    assert am2["today_auto1"] == "22호"
+
+
+
+def test_empty_afternoon_keeps_rotation_position():
+    """
+    오후에 교양/수동 대상자가 없으면 (윤여헌만 근무) 전일근무에 빈 값 대신 오전 마지막 배정을 남긴다.
+    엔진 분리 전 앱은 "" 를 저장해 다음 날 교양·수동 순번이 맨 처음(김남균)부터 다시 시작됐다.
+    """
+    R = roster.Roster(**CONFIG)
+    names = ["김남균", "이호석", "김지은", "조정래", "김성연"]
+    prev = {"열쇠": "김남균", "교양_5교시": "김성연", "1종수동": "이호석", "1종자동": "22호"}
+    am = engine.assign_morning(R, {"names": names, "prev": prev}, NOW)
+    pm = engine.assign_afternoon(R, {"names": ["윤여헌"], "prev": prev, "morning": am["record"]}, NOW)
+    assert (pm["gy3"], pm["gy4"], pm["gy5"], pm["sud_a"]) == (None, None, None, [])
+    assert pm["record"]["교양_5교시"] == "이호석"   # 오전 2교시
+    assert pm["record"]["1종수동"] == "조정래"      # 오전 1종 수동
+
+    am2 = engine.assign_morning(R, {"names": names, "prev": pm["record"]}, NOW)
+    assert (am2["gy1"], am2["gy2"]) == ("조정래", "김남균")
+    assert am2["sud_m"] == ["김남균"]   # 조정래 다음 권한솔은 출근하지 않음
+
+
+def test_cli_reads_and_writes_local_store(tmp_path, capsys):
+    """CLI 는 data/*.json 이 아니라 앱과 같은 로컬 저장소를 읽고 쓴다"""
+    import json, store
+
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "열쇠순번.json").write_text(json.dumps(["김면정", "조정래", "이호석"]), encoding="utf-8")   # 가져온 뒤 낡은 파일
+    local = store.open_dir(str(data))
+    local.put_many({"열쇠순번.json": ["조정래", "이호석"], "1종자동순번.json": ["23호", "24호"],
+                    "전일근무.json": {"열쇠": "조정래", "1종자동": "23호"}})
+    local.close()
+
+    engine.main(["morning", "--data-dir", str(data), "--names", "이호석", "조정래", "--save"])
+    out = capsys.readouterr().out
+    assert "열쇠: 이호석" in out and "1종자동: 24호" in out
+
+    engine.main(["afternoon", "--data-dir", str(data), "--names", "이호석", "조정래", "--save"])
+    local = store.open_dir(str(data))
+    assert local.get("오전결과.json")["today_key"] == "이호석"
+    assert local.get("전일근무.json")["1종자동"] == "24호"
+    assert "timestamp" in local.get("오후결과.json")
@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import history
+
+
+def _runs(rng, days=70):
+    """날짜/시간대별 배정 run (일부는 같은 반나절을 다시 생성)"""
+    names, cars = ["김남균", "이호석", "김지은", "조정래"], ["7호", "8호", "15호"]
+    out, d = [], date(2026, 9, 20)
+    for i in range(days):
+        for period in ("오전", "오후"):
+            for k in range(rng.choice([1, 1, 2])):
+                run = f"{d}T{8 + k:02d}:00:00"
+                out.append([{"date": str(d), "period": period, "role": rng.choice(["열쇠", "1종수동", "2종자동", "마감"]),
+                             "name": rng.choice(names), "car": rng.choice(cars), "run": run} for _ in range(3)])
+        d += timedelta(days=1)
+    return out
+
+
+def _recount(runs, start=None, end=None):
+    """반나절마다 마지막 run 만 세는 전체 재계산"""
+    last = {}
+    for rows in runs:
+        last[(rows[0]["date"], rows[0]["period"])] = rows
+    c = Counter()
+    for (d, _), rows in last.items():
+        if (start is None or str(start) <= d) and (end is None or d <= str(end)):
+            c += history.Tally._keys(rows)
+    return c
+
+
+def test_incremental_counts_match_full_recount(tmp_path):
+    runs = _runs(random.Random(3))
+    store = history.HistoryStore(str(tmp_path))
+    for i, rows in enumerate(runs):
+        store.append(rows)
+        if i % 17 == 0:   # 중간중간 조회 → 이후에는 새로 덧붙은 행만 더해진다
+            assert store.counts() == _recount(runs[:i + 1])
+    assert store.counts() == _recount(runs)
+    lo, hi = date(2026, 10, 1), date(2026, 10, 31)
+    assert store.counts(start=lo, end=hi) == _recount(runs, lo, hi)
+    # 새로 연 저장소(전체 파일을 처음부터 읽음)와 같다
+    assert history.HistoryStore(str(tmp_path)).counts() == store.counts()
+
+
+def test_same_second_reruns_keep_only_the_last(tmp_path):
+    t = datetime(2026, 10, 17, 8, 40, 0, 1000)
+    first, second = history.run_id(t), history.run_id(t.replace(microsecond=900000))
+    assert first != second != history.run_id(t.replace(microsecond=900000))
+    assert first < second
+    store = history.HistoryStore(str(tmp_path))
+    row = {"date": "2026-10-17", "period": "오전", "role": "열쇠", "car": ""}
+    store.append([dict(row, name="김남균", run=first)])
+    store.append([dict(row, name="이호석", run=second)])
+    assert store.count(role="열쇠") == 1
+    assert store.last(role="열쇠")["name"] == "이호석"
+    assert store.counts() == Counter({("name", "이호석", "열쇠"): 1})
@@ -0,0 +1,46 @@
+import difflib, random
+
+import pytest
+
+from name_match import NameMatcher, normalize_name
+
+EMPLOYEES = ["권한솔", "김남균", "김면정", "김성연", "김지은", "안유미", "윤여헌", "윤원실", "이호석", "조정래", "김병욱", "김주현",
+             "김남균(교육)", "박성연", "김성현", "이호준"]
+
+
+def brute_force(employees, name, cutoff):
+    """인덱스 없이 목록 전체를 difflib 로 훑는 예전 방식 (동점이면 먼저 나온 사람)"""
+    name_norm = normalize_name(name)
+    if not name_norm:
+        return name
+    best, best_score = None, 0.0
+    for e in employees:
+        score = difflib.SequenceMatcher(None, normalize_name(e), name_norm).ratio()
+        if score > best_score:
+            best_score, best = score, e
+    return best if best and best_score >= cutoff else name
+
+
+def _typos(rng, n):
+    syllables = sorted({ch for e in EMPLOYEES for ch in normalize_name(e)}) + list("가나다라마바사")
+    out = []
+    for _ in range(n):
+        base = list(normalize_name(rng.choice(EMPLOYEES)))
+        op = rng.randrange(4)
+        i = rng.randrange(len(base))
+        if op == 0:
+            base[i] = rng.choice(syllables)
+        elif op == 1:
+            del base[i]
+        elif op == 2:
+            base.insert(i, rng.choice(syllables))
+        out.append("".join(base) + rng.choice(["", "(A-합)", " ", "B불"]))
+    return out
+
+
+@pytest.mark.parametrize("cutoff", [0.0, 0.4, 0.6, 0.8, 1.0])
+def test_matches_brute_force(cutoff):
+    m = NameMatcher(EMPLOYEES)
+    names = _typos(random.Random(7), 400) + EMPLOYEES + ["", "(휴가)", "홍길동", "김", "성연김"]
+    for name in names:
+        assert m.correct(name, cutoff) == brute_force(EMPLOYEES, name, cutoff), name
@@ -0,0 +1,28 @@
+# 정비 기간(--repairs)은 배정을 바꾸지 않고, 그날 배정된 정비 차량을 표에 표시한다.
+from datetime import date
+
+import planner
+import roster
+from test_engine import CONFIG
+
+START, END = date(2026, 11, 2), date(2026, 11, 6)
+
+
+def test_repair_window_flags_assigned_cars():
+    R = roster.roster_for(**CONFIG)
+    base = planner.plan(R, START, END)
+    assert all(r["정비중"] == "" for r in base)
+
+    repairs = [{"car": "22호", "kind": "1종자동", "start": "2026-11-03", "end": "2026-11-03"},
+               {"car": "7호", "start": "2026-11-02", "end": "2026-11-06"}]
+    rows = planner.plan(R, START, END, repairs=repairs)
+    by_day = {r["date"]: r for r in rows}
+    assert by_day["2026-11-03"]["1종자동"] == "22호 (정비중)"
+    assert "22호 (1종자동)" in by_day["2026-11-03"]["정비중"]
+    assert by_day["2026-11-04"]["1종자동"] == base[2]["1종자동"]
+    # 7호는 1종 수동(김남균) / 2종 자동 모두 정비 중 → 배정된 날에만 표시
+    for r, b in zip(rows, base):
+        on = "김남균" in r["1종수동(오전)"] + r["1종수동(오후)"]
+        assert ("7호 (1종수동)" in r["정비중"]) == on
+        # 배정 자체는 바뀌지 않는다 (표시만)
+        assert {k: r[k] for k in planner.COLUMNS[:9]} == {k: b[k] for k in planner.COLUMNS[:9]}
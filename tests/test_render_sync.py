@@ -0,0 +1,185 @@
+import json, threading, time
+
+import pytest
+import requests
+
+import json_server
+import render_sync
+
+
+@pytest.fixture
+def server(tmp_path):
+    """이전 내용(열쇠순번 = 김남균 먼저)을 가진 참조 서버"""
+    srv = json_server.make_server(port=0, data_dir=str(tmp_path / "server"))
+    srv.RequestHandlerClass.store.put("열쇠순번.json", ["김남균", "이호석"])
+    srv.RequestHandlerClass.store.put("메모장.json", {"memo": "server"})
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+@pytest.fixture(params=["bulk", "get"])
+def state(request):
+    """/sync 한 번 (bulk) 과 파일별 /download (get) 두 경로 모두 확인"""
+    state = render_sync.SyncState()
+    if request.param == "get":
+        state.bulk_supported = False
+    return state
+
+def _local(tmp_path):
+    d = tmp_path / "data"
+    render_sync.write_local(str(d / "열쇠순번.json"), ["이호석", "김남균"])
+    render_sync.write_local(str(d / "메모장.json"), {"memo": "local"})
+    return str(d)
+
+def _read(data_dir, fname):
+    with open(f"{data_dir}/{fname}", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_restore_keeps_unsent_save(tmp_path, server, state):
+    data_dir = _local(tmp_path)
+    release = threading.Event()
+    def send_batch(items):   # 업로드가 끝나지 않은 상태 (전송 중)
+        release.wait(10)
+        return {fname: (False, "offline") for fname in items}
+    queue = render_sync.UploadQueue(send_batch, max_attempts=1)
+    queue.put("열쇠순번.json", ["이호석", "김남균"])
+
+    try:
+        report = render_sync.sync(server, data_dir, state, files=["열쇠순번.json", "메모장.json"],
+                                  exclude=queue.unsent)
+    finally:
+        release.set()
+
+    assert report["skipped"] == ["열쇠순번.json"]
+    assert _read(data_dir, "열쇠순번.json") == ["이호석", "김남균"]
+    # 대기열에 없는 파일은 그대로 서버 내용으로 복원
+    assert _read(data_dir, "메모장.json") == {"memo": "server"}
+
+    # 업로드가 실패로 끝나도 다음 복원에서 덮어쓰지 않는다
+    assert queue.flush(timeout=5)
+    assert "열쇠순번.json" in queue.unsent()
+    render_sync.sync(server, data_dir, state, files=["열쇠순번.json"], force=True, exclude=queue.unsent)
+    assert _read(data_dir, "열쇠순번.json") == ["이호석", "김남균"]
+
+
+def test_unsent_save_survives_restart(tmp_path, server, state):
+    """프로세스가 다시 떠도 기록된 업로드는 복원에서 빠지고, 이어서 보내진다"""
+    data_dir = _local(tmp_path)
+    journal = render_sync.UploadJournal(str(tmp_path / "render" / "upload_queue.json"))
+    before = render_sync.UploadQueue(lambda items: {f: (False, "offline") for f in items}, max_attempts=1,
+                                     journal=journal)
+    before.put("열쇠순번.json", ["이호석", "김남균"])
+    assert before.flush(timeout=5)
+
+    release = threading.Event()
+    def send_batch(items):
+        release.wait(10)
+        return render_sync.upload_many(server, items)
+    after = render_sync.UploadQueue(send_batch, journal=journal)   # 재시작: 메모리 대기열은 비어 있음
+    try:
+        report = render_sync.sync(server, data_dir, state, files=["열쇠순번.json"], exclude=after.unsent)
+    finally:
+        release.set()
+    assert report["skipped"] == ["열쇠순번.json"]
+    assert _read(data_dir, "열쇠순번.json") == ["이호석", "김남균"]
+
+    assert after.flush(timeout=5)
+    assert after.unsent() == set() and journal.load() == {}
+    # 이어서 보낸 내용이 서버에 반영됐으므로 다음 복원도 같은 순번
+    render_sync.sync(server, data_dir, state, files=["열쇠순번.json"], force=True, exclude=after.unsent)
+    assert _read(data_dir, "열쇠순번.json") == ["이호석", "김남균"]
+
+
+def test_file_missing_on_server_is_not_a_failure(tmp_path, server, state):
+    """서버에 아직 없는 파일 (예: 첫 별칭을 배우기 전 OCR별칭.json) 은 실패가 아니고 로컬도 그대로"""
+    data_dir = _local(tmp_path)
+    render_sync.write_local(f"{data_dir}/OCR별칭.json", {})
+    report = render_sync.sync(server, data_dir, state, files=["메모장.json", "OCR별칭.json"])
+    assert report["failed"] == {}
+    assert report["missing"] == ["OCR별칭.json"]
+    assert report["restored"] == ["메모장.json"]
+    assert _read(data_dir, "OCR별칭.json") == {}
+
+
+class SyncDown:
+    """/sync 만 실패하는 세션 (status=None 이면 연결 오류, 그 밖의 요청은 그대로)"""
+
+    def __init__(self, status):
+        self.http = render_sync.make_session()
+        self.status = status
+
+    def get(self, url, **kwargs):
+        return self.http.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        if not url.endswith("/sync"):
+            return self.http.post(url, **kwargs)
+        if self.status is None:
+            raise ConnectionError("connection reset")
+        res = requests.Response()
+        res.status_code, res._content = self.status, b"{}"
+        return res
+
+
+@pytest.mark.parametrize("status", [500, 502, 400, None])
+def test_failed_bulk_sync_falls_back_to_restore_all(tmp_path, server, status):
+    data_dir = _local(tmp_path)
+    state = render_sync.SyncState()
+    state.bulk_supported = True
+    report = render_sync.sync(server, data_dir, state, session=SyncDown(status), files=["열쇠순번.json", "메모장.json"])
+    assert report["failed"] == {} and not report["bulk"]
+    assert report["restored"] == ["열쇠순번.json", "메모장.json"]
+    assert _read(data_dir, "메모장.json") == {"memo": "server"}
+    assert state.bulk_supported is True   # 일시적 오류 — 다음 동기화는 다시 /sync
+
+
+def test_failed_bulk_upload_falls_back_to_single_uploads(server):
+    state = render_sync.SyncState()
+    results = render_sync.upload_many(server, {"메모장.json": {"memo": "new"}}, session=SyncDown(503), state=state)
+    assert results == {"메모장.json": (True, None)}
+    assert render_sync.download(server, "메모장.json") == ({"memo": "new"}, None)
+
+
+class Blocking:
+    """요청마다 release 를 기다리는 세션 (요청 수 집계)"""
+
+    def __init__(self):
+        self.http = render_sync.make_session()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        self.release.wait(10)
+        return self.http.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        self.release.wait(10)
+        return self.http.post(url, **kwargs)
+
+
+def test_sync_does_not_hold_lock_during_network(tmp_path, server):
+    data_dir = _local(tmp_path)
+    state = render_sync.SyncState()
+    first = render_sync.sync(server, data_dir, state, files=["메모장.json"])
+
+    session = Blocking()
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(
+        render_sync.sync(server, data_dir, state, session=session, files=["메모장.json"], force=True)))
+        for _ in range(3)]
+    for w in workers:
+        w.start()
+    time.sleep(0.3)
+    # 강제 동기화가 네트워크에서 기다리는 동안에도 다른 세션은 잠금에 막히지 않고 마지막 리포트를 받는다
+    assert render_sync.sync(server, data_dir, state, files=["메모장.json"]) is first
+    assert not state.lock.locked()
+    session.release.set()
+    for w in workers:
+        w.join(10)
+    # 동시에 들어온 호출은 요청을 새로 보내지 않고 진행 중인 동기화 결과를 같이 쓴다
+    assert session.calls == 1
+    assert len(results) == 3 and results[0] is results[1] is results[2]
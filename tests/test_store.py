@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+import store
+from render_sync import content_hash
+
+
+@pytest.fixture
+def db(tmp_path):
+    s = store.Store(str(tmp_path / "roadvision.db"))
+    yield s
+    s.close()
+
+
+def test_put_many_bumps_version_and_hash(db):
+    assert db.version == 0
+    assert db.hash("열쇠순번.json") is None
+
+    db.put_many({"열쇠순번.json": ["김남균", "이호석"], "메모장.json": {"memo": "a"}})
+    assert db.version == 1
+    assert db.version_of("열쇠순번.json") == db.version_of("메모장.json") == 1
+    assert db.hash("열쇠순번.json") == content_hash(["김남균", "이호석"])
+
+    db.put("열쇠순번.json", ["이호석", "김남균"])
+    assert db.version == 2
+    assert db.version_of("열쇠순번.json") == 2
+    assert db.version_of("메모장.json") == 1
+    assert db.hash("열쇠순번.json") == content_hash(["이호석", "김남균"])
+    assert db.get("열쇠순번.json") == ["이호석", "김남균"]
+
+
+def test_failed_put_many_changes_nothing(db):
+    db.put("메모장.json", {"memo": "a"})
+    with pytest.raises(ValueError):
+        db.put_many({"메모장.json": {"memo": "b"}, "오전결과.json": {"bad": object()}})   # 두 번째에서 직렬화 실패
+    assert db.version == 1
+    assert db.get("메모장.json") == {"memo": "a"}
+
+
+def test_snapshot_follows_version(db):
+    db.put_many({"열쇠순번.json": ["김남균"], "메모장.json": {"memo": "a"}})
+    a = db.snapshot()
+    assert db.snapshot() is a
+    with pytest.raises(AttributeError):
+        a["열쇠순번.json"].append("x")
+
+    db.put("메모장.json", {"memo": "b"})
+    b = db.snapshot()
+    assert b is not a
+    assert b["메모장.json"]["memo"] == "b"
+    assert b["열쇠순번.json"] is a["열쇠순번.json"]   # 바뀌지 않은 파일은 다시 읽지 않음
+
+
+ROUND_TRIP = {
+    "메모장.json": {"memo": "5호차 점검", "updated": "2026-10-17", "by": "김남균"},
+    "OCR별칭.json": {"김남군": {"name": "김남균", "count": 2, "last": "2026-10-17", "source": "오전"},
+                   "이호삭": {"name": "이호석"}},
+    "아침열쇠.json": [{"name": "김면정", "start": "2026-10-01", "end": "2026-10-31", "note": "교육"},
+                   {"name": "조정래"}],
+    "정비차량.json": {"1종수동": ["7호"], "1종자동": [], "2종자동": ["6호", "15호"]},
+    "1종차량표.json": {"2호": "조정래", "7호": None},
+}
+
+@pytest.mark.parametrize("fname", ROUND_TRIP)
+def test_put_keeps_every_field(db, fname):
+    db.put(fname, ROUND_TRIP[fname])
+    assert db.get(fname) == ROUND_TRIP[fname]
+    assert db.hash(fname) == content_hash(ROUND_TRIP[fname])
+
+
+def test_legacy_formats_are_upgraded(db):
+    db.put_many({"정비차량.json": ["7호"], "아침열쇠.json": {"name": "김면정", "start": "2026-10-01"}})
+    assert db.get("정비차량.json") == {"1종수동": ["7호"], "1종자동": ["7호"], "2종자동": ["7호"]}
+    assert db.get("아침열쇠.json") == [{"name": "김면정", "start": "2026-10-01"}]
+
+
+@pytest.mark.parametrize("fname, data", [
+    ("열쇠순번.json", ["김남균", 7]),                        # 순번표에 문자열이 아닌 값
+    ("열쇠순번.json", ["김남균", {"name": "이호석"}]),
+    ("OCR별칭.json", {"김남군": {"name": "김남균", "count": "2"}}),
+    ("메모장.json", "메모"),
+    ("정비차량.json", {"1종수동": "7호"}),
+])
+def test_lossy_content_is_rejected(db, fname, data):
+    with pytest.raises(ValueError):
+        db.put(fname, data)
+    assert db.get(fname) is None and db.version == 0
+
+
+def test_migrate_skips_rejected_files(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "열쇠순번.json").write_text(json.dumps(["김남균", 7]), encoding="utf-8")
+    (data / "메모장.json").write_text(json.dumps({"memo": "a", "by": "김남균"}, ensure_ascii=False), encoding="utf-8")
+    db = store.open_dir(str(data))
+    assert db.get("열쇠순번.json") is None
+    assert db.get("메모장.json") == {"memo": "a", "by": "김남균"}
+    db.close()
+
+
+def test_put_missing_keeps_existing(db):
+    db.put("열쇠순번.json", ["이호석"])
+    db.put_missing({"열쇠순번.json": ["기본값"], "메모장.json": {"memo": ""}})
+    assert db.get("열쇠순번.json") == ["이호석"]
+    assert db.get("메모장.json") == {"memo": ""}
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+import usage
+
+
+def test_days_and_months_follow_kst(tmp_path):
+    """UTC 서버에서도 KST 자정 기준으로 나눈다 (오전 9시 이전 호출이 전날로 가지 않음)"""
+    ledger = usage.UsageLedger(str(tmp_path))
+    # 2026-10-31 23:30 UTC = 2026-11-01 08:30 KST
+    row = ledger.record("gpt-4o", prompt_tokens=1_000_000, now=datetime(2026, 10, 31, 23, 30, tzinfo=timezone.utc))
+    assert row["ts"] == "2026-11-01T08:30:00+09:00"
+    ledger.record("gpt-4o", prompt_tokens=1_000_000, now=datetime(2026, 10, 31, 14, 0, tzinfo=timezone.utc))
+
+    assert [d for d, _ in ledger.daily()] == ["2026-10-31", "2026-11-01"]
+    assert [m for m, _ in ledger.monthly()] == ["2026-10", "2026-11"]
+    assert (tmp_path / "2026-11.jsonl").exists()
+    assert ledger.spent("2026-11-01") == (2.5, 2.5)
+
+
+def test_budget_warns_and_blocks(tmp_path):
+    ledger = usage.UsageLedger(str(tmp_path))
+    day = datetime.now(usage.kst()).date()
+    ledger.record("gpt-4o", prompt_tokens=1_000_000)   # $2.50
+
+    assert usage.Budget(daily=10).check(ledger, day)["level"] == "ok"
+    warn = usage.Budget(daily=5.5, warn=0.8).check(ledger, day)   # 2.5 + 예상 2.5 = 91%
+    assert warn["level"] == "warn" and not warn["blocked"]
+    over = usage.Budget(daily=4, block=True).check(ledger, day)
+    assert over["level"] == "over" and over["blocked"]
+    assert usage.Budget(monthly=4).check(ledger, day)["blocked"] is False   # block 이 아니면 경고만
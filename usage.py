@@ -0,0 +1,225 @@
+# =====================================
+# usage.py — OCR 호출 사용량 / 비용 장부 + 예산 경고 (추가 전용, 월별 JSONL, Streamlit 비의존)
+# =====================================
+# data/usage/YYYY-MM.jsonl 에 비전 호출(또는 캐시 적중) 한 건을 한 줄로 덧붙인다.
+#   {"ts": "2026-10-17T08:40:12+09:00", "model": "gpt-4o", "slot": "오전"|"오후"|"", "outcome": "ok"|"error"|"cache_exact"|"cache_similar",
+#    "prompt_tokens", "completion_tokens", "image_bytes", "ms", "cost", "error"}
+# 날짜/월 구분(일별·월별 합계, 예산 초기화)은 앱과 같은 한국 시간(KST) 기준이다 (서버 시간대와 무관).
+# 단가는 PRICES (USD / 1M 토큰), 환경변수 OCR_PRICES='{"gpt-4o": [2.5, 10]}' 로 덮어쓸 수 있다.
+# 예산: OCR_BUDGET_DAILY / OCR_BUDGET_MONTHLY (USD), OCR_BUDGET_WARN (기본 0.8 = 80% 에서 경고),
+#       OCR_BUDGET_BLOCK=1 이면 한도를 넘길 호출은 막는다 (기본은 경고만).
+#
+# 예)
+#   python usage.py                 # 최근 14일 + 월별 합계
+#   python usage.py --days 30 --json
+import argparse, json, os, sys, threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+}
+FIELDS = ["calls", "cache_hits", "errors", "prompt_tokens", "completion_tokens", "image_bytes", "ms", "cost"]
+
+
+@lru_cache(maxsize=None)
+def kst():
+    """한국 시간대 (일별·월별 구분 기준)"""
+    from zoneinfo import ZoneInfo
+    return ZoneInfo("Asia/Seoul")
+
+
+def model_name(backend_name):
+    """백엔드 이름 ("openai:gpt-4o") → 모델 이름"""
+    return (backend_name or "").split(":", 1)[-1]
+
+def prices():
+    out = dict(PRICES)
+    try:
+        out.update({k: tuple(v) for k, v in json.loads(os.environ.get("OCR_PRICES") or "{}").items()})
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return out
+
+def cost(model, prompt_tokens, completion_tokens):
+    """USD (단가를 모르는 모델은 0)"""
+    p_in, p_out = prices().get(model, (0.0, 0.0))
+    return (prompt_tokens or 0) * p_in / 1e6 + (completion_tokens or 0) * p_out / 1e6
+
+
+# -----------------------
+# 장부
+# -----------------------
+class UsageLedger:
+    """OCR 사용량 장부 (월별 JSONL). 일별 합계는 메모리에 두고 새로 덧붙인 줄만 더한다"""
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.offsets = {}    # 월 → 읽은 위치
+        self.days = {}       # "YYYY-MM-DD" → 합계 dict
+        self.recent = []     # 최근 유료 호출 비용 (다음 호출 비용 추정용)
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, month):
+        return os.path.join(self.root, f"{month}.jsonl")
+
+    def _add(self, row):
+        d = self.days.setdefault(row["ts"][:10], dict.fromkeys(FIELDS, 0))
+        if row["outcome"].startswith("cache"):
+            d["cache_hits"] += 1
+            return
+        d["calls"] += 1
+        d["errors"] += row["outcome"] != "ok"
+        for k in ("prompt_tokens", "completion_tokens", "image_bytes", "ms", "cost"):
+            d[k] += row.get(k) or 0
+        if row.get("cost"):
+            self.recent = (self.recent + [row["cost"]])[-20:]
+
+    def _refresh(self):
+        """새로 덧붙은 줄만 읽어 합계에 더한다 (다른 프로세스가 쓴 줄 포함)"""
+        for fname in sorted(os.listdir(self.root)):
+            if not fname.endswith(".jsonl"):
+                continue
+            month = fname[:-6]
+            path = self._path(month)
+            pos = self.offsets.get(month, 0)
+            if os.path.getsize(path) <= pos:
+                continue
+            with open(path, "rb") as f:
+                f.seek(pos)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break   # 쓰는 중인 줄은 다음에
+                    pos += len(line)
+                    try:
+                        self._add(json.loads(line))
+                    except (ValueError, KeyError):
+                        pass
+            self.offsets[month] = pos
+
+    def record(self, model, outcome="ok", slot="", prompt_tokens=0, completion_tokens=0, image_bytes=0, ms=0.0,
+               error=None, now=None):
+        """호출 1건 기록 → 행 dict (now: 기록 시각, 기본 현재 KST)"""
+        row = {
+            "ts": (now.astimezone(kst()) if now else datetime.now(kst())).isoformat(timespec="seconds"),
+            "model": model, "slot": slot, "outcome": outcome,
+            "prompt_tokens": prompt_tokens or 0, "completion_tokens": completion_tokens or 0,
+            "image_bytes": image_bytes or 0, "ms": round(ms or 0.0, 1),
+            "cost": round(cost(model, prompt_tokens, completion_tokens), 6),
+        }
+        if error:
+            row["error"] = error
+        with self.lock:
+            self._refresh()
+            line = json.dumps(row, ensure_ascii=False) + "\n"
+            with open(self._path(row["ts"][:7]), "a", encoding="utf-8") as f:
+                f.write(line)
+            # 방금 쓴 줄은 다음 _refresh 에서 더한다 (다른 프로세스와 순서를 맞추기 위해)
+            self._refresh()
+        return row
+
+    def daily(self, start=None, end=None):
+        """[(날짜, 합계)] 날짜순"""
+        with self.lock:
+            self._refresh()
+            return [(d, dict(v)) for d, v in sorted(self.days.items())
+                    if (not start or d >= str(start)) and (not end or d <= str(end))]
+
+    def monthly(self):
+        """[(월, 합계)] 월순"""
+        out = {}
+        for d, v in self.daily():
+            m = out.setdefault(d[:7], dict.fromkeys(FIELDS, 0))
+            for k in FIELDS:
+                m[k] += v[k]
+        return sorted(out.items())
+
+    def spent(self, day):
+        """(그날 비용, 그달 비용) — day: KST 날짜"""
+        day = str(day)
+        with self.lock:
+            self._refresh()
+            d = self.days.get(day, {}).get("cost", 0.0)
+            m = sum(v["cost"] for k, v in self.days.items() if k[:7] == day[:7])
+        return d, m
+
+    def estimate(self):
+        """다음 호출 예상 비용 (최근 유료 호출 평균, 기록이 없으면 0)"""
+        with self.lock:
+            self._refresh()
+            return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+
+# -----------------------
+# 예산
+# -----------------------
+class Budget:
+    """일/월 한도 (USD, None = 제한 없음)"""
+
+    def __init__(self, daily=None, monthly=None, warn=0.8, block=False):
+        self.daily = daily
+        self.monthly = monthly
+        self.warn = warn
+        self.block = block
+
+    @classmethod
+    def from_env(cls, env=None):
+        env = os.environ if env is None else env
+        def num(k):
+            try:
+                return float(env[k]) if env.get(k) else None
+            except ValueError:
+                return None
+        return cls(daily=num("OCR_BUDGET_DAILY"), monthly=num("OCR_BUDGET_MONTHLY"),
+                   warn=num("OCR_BUDGET_WARN") or 0.8, block=bool(env.get("OCR_BUDGET_BLOCK")))
+
+    def check(self, ledger, day=None, calls=1):
+        """
+        calls 번 더 호출하기 전 점검 → {"level": "ok"|"warn"|"over", "messages": [...], "blocked": bool}
+        - warn: 사용액 + 예상 비용이 한도의 warn 비율 이상
+        - over: 한도를 넘길 것으로 예상 (block 이면 blocked=True)
+        """
+        day = day or datetime.now(kst()).date()
+        spent_day, spent_month = ledger.spent(day)
+        expect = ledger.estimate() * calls
+        level, messages = "ok", []
+        for label, spent, limit in (("오늘", spent_day, self.daily), ("이번 달", spent_month, self.monthly)):
+            if not limit:
+                continue
+            if spent + expect > limit:
+                level = "over"
+                messages.append(f"{label} OCR 비용 ${spent:.2f} + 예상 ${expect:.3f} → 한도 ${limit:.2f} 초과")
+            elif spent + expect >= limit * self.warn:
+                level = "warn" if level == "ok" else level
+                messages.append(f"{label} OCR 비용 ${spent:.2f} / 한도 ${limit:.2f} ({(spent + expect) / limit:.0%} 예상)")
+        return {"level": level, "messages": messages, "blocked": level == "over" and self.block}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OCR 사용량 / 비용")
+    ap.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    ap.add_argument("--days", type=int, default=14)
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args(argv)
+
+    ledger = UsageLedger(os.path.join(args.data_dir, "usage"))
+    start = datetime.now(kst()).date() - timedelta(days=args.days - 1)
+    days, months = ledger.daily(start=start), ledger.monthly()
+    if args.json:
+        print(json.dumps({"daily": dict(days), "monthly": dict(months)}, ensure_ascii=False, indent=2))
+        return
+    w = sys.stdout.write
+    for title, rows in (("일별", days), ("월별", months)):
+        w(f"\n[{title}]\n{'':<11}{'호출':>6}{'캐시':>6}{'오류':>6}{'입력토큰':>10}{'출력토큰':>10}{'평균ms':>8}{'비용$':>9}\n")
+        for k, v in rows:
+            avg = v["ms"] / v["calls"] if v["calls"] else 0
+            w(f"{k:<11}{v['calls']:>6}{v['cache_hits']:>6}{v['errors']:>6}{v['prompt_tokens']:>10}"
+              f"{v['completion_tokens']:>10}{avg:>8.0f}{v['cost']:>9.3f}\n")
+
+
+if __name__ == "__main__":
+    main()